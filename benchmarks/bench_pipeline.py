@@ -0,0 +1,221 @@
+"""Time every pipeline stage across song lengths and styles.
+
+    python -m benchmarks.bench_pipeline [--bars 8,64,512,4096] [--styles pop,jazz]
+        [--repeat 3] [--json out.json] [--baseline old.json] [--threshold 1.25]
+
+Stages: map_controls, build_song_plan, build_chord_segments, each
+generate_*_track, build_song_report, analyze_counterpoint and MidiFile.save.
+Upstream inputs are built once per (style, length) and only the stage itself
+is timed (best of ``--repeat``). Peak memory comes from a separate run under
+tracemalloc, so tracing overhead does not leak into the timings.
+
+With ``--baseline`` every result is compared against a stored JSON run; the
+exit status is 1 when any stage got slower than ``--threshold`` times its
+baseline (ignoring stages faster than ``--min-seconds`` in both runs).
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from mind.artifacts import PART_ORDER
+from mind.bass import generate_bass_track
+from mind.control_mapping import STYLE_PROFILES, map_controls
+from mind.drums import generate_drums_track
+from mind.harmony import build_chord_segments, generate_harmony_track
+from mind.melody import generate_melody_track
+from mind.midi_build import build_song_artifacts
+from mind.models import Controls, StyleMoodControls
+from mind.planning import bar_columns, build_song_plan
+from mind.reporting import build_song_report
+from mind.theory.counterpoint import analyze_counterpoint
+
+DEFAULT_BARS = (8, 32, 128, 512, 1024, 4096)
+STAGES = (
+    "map_controls",
+    "build_song_plan",
+    "build_chord_segments",
+    "generate_harmony_track",
+    "generate_bass_track",
+    "generate_melody_track",
+    "generate_drums_track",
+    "build_song_report",
+    "analyze_counterpoint",
+    "midifile_save",
+)
+
+
+def _style_mood(style: str) -> StyleMoodControls:
+    return StyleMoodControls(
+        style=style,
+        mood_valence=0.65,
+        mood_arousal=0.55,
+        intensity=0.60,
+        complexity=0.35,
+        tightness=0.65,
+    )
+
+
+def _controls(style: str, length_bars: int, seed: int = 123456789) -> Controls:
+    style_mood = _style_mood(style)
+    return Controls(
+        length_bars=length_bars,
+        bpm=120,
+        key_name="C",
+        mode="major",
+        seed=seed,
+        style_mood=style_mood,
+        derived=map_controls(style_mood, seed=seed),
+    )
+
+
+def _plan(ctrl: Controls):
+    plan = build_song_plan(ctrl)
+    bar_columns(plan).column("density_mul")  # bar modifiers are lazy; include them in the stage
+    return plan
+
+
+def stage_calls(style: str, length_bars: int) -> dict:
+    """Zero-argument callables for every stage, with inputs prepared up front."""
+    ctrl = _controls(style, length_bars)
+    artifacts = build_song_artifacts(ctrl, with_report=False)
+    plan, segments, events = artifacts.plan, artifacts.chord_segments, artifacts.part_events
+    bar_columns(plan).column("density_mul")
+    style_mood = _style_mood(style)
+
+    def save():
+        buf = io.BytesIO()
+        artifacts.midifile(PART_ORDER).save(file=buf)
+        return buf
+
+    return {
+        "map_controls": lambda: map_controls(style_mood, seed=ctrl.seed),
+        "build_song_plan": lambda: _plan(ctrl),
+        "build_chord_segments": lambda: build_chord_segments(ctrl, plan),
+        "generate_harmony_track": lambda: generate_harmony_track(ctrl, segments, plan),
+        "generate_bass_track": lambda: generate_bass_track(ctrl, segments, plan),
+        "generate_melody_track": lambda: generate_melody_track(ctrl, segments, plan),
+        "generate_drums_track": lambda: generate_drums_track(ctrl, plan),
+        "build_song_report": lambda: build_song_report(ctrl, plan, segments, events),
+        "analyze_counterpoint": lambda: analyze_counterpoint(events["melody"], events["harmony"]),
+        "midifile_save": save,
+    }
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _peak_bytes(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(bars, styles, stages, repeat: int, memory: bool = True, log=print) -> list[dict]:
+    results = []
+    for style in styles:
+        for length_bars in bars:
+            calls = stage_calls(style, length_bars)
+            for stage in stages:
+                fn = calls[stage]
+                seconds = _best_of(fn, repeat)
+                entry = {
+                    "style": style,
+                    "bars": length_bars,
+                    "stage": stage,
+                    "seconds": seconds,
+                    "us_per_bar": seconds * 1e6 / length_bars,
+                    "peak_kib": round(_peak_bytes(fn) / 1024, 1) if memory else None,
+                }
+                results.append(entry)
+                if log is not None:
+                    peak = f"{entry['peak_kib']:>10.1f}" if memory else f"{'-':>10}"
+                    log(f"{style:<16} {length_bars:>6} {stage:<24} {seconds:>10.5f} {entry['us_per_bar']:>11.1f} {peak}")
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float, min_seconds: float) -> list[dict]:
+    """Entries whose time grew by more than ``threshold`` x against ``baseline``."""
+    old = {(r["style"], r["bars"], r["stage"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = old.get((r["style"], r["bars"], r["stage"]))
+        if b is None or max(r["seconds"], b["seconds"]) < min_seconds:
+            continue
+        ratio = r["seconds"] / b["seconds"] if b["seconds"] > 0 else float("inf")
+        if ratio > threshold:
+            regressions.append({**r, "baseline_seconds": b["seconds"], "ratio": ratio})
+    return regressions
+
+
+def _parse_list(text: str) -> list[str]:
+    return [p.strip() for p in text.split(",") if p.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.bench_pipeline")
+    ap.add_argument("--bars", default=",".join(str(b) for b in DEFAULT_BARS))
+    ap.add_argument("--styles", default=",".join(STYLE_PROFILES))
+    ap.add_argument("--stages", default=",".join(STAGES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass.")
+    ap.add_argument("--json", default=None, help="Write results to this JSON file.")
+    ap.add_argument("--baseline", default=None, help="Compare against a JSON file written by --json.")
+    ap.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression.")
+    ap.add_argument("--min-seconds", type=float, default=0.001, help="Ignore stages faster than this in both runs.")
+    args = ap.parse_args(argv)
+
+    styles = _parse_list(args.styles)
+    stages = _parse_list(args.stages)
+    unknown = [s for s in styles if s not in STYLE_PROFILES] + [s for s in stages if s not in STAGES]
+    if unknown:
+        print(f"Unknown styles/stages: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    print(f"{'style':<16} {'bars':>6} {'stage':<24} {'best (s)':>10} {'us/bar':>11} {'peak KiB':>10}")
+    results = run([int(b) for b in _parse_list(args.bars)], styles, stages, args.repeat, memory=not args.no_memory)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "benchmark": "pipeline_stages",
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['style']} {r['bars']} bars {r['stage']}: "
+                f"{r['baseline_seconds']:.5f}s -> {r['seconds']:.5f}s ({r['ratio']:.2f}x)"
+            )
+        print(f"{len(regressions)} regression(s) above {args.threshold:.2f}x against {args.baseline}.")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+"""Time the per-bar plan modifiers: filling the columns and reading them.
+
+    python -m benchmarks.bench_planning [--bars 256,1024,4096,16384] [--repeat 5] [--json out.json]
+
+Fill: computing every bar's modifiers, in bulk with NumPy and with the
+list-comprehension fallback used when NumPy is missing. Read: one generator
+style pass over the song (section, phrase-end flag and a scaled multiplier per
+bar), once through ``BarModifiers`` records (``plan.bar_mods[b]``) and once
+straight from the columns, which is what the generators do.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from mind import planning
+from mind.control_mapping import map_controls
+from mind.models import Controls, StyleMoodControls
+from mind.planning import PHRASE_END, BarColumns, bar_columns, build_song_plan
+from mind.utils import clamp01
+
+DEFAULT_BARS = (256, 1024, 4096, 16384)
+
+
+def _controls(length_bars: int, seed: int = 123456789) -> Controls:
+    style_mood = StyleMoodControls(
+        style="pop",
+        mood_valence=0.65,
+        mood_arousal=0.55,
+        intensity=0.60,
+        complexity=0.35,
+        tightness=0.65,
+    )
+    return Controls(
+        length_bars=length_bars,
+        bpm=120,
+        key_name="C",
+        mode="major",
+        seed=seed,
+        style_mood=style_mood,
+        derived=map_controls(style_mood, seed=seed),
+    )
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_length(length_bars: int, repeat: int) -> dict:
+    ctrl = _controls(length_bars)
+    plan = build_song_plan(ctrl)
+    columns = bar_columns(plan)
+    columns.column("density_mul")
+    rng_state = random.Random(ctrl.seed).getstate()
+    base = ctrl.derived.energy
+
+    def fill():
+        fresh = BarColumns(ctrl, rng_state, plan.sections, length_bars, plan.phrase_len_bars)
+        fresh.column("density_mul")
+
+    def fill_python():
+        saved, planning.np = planning.np, None
+        try:
+            fill()
+        finally:
+            planning.np = saved
+
+    def read_records():
+        mods = plan.bar_mods
+        for b in range(length_bars):
+            mod = mods[b]
+            mod.section == "chorus", mod.is_phrase_end, clamp01(base * mod.energy_mul)
+
+    def read_columns():
+        energy = columns.scaled("energy_mul", base)
+        for b in range(length_bars):
+            columns.section(b) == "chorus", columns.flag(b, PHRASE_END), energy[b]
+
+    fill_s = _best_of(fill, repeat) if planning.np is not None else None
+    python_s = _best_of(fill_python, repeat)
+    records_s = _best_of(read_records, repeat)
+    columns_s = _best_of(read_columns, repeat)
+    return {
+        "bars": length_bars,
+        "fill_numpy_s": fill_s,
+        "fill_python_s": python_s,
+        "read_records_s": records_s,
+        "read_columns_s": columns_s,
+        "read_speedup": records_s / columns_s if columns_s > 0 else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.bench_planning")
+    ap.add_argument("--bars", default=",".join(str(b) for b in DEFAULT_BARS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", default=None, help="Write results to this JSON file.")
+    args = ap.parse_args(argv)
+
+    results = []
+    print(f"{'bars':>6} {'fill np (s)':>12} {'fill py (s)':>12} {'records (s)':>12} {'columns (s)':>12} {'speedup':>8}")
+    for bars in [int(b) for b in args.bars.split(",") if b.strip()]:
+        r = bench_length(bars, args.repeat)
+        results.append(r)
+        fill_np = f"{r['fill_numpy_s']:>12.5f}" if r["fill_numpy_s"] is not None else f"{'-':>12}"
+        print(
+            f"{r['bars']:>6} {fill_np} {r['fill_python_s']:>12.5f} "
+            f"{r['read_records_s']:>12.5f} {r['read_columns_s']:>12.5f} {r['read_speedup']:>7.1f}x"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "plan_columns", "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""Compare the direct SMF writer against the mido serialization path.
+
+    python -m benchmarks.bench_smf [--bars 16,64,256,1024,4096,8192] [--repeat 3] [--json out.json]
+
+Events are generated once per length; only serialization is timed.
+The mido path is what build_midifile + MidiFile.save did: encode tracks of
+Message objects, then let mido write them.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import time
+
+from mido import MidiFile
+
+from mind.artifacts import PART_ORDER
+from mind.constants import PPQ
+from mind.control_mapping import map_controls
+from mind.midi_build import build_meta_track, build_song_artifacts, encode_part_track
+from mind.models import Controls, StyleMoodControls
+from mind.smf import encode_smf
+
+DEFAULT_BARS = (16, 64, 256, 1024, 4096, 8192)
+
+
+def _controls(length_bars: int, seed: int = 123456789) -> Controls:
+    style_mood = StyleMoodControls(
+        style="pop",
+        mood_valence=0.65,
+        mood_arousal=0.55,
+        intensity=0.60,
+        complexity=0.35,
+        tightness=0.65,
+    )
+    return Controls(
+        length_bars=length_bars,
+        bpm=120,
+        key_name="C",
+        mode="major",
+        seed=seed,
+        style_mood=style_mood,
+        derived=map_controls(style_mood, seed=seed),
+    )
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_length(length_bars: int, repeat: int) -> dict:
+    ctrl = _controls(length_bars)
+    artifacts = build_song_artifacts(ctrl, with_report=False, encode_tracks=False)
+    events = artifacts.part_events
+
+    def mido_path():
+        mid = MidiFile(ticks_per_beat=PPQ)
+        mid.tracks.append(build_meta_track(ctrl))
+        for name in PART_ORDER:
+            mid.tracks.append(encode_part_track(name, events[name]))
+        buf = io.BytesIO()
+        mid.save(file=buf)
+        return buf.getvalue()
+
+    def direct_path():
+        return encode_smf(events, ctrl.bpm, part_order=PART_ORDER, smf_type=1)
+
+    assert mido_path() == bytes(direct_path()), "writers disagree"
+
+    mido_s = _best_of(mido_path, repeat)
+    direct_s = _best_of(direct_path, repeat)
+    type0_s = _best_of(lambda: encode_smf(events, ctrl.bpm, part_order=PART_ORDER, smf_type=0), repeat)
+    return {
+        "bars": length_bars,
+        "events": sum(len(e) for e in events.values()),
+        "mido_s": mido_s,
+        "direct_type1_s": direct_s,
+        "direct_type0_s": type0_s,
+        "speedup": mido_s / direct_s if direct_s > 0 else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.bench_smf")
+    ap.add_argument("--bars", default=",".join(str(b) for b in DEFAULT_BARS))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", default=None, help="Write results to this JSON file.")
+    args = ap.parse_args(argv)
+
+    results = []
+    print(f"{'bars':>6} {'events':>9} {'mido (s)':>10} {'direct (s)':>11} {'type0 (s)':>10} {'speedup':>8}")
+    for bars in [int(b) for b in args.bars.split(",") if b.strip()]:
+        r = bench_length(bars, args.repeat)
+        results.append(r)
+        print(f"{r['bars']:>6} {r['events']:>9} {r['mido_s']:>10.4f} {r['direct_type1_s']:>11.4f} {r['direct_type0_s']:>10.4f} {r['speedup']:>7.1f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "smf_writer", "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,14 +3,29 @@
 Option B structure:
 - mind/constants.py  : fixed constants (PPQ, GM programs, drum notes)
 - mind/models.py     : dataclasses for controls and musical plan artifacts
+- mind/events.py     : struct-of-arrays EventBuffer shared by generators + analyzers
 - mind/utils.py      : small helpers + music theory primitives
-- mind/planning.py   : sectioning + rhythm DNA + contour + chord templates
-- mind/harmony.py    : chords-first progression + voice-leading harmony generator
+- mind/pcset.py      : 12-bit pitch-class set masks, cached register tables, bisect lookups
+- mind/sampling.py   : weighted samplers (pick_weighted-compatible bisect, alias method)
+- mind/planning.py   : sectioning + rhythm DNA + contour + chord templates, columnar per-bar modifiers
+- mind/harmony.py    : chords-first progression, per-song SegmentIndex + voice-leading harmony generator
 - mind/bass.py       : bass generator
 - mind/melody.py     : melody generator
+- mind/melody_search.py: best-of-N melody search scored by the theory analyzers
+- mind/motif_store.py: memory-mapped on-disk motif store indexed by rhythm, chord shape, contour
 - mind/drums.py      : drums generator
 - mind/reporting.py  : analysis report builder
+- mind/artifacts.py  : song artifacts + memory-bounded LRU keyed by a controls hash
 - mind/midi_build.py : midi + bundle builder
+- mind/pipeline.py   : dependency-aware memoized stages for incremental regeneration
+- mind/smf.py        : direct Standard MIDI File writer from EventBuffer columns
+- mind/preview.py    : NumPy WAV preview synthesizer (optional dependency)
+- mind/playback.py   : absolute-time burst scheduler (monotonic clock, sleep-then-spin)
+- mind/telemetry.py  : scheduled-vs-sent playback jitter histograms
+- mind/ports.py      : persistent MIDI output port pool (background open, reconnect)
 - mind/player.py     : realtime MIDI playback helper
+- mind/worker.py     : debounced, cancellable background generation for the UI
+- mind/speculation.py: idle-time pre-generation of neighbouring seeds into an LRU cache
 - mind/ui.py         : Tkinter GUI app
+- mind/batch.py      : headless batch renderer (python -m mind.batch)
 """
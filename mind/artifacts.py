@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Callable
+
+from mido import MidiFile, MidiTrack
+
+from .constants import PPQ
+from .events import EventBuffer
+from .models import ChordSegment, Controls, SongPlan
+from .smf import encode_smf, write_smf
+
+if TYPE_CHECKING:
+    from .melody_search import MelodySearch
+
+PART_ORDER = ("melody", "harmony", "bass", "drums")
+
+
+def controls_key(ctrl: Controls, melody_search: MelodySearch | None = None) -> str:
+    """Stable hash of every control value that influences generation.
+
+    Two Controls objects with equal field values always produce the same key,
+    independent of object identity or process. A melody search (candidates
+    and time budget) is part of the key, so searched and plain songs never
+    share one.
+    """
+    values: dict[str, Any] = asdict(ctrl)
+    if melody_search is not None:
+        values = {"controls": values, "melody_search": asdict(melody_search)}
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SongArtifacts:
+    """Everything generated for one set of controls.
+
+    Part tracks are encoded once (delta times, track_name, end_of_track), so
+    any subset of parts can be assembled into a MidiFile without running the
+    generators again.
+    """
+
+    key: str
+    ctrl: Controls
+    plan: SongPlan
+    chord_segments: list[ChordSegment]
+    part_events: dict[str, EventBuffer]
+    meta_track: MidiTrack
+    part_tracks: dict[str, MidiTrack] = field(default_factory=dict)
+    report: dict[str, Any] | None = None
+
+    def has_parts(self, include_parts) -> bool:
+        return all(p in self.part_tracks for p in include_parts)
+
+    def approx_bytes(self) -> int:
+        """Rough in-memory size, calibrated against tracemalloc (within ~30%)."""
+        events = sum(len(evs) for evs in self.part_events.values())
+        messages = sum(len(track) for track in self.part_tracks.values())
+        size = 16_384 + 24 * events + 250 * messages + 1_024 * len(self.chord_segments)
+        if self.report is not None:
+            size += 8_192 + 600 * self.ctrl.length_bars
+        return size
+
+    def midifile(self, include_parts=PART_ORDER) -> MidiFile:
+        """Assemble a MidiFile from the pre-encoded tracks of the requested parts."""
+        mid = MidiFile(ticks_per_beat=PPQ)
+        mid.tracks.append(self.meta_track)
+        for part_name in PART_ORDER:
+            if part_name in include_parts and part_name in self.part_tracks:
+                mid.tracks.append(self.part_tracks[part_name])
+        return mid
+
+    def to_smf(self, include_parts=PART_ORDER, smf_type: int = 1) -> bytearray:
+        """Encode the requested parts straight to SMF bytes (no mido Messages)."""
+        parts = {name: evs for name, evs in self.part_events.items() if name in include_parts}
+        return encode_smf(parts, self.ctrl.bpm, part_order=PART_ORDER, smf_type=smf_type)
+
+    def save_smf(self, target, include_parts=PART_ORDER, smf_type: int = 1) -> None:
+        """Write SMF bytes to a path, file descriptor or writable buffer."""
+        write_smf(self.to_smf(include_parts, smf_type), target)
+
+    def save_wav(self, target, include_parts=PART_ORDER, sample_rate: int = 22050) -> None:
+        """Render an audio preview with :mod:`mind.preview` (requires NumPy)."""
+        from .preview import render_wav
+
+        render_wav(self.part_events, self.ctrl.bpm, target, sample_rate=sample_rate, include_parts=include_parts)
+
+
+class ArtifactCache:
+    """Thread-safe LRU of :class:`SongArtifacts` keyed by :func:`controls_key`.
+
+    Bounded by ``max_bytes`` (using :meth:`SongArtifacts.approx_bytes`) and
+    ``max_entries``; the least recently used songs are evicted first. Only
+    complete songs (every part encoded, report built) are stored, so a hit
+    can stand in for :func:`mind.midi_build.build_song_artifacts`.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[SongArtifacts, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> SongArtifacts | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, artifacts: SongArtifacts) -> bool:
+        """Store ``artifacts``; False if incomplete or larger than the whole budget."""
+        if artifacts.report is None or not artifacts.has_parts(PART_ORDER):
+            return False
+        size = artifacts.approx_bytes()
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(artifacts.key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[artifacts.key] = (artifacts, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return True
+
+    def get_or_build(self, ctrl: Controls, build: Callable[[Controls], SongArtifacts] | None = None) -> SongArtifacts:
+        """Cached artifacts for ``ctrl``, building (and storing) them on a miss."""
+        artifacts = self.get(controls_key(ctrl))
+        if artifacts is None:
+            if build is None:
+                from .midi_build import build_song_artifacts as build
+            artifacts = build(ctrl)
+            self.put(artifacts)
+        return artifacts
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
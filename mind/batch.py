@@ -0,0 +1,361 @@
+"""Headless batch renderer.
+
+Renders a grid of seeds x styles x keys x modes x Level 1 knob values to
+``.mid`` files plus JSON reports (and ``.wav`` previews with ``--wav``),
+using every core:
+
+    python -m mind.batch --out renders --seeds 1-500 --styles pop,jazz \\
+        --keys C,A --modes major,minor --intensity 0.3,0.7
+
+Each finished job is appended to ``manifest.jsonl`` in the output directory,
+so re-running the same command after a crash skips the jobs already done.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Iterable, Iterator
+
+from .constants import NOTE_NAMES
+from .control_mapping import STYLE_PROFILES, map_controls
+from .melody_search import MelodySearch
+from .midi_build import build_song_artifacts
+from .models import Controls, StyleMoodControls
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    seed: int
+    style: str
+    key_name: str
+    mode: str
+    mood_valence: float
+    mood_arousal: float
+    intensity: float
+    complexity: float
+    tightness: float
+    length_bars: int
+    bpm: int
+    voice_leading: str = "greedy"
+    melody_candidates: int = 1  # > 1: best-of-N melody search (see mind.melody_search)
+    melody_seconds: float | None = None  # time budget of that search
+
+    @property
+    def job_id(self) -> str:
+        knobs = "_".join(
+            f"{v:.2f}" for v in (self.mood_valence, self.mood_arousal, self.intensity, self.complexity, self.tightness)
+        )
+        key = self.key_name.replace("#", "s")
+        job_id = f"{self.style}_{key}_{self.mode}_{self.length_bars}b_{self.bpm}bpm_k{knobs}_s{self.seed}"
+        if self.voice_leading != "greedy":
+            job_id += f"_vl{self.voice_leading}"
+        if self.melody_candidates > 1:
+            job_id += f"_mc{self.melody_candidates}"
+            if self.melody_seconds is not None:
+                job_id += f"_ms{self.melody_seconds:g}"
+        return job_id
+
+    def melody_search(self) -> MelodySearch | None:
+        if self.melody_candidates <= 1:
+            return None
+        return MelodySearch(candidates=self.melody_candidates, time_budget=self.melody_seconds)
+
+    def controls(self) -> Controls:
+        style_mood = StyleMoodControls(
+            style=self.style,
+            mood_valence=self.mood_valence,
+            mood_arousal=self.mood_arousal,
+            intensity=self.intensity,
+            complexity=self.complexity,
+            tightness=self.tightness,
+        )
+        return Controls(
+            length_bars=self.length_bars,
+            bpm=self.bpm,
+            key_name=self.key_name,
+            mode=self.mode,
+            seed=self.seed,
+            style_mood=style_mood,
+            derived=map_controls(style_mood, seed=self.seed),
+            voice_leading=self.voice_leading,
+        )
+
+
+def parse_int_list(text: str) -> list[int]:
+    """Parse ``"1,4,10-12"`` into ``[1, 4, 10, 11, 12]``."""
+    out: list[int] = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            out.extend(range(int(lo), int(hi) + 1))
+        else:
+            out.append(int(part))
+    return out
+
+
+def parse_float_list(text: str) -> list[float]:
+    return [float(p) for p in text.split(",") if p.strip()]
+
+
+def parse_str_list(text: str) -> list[str]:
+    return [p.strip() for p in text.split(",") if p.strip()]
+
+
+def iter_jobs(
+    seeds: Iterable[int],
+    styles: Iterable[str],
+    keys: Iterable[str],
+    modes: Iterable[str],
+    valences: Iterable[float],
+    arousals: Iterable[float],
+    intensities: Iterable[float],
+    complexities: Iterable[float],
+    tightnesses: Iterable[float],
+    length_bars: int,
+    bpm: int,
+    voice_leading: str = "greedy",
+    melody_candidates: int = 1,
+    melody_seconds: float | None = None,
+) -> Iterator[BatchJob]:
+    grid = itertools.product(
+        list(styles), list(keys), list(modes), list(valences), list(arousals),
+        list(intensities), list(complexities), list(tightnesses), list(seeds),
+    )
+    for style, key_name, mode, valence, arousal, intensity, complexity, tightness, seed in grid:
+        yield BatchJob(
+            seed=seed,
+            style=style,
+            key_name=key_name,
+            mode=mode,
+            mood_valence=valence,
+            mood_arousal=arousal,
+            intensity=intensity,
+            complexity=complexity,
+            tightness=tightness,
+            length_bars=length_bars,
+            bpm=bpm,
+            voice_leading=voice_leading,
+            melody_candidates=melody_candidates,
+            melody_seconds=melody_seconds,
+        )
+
+
+def load_manifest(out_dir: str) -> set[str]:
+    """Return the ids of jobs already recorded as done.
+
+    A truncated last line (crash mid-write) is ignored.
+    """
+    done: set[str] = set()
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("status") == "ok":
+                done.add(entry["job_id"])
+    return done
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def render_job(job: BatchJob, out_dir: str, with_report: bool = True, smf_type: int = 1, wav: bool = False) -> dict:
+    """Render one job to disk. Runs inside a worker process."""
+    t0 = time.perf_counter()
+    try:
+        artifacts = build_song_artifacts(
+            job.controls(), with_report=with_report, encode_tracks=False, melody_search=job.melody_search()
+        )
+        mid_path = os.path.join(out_dir, f"{job.job_id}.mid")
+        _write_atomic(mid_path, artifacts.to_smf(smf_type=smf_type))
+        files = [os.path.basename(mid_path)]
+        if with_report:
+            report_path = os.path.join(out_dir, f"{job.job_id}.json")
+            _write_atomic(report_path, json.dumps(artifacts.report, indent=2).encode("utf-8"))
+            files.append(os.path.basename(report_path))
+        if wav:
+            wav_path = os.path.join(out_dir, f"{job.job_id}.wav")
+            buf = io.BytesIO()
+            artifacts.save_wav(buf)
+            _write_atomic(wav_path, buf.getvalue())
+            files.append(os.path.basename(wav_path))
+        status, error = "ok", None
+    except Exception as e:
+        files, status, error = [], "error", str(e)
+    return {
+        "job_id": job.job_id,
+        "status": status,
+        "error": error,
+        "files": files,
+        "seconds": round(time.perf_counter() - t0, 4),
+        "job": asdict(job),
+    }
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    out_dir: str,
+    workers: int | None = None,
+    with_report: bool = True,
+    log=print,
+    smf_type: int = 1,
+    wav: bool = False,
+) -> dict[str, int]:
+    """Render ``jobs`` into ``out_dir``, skipping jobs already in the manifest.
+
+    Results are streamed: every finished job is appended (and flushed) to the
+    manifest right away, and at most a few jobs per worker are in flight.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    done = load_manifest(out_dir)
+    workers = max(1, workers or os.cpu_count() or 1)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    def pending_jobs():
+        # Only jobs of this run count as skipped, not every entry in the manifest.
+        for job in jobs:
+            if job.job_id in done:
+                counts["skipped"] += 1
+            else:
+                yield job
+
+    pending = pending_jobs()
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    needs_newline = False
+    if os.path.exists(manifest_path) and os.path.getsize(manifest_path) > 0:
+        with open(manifest_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        if needs_newline:
+            manifest.write("\n")
+
+        def record(entry: dict) -> None:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            counts[entry["status"]] += 1
+            if log is not None:
+                tail = f" ({entry['error']})" if entry["error"] else ""
+                log(f"[{counts['ok'] + counts['error']}] {entry['status']} {entry['job_id']} {entry['seconds']:.2f}s{tail}")
+
+        if workers == 1:
+            for job in pending:
+                record(render_job(job, out_dir, with_report, smf_type, wav))
+            return counts
+
+        max_in_flight = workers * 4
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = set()
+            for job in pending:
+                in_flight.add(pool.submit(render_job, job, out_dir, with_report, smf_type, wav))
+                if len(in_flight) >= max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        record(fut.result())
+            for fut in wait(in_flight).done:
+                record(fut.result())
+
+    return counts
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m mind.batch", description="Render a grid of songs to MIDI + JSON reports.")
+    ap.add_argument("--out", required=True, help="Output directory (also holds manifest.jsonl).")
+    ap.add_argument("--seeds", default="1-10", help="Seeds, e.g. '1-100' or '3,7,11'.")
+    ap.add_argument("--styles", default="pop", help=f"Comma-separated styles from: {','.join(STYLE_PROFILES)}.")
+    ap.add_argument("--keys", default="C", help="Comma-separated key names, e.g. 'C,G,F#'.")
+    ap.add_argument("--modes", default="major", help="Comma-separated modes: major,minor.")
+    ap.add_argument("--valence", default="0.65", help="Level 1 mood valence values (0..1).")
+    ap.add_argument("--arousal", default="0.55", help="Level 1 mood arousal values (0..1).")
+    ap.add_argument("--intensity", default="0.60", help="Level 1 intensity values (0..1).")
+    ap.add_argument("--complexity", default="0.35", help="Level 1 complexity values (0..1).")
+    ap.add_argument("--tightness", default="0.65", help="Level 1 tightness values (0..1).")
+    ap.add_argument("--length-bars", type=int, default=8)
+    ap.add_argument("--bpm", type=int, default=120)
+    ap.add_argument(
+        "--voice-leading",
+        choices=("greedy", "optimal"),
+        default="greedy",
+        help="Harmony voice leading: chord-to-chord (greedy) or DP over the whole progression (optimal).",
+    )
+    ap.add_argument(
+        "--melody-candidates",
+        type=int,
+        default=1,
+        help="Generate N melodies per song and keep the best-scoring phrase of each (default: 1, no search).",
+    )
+    ap.add_argument("--melody-seconds", type=float, default=None, help="Time budget of the melody search per song.")
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    ap.add_argument("--no-report", action="store_true", help="Only write .mid files.")
+    ap.add_argument("--smf-type", type=int, choices=(0, 1), default=1, help="MIDI file type (0: single track, 1: one track per part).")
+    ap.add_argument("--wav", action="store_true", help="Also render a .wav preview per job (requires NumPy).")
+    ap.add_argument("--quiet", action="store_true")
+    return ap
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+
+    styles = parse_str_list(args.styles)
+    unknown = [s for s in styles if s not in STYLE_PROFILES]
+    keys = parse_str_list(args.keys)
+    unknown += [k for k in keys if k not in NOTE_NAMES]
+    modes = parse_str_list(args.modes)
+    unknown += [m for m in modes if m not in ("major", "minor")]
+    if unknown:
+        print(f"Unknown style/key/mode values: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    jobs = iter_jobs(
+        seeds=parse_int_list(args.seeds),
+        styles=styles,
+        keys=keys,
+        modes=modes,
+        valences=parse_float_list(args.valence),
+        arousals=parse_float_list(args.arousal),
+        intensities=parse_float_list(args.intensity),
+        complexities=parse_float_list(args.complexity),
+        tightnesses=parse_float_list(args.tightness),
+        length_bars=args.length_bars,
+        bpm=args.bpm,
+        voice_leading=args.voice_leading,
+        melody_candidates=args.melody_candidates,
+        melody_seconds=args.melody_seconds,
+    )
+    counts = run_batch(
+        jobs,
+        args.out,
+        workers=args.workers,
+        with_report=not args.no_report,
+        log=None if args.quiet else print,
+        smf_type=args.smf_type,
+        wav=args.wav,
+    )
+    print(f"Done: {counts['ok']} rendered, {counts['error']} failed, {counts['skipped']} already in manifest.")
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,7 @@
 from __future__ import annotations
 
 import random
-
-from mido import Message
+from typing import Iterator
 
 from .constants import (
     DRUM_CHANNEL,
@@ -15,7 +14,9 @@ from .constants import (
     DRUM_TOM_LOW,
     DRUM_TOM_MID,
 )
+from .events import EventBuffer
 from .models import Controls, SongPlan
+from .planning import PHRASE_END, SECTION_END, SECTION_START, bar_columns
 from .utils import bar_step_to_abs_tick, clamp01, lerp, humanize_ticks, apply_swing_to_step, velocity_humanize, derive_groove_sync
 
 
@@ -42,9 +43,9 @@ def _vary_steps(rng: random.Random, steps: list[int], add_prob: float, remove_pr
     return steps
 
 
-def generate_drums_track(ctrl: Controls, plan: SongPlan):
+def iter_drums_bars(ctrl: Controls, plan: SongPlan) -> Iterator[EventBuffer]:
+    """Yield the drum events of each bar as a separate EventBuffer."""
     rng = random.Random(ctrl.seed + 404)
-    events = []
 
     base_kick_vel = int(round(lerp(70, 112, ctrl.derived.energy)))
     base_snare_vel = int(round(72))
@@ -53,13 +54,21 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
     rp = plan.rhythm
     groove_level, sync_base = derive_groove_sync(ctrl.derived.level2, rp.archetype)
 
+    columns = bar_columns(plan)
+    density_col = columns.scaled("density_mul", ctrl.derived.density * lerp(0.85, 1.12, groove_level))
+    sync_col = columns.scaled("sync_mul", sync_base)
+    energy_col = columns.scaled("energy_mul", ctrl.derived.energy)
+    variation_col = columns.scaled("variation_mul", ctrl.derived.variation)
+
     for bar in range(ctrl.length_bars):
-        mod = plan.bar_mods[bar]
+        events = EventBuffer()
+        section = columns.section(bar)
+        flags = columns.flags[bar]
 
-        density_eff = clamp01(ctrl.derived.density * lerp(0.85, 1.12, groove_level) * mod.density_mul)
-        sync_eff = clamp01(sync_base * mod.sync_mul)
-        energy_eff = clamp01(ctrl.derived.energy * mod.energy_mul)
-        variation_eff = clamp01(ctrl.derived.variation * mod.variation_mul)
+        density_eff = density_col[bar]
+        sync_eff = sync_col[bar]
+        energy_eff = energy_col[bar]
+        variation_eff = variation_col[bar]
 
         kick_vel = int(round(lerp(70, 115, energy_eff)))
         snare_vel = int(round(lerp(72, 118, energy_eff)))
@@ -70,7 +79,7 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
         hat_steps = rp.base_hat_steps[:]
 
         hat_16th_prob = clamp01(rp.hat_16th_bias * lerp(0.55, 1.20, density_eff))
-        if mod.section == "chorus":
+        if section == "chorus":
             hat_16th_prob = clamp01(hat_16th_prob * 1.15)
 
         if rng.random() < hat_16th_prob:
@@ -80,7 +89,7 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
         hat_steps = sorted(set([s for s in hat_steps if 0 <= s <= 15]))
 
         extra_kick_prob = clamp01(rp.kick_sync_bias * lerp(0.65, 1.35, sync_eff))
-        if mod.section == "chorus":
+        if section == "chorus":
             extra_kick_prob = clamp01(extra_kick_prob * 1.10)
         if rng.random() < extra_kick_prob:
             kick_steps = _vary_steps(rng, kick_steps, add_prob=0.75, remove_prob=0.0)
@@ -94,17 +103,17 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
             snare_steps.append(11)
         snare_steps = sorted(set([s for s in snare_steps if 0 <= s <= 15]))
 
-        if mod.is_section_start and bar != 0:
+        if flags & SECTION_START and bar != 0:
             on_tick = bar_step_to_abs_tick(bar, 0) + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
             off_tick = bar_step_to_abs_tick(bar, 1)
             v = velocity_humanize(rng, int(round(lerp(85, 120, energy_eff))), ctrl.derived.humanize_velocity)
-            events.append((max(0, on_tick), Message("note_on", channel=DRUM_CHANNEL, note=DRUM_CRASH, velocity=v, time=0)))
-            events.append((max(0, off_tick), Message("note_off", channel=DRUM_CHANNEL, note=DRUM_CRASH, velocity=0, time=0)))
+            events.note_on(max(0, on_tick), DRUM_CHANNEL, DRUM_CRASH, v)
+            events.note_off(max(0, off_tick), DRUM_CHANNEL, DRUM_CRASH)
 
         do_fill = False
-        if mod.is_phrase_end and bar != ctrl.length_bars - 1:
+        if flags & PHRASE_END and bar != ctrl.length_bars - 1:
             do_fill = rng.random() < clamp01(lerp(0.20, 0.85, variation_eff) * lerp(0.70, 1.25, energy_eff))
-        if mod.is_section_end and bar != ctrl.length_bars - 1:
+        if flags & SECTION_END and bar != ctrl.length_bars - 1:
             do_fill = do_fill or (rng.random() < clamp01(lerp(0.20, 0.90, variation_eff) * 1.10))
 
         kick_steps = sorted(set([s for s in kick_steps if 0 <= s <= 15]))
@@ -112,8 +121,8 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
             on_tick = bar_step_to_abs_tick(bar, s) + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
             off_tick = bar_step_to_abs_tick(bar, min(16, s + 1))
             vel = velocity_humanize(rng, kick_vel, ctrl.derived.humanize_velocity)
-            events.append((max(0, on_tick), Message("note_on", channel=DRUM_CHANNEL, note=DRUM_KICK, velocity=vel, time=0)))
-            events.append((max(0, off_tick), Message("note_off", channel=DRUM_CHANNEL, note=DRUM_KICK, velocity=0, time=0)))
+            events.note_on(max(0, on_tick), DRUM_CHANNEL, DRUM_KICK, vel)
+            events.note_off(max(0, off_tick), DRUM_CHANNEL, DRUM_KICK)
 
         for s in snare_steps:
             on_tick = bar_step_to_abs_tick(bar, s) + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
@@ -121,15 +130,15 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
             is_ghost = (s in (3, 11))
             v0 = int(round(snare_vel * (0.45 if is_ghost else 1.0)))
             vel = velocity_humanize(rng, v0, ctrl.derived.humanize_velocity)
-            events.append((max(0, on_tick), Message("note_on", channel=DRUM_CHANNEL, note=DRUM_SNARE, velocity=vel, time=0)))
-            events.append((max(0, off_tick), Message("note_off", channel=DRUM_CHANNEL, note=DRUM_SNARE, velocity=0, time=0)))
+            events.note_on(max(0, on_tick), DRUM_CHANNEL, DRUM_SNARE, vel)
+            events.note_off(max(0, off_tick), DRUM_CHANNEL, DRUM_SNARE)
 
         for s in hat_steps:
             on_tick = bar_step_to_abs_tick(bar, s) + apply_swing_to_step(s, ctrl.derived.swing) + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
             off_tick = bar_step_to_abs_tick(bar, min(16, s + 1))
             vel = velocity_humanize(rng, hat_vel, ctrl.derived.humanize_velocity)
-            events.append((max(0, on_tick), Message("note_on", channel=DRUM_CHANNEL, note=DRUM_HAT_CLOSED, velocity=vel, time=0)))
-            events.append((max(0, off_tick), Message("note_off", channel=DRUM_CHANNEL, note=DRUM_HAT_CLOSED, velocity=0, time=0)))
+            events.note_on(max(0, on_tick), DRUM_CHANNEL, DRUM_HAT_CLOSED, vel)
+            events.note_off(max(0, off_tick), DRUM_CHANNEL, DRUM_HAT_CLOSED)
 
         if do_fill:
             if rp.fill_style == "snare_roll":
@@ -139,8 +148,8 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
                     off_tick = bar_step_to_abs_tick(bar, min(16, s + 1))
                     ramp = lerp(0.65, 1.10, i / max(1, len(roll_steps) - 1))
                     vel = velocity_humanize(rng, int(round(snare_vel * ramp)), ctrl.derived.humanize_velocity)
-                    events.append((max(0, on_tick), Message("note_on", channel=DRUM_CHANNEL, note=DRUM_SNARE, velocity=vel, time=0)))
-                    events.append((max(0, off_tick), Message("note_off", channel=DRUM_CHANNEL, note=DRUM_SNARE, velocity=0, time=0)))
+                    events.note_on(max(0, on_tick), DRUM_CHANNEL, DRUM_SNARE, vel)
+                    events.note_off(max(0, off_tick), DRUM_CHANNEL, DRUM_SNARE)
                 if rng.random() < 0.35:
                     s = 14
                     on_tick = bar_step_to_abs_tick(bar, s)
@@ -148,8 +157,8 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
                     on_tick += humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
                     off_tick = bar_step_to_abs_tick(bar, min(16, s + 1))
                     vel = velocity_humanize(rng, int(round(hat_vel * 0.95)), ctrl.derived.humanize_velocity)
-                    events.append((max(0, on_tick), Message("note_on", channel=DRUM_CHANNEL, note=DRUM_HAT_OPEN, velocity=vel, time=0)))
-                    events.append((max(0, off_tick), Message("note_off", channel=DRUM_CHANNEL, note=DRUM_HAT_OPEN, velocity=0, time=0)))
+                    events.note_on(max(0, on_tick), DRUM_CHANNEL, DRUM_HAT_OPEN, vel)
+                    events.note_off(max(0, off_tick), DRUM_CHANNEL, DRUM_HAT_OPEN)
             else:
                 tom_seq = [(12, DRUM_TOM_LOW), (13, DRUM_TOM_MID), (14, DRUM_TOM_HIGH), (15, DRUM_SNARE)]
                 for i, (s, drum_note) in enumerate(tom_seq):
@@ -157,7 +166,14 @@ def generate_drums_track(ctrl: Controls, plan: SongPlan):
                     off_tick = bar_step_to_abs_tick(bar, min(16, s + 1))
                     ramp = lerp(0.70, 1.10, i / max(1, len(tom_seq) - 1))
                     vel = velocity_humanize(rng, int(round(snare_vel * ramp)), ctrl.derived.humanize_velocity)
-                    events.append((max(0, on_tick), Message("note_on", channel=DRUM_CHANNEL, note=drum_note, velocity=vel, time=0)))
-                    events.append((max(0, off_tick), Message("note_off", channel=DRUM_CHANNEL, note=drum_note, velocity=0, time=0)))
+                    events.note_on(max(0, on_tick), DRUM_CHANNEL, drum_note, vel)
+                    events.note_off(max(0, off_tick), DRUM_CHANNEL, drum_note)
 
+        yield events
+
+
+def generate_drums_track(ctrl: Controls, plan: SongPlan):
+    events = EventBuffer()
+    for chunk in iter_drums_bars(ctrl, plan):
+        events.extend(chunk)
     return events
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left
+from array import array
+from itertools import repeat
+from typing import Iterable, Iterator, Sequence
+
+from mido import Message
+
+# Event kinds. The numeric order doubles as the same-tick priority used when
+# sorting: program changes first, then note-offs, then note-ons (no stuck notes).
+KIND_PROGRAM = 0
+KIND_NOTE_OFF = 1
+KIND_NOTE_ON = 2
+
+_KIND_TYPES = ("program_change", "note_off", "note_on")
+
+
+class EventBuffer:
+    """Compact struct-of-arrays buffer of absolute-tick channel events.
+
+    Columns are parallel ``array`` objects: ``tick`` (signed 32-bit), and
+    ``channel``, ``kind``, ``note`` and ``velocity`` (unsigned bytes). For
+    program changes the ``note`` column holds the program number.
+
+    Generators, the reporting layer and the analyzers read the columns
+    directly; ``mido.Message`` objects are only built at the serialization
+    edge (:meth:`message`, :meth:`to_messages`). Iterating a buffer yields
+    ``(tick, Message)`` pairs for callers written against the old list format.
+
+    Generators call :meth:`mark_run` at the start of every bar or segment.
+    Each run is small and nearly sorted, which lets :func:`merge_runs` order
+    the whole song with a k-way merge instead of one global sort.
+    """
+
+    __slots__ = ("tick", "channel", "kind", "note", "velocity", "runs")
+
+    def __init__(self):
+        self.tick = array("i")
+        self.channel = array("B")
+        self.kind = array("B")
+        self.note = array("B")
+        self.velocity = array("B")
+        self.runs = array("i")
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EventBuffer):
+            return NotImplemented
+        return (
+            self.tick == other.tick
+            and self.channel == other.channel
+            and self.kind == other.kind
+            and self.note == other.note
+            and self.velocity == other.velocity
+        )
+
+    def __repr__(self) -> str:
+        return f"EventBuffer({len(self)} events)"
+
+    def __iter__(self) -> Iterator[tuple[int, Message]]:
+        for i in range(len(self.tick)):
+            yield self.tick[i], self.message(i)
+
+    def append(self, tick: int, channel: int, kind: int, note: int, velocity: int) -> None:
+        self.tick.append(tick)
+        self.channel.append(channel)
+        self.kind.append(kind)
+        self.note.append(note)
+        self.velocity.append(velocity)
+
+    def note_on(self, tick: int, channel: int, note: int, velocity: int) -> None:
+        self.append(tick, channel, KIND_NOTE_ON, note, velocity)
+
+    def note_off(self, tick: int, channel: int, note: int) -> None:
+        self.append(tick, channel, KIND_NOTE_OFF, note, 0)
+
+    def program_change(self, tick: int, channel: int, program: int) -> None:
+        self.append(tick, channel, KIND_PROGRAM, program, 0)
+
+    def mark_run(self) -> None:
+        """Start a new run at the current end of the buffer."""
+        n = len(self.tick)
+        if not self.runs or self.runs[-1] != n:
+            self.runs.append(n)
+
+    def run_bounds(self) -> list[tuple[int, int]]:
+        """``(start, end)`` of every non-empty run; unmarked events form one run."""
+        n = len(self.tick)
+        starts = [s for s in self.runs if s < n]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        ends = starts[1:] + [n]
+        return [(a, b) for a, b in zip(starts, ends) if b > a]
+
+    def extend(self, other: "EventBuffer") -> None:
+        offset = len(self.tick)
+        for start in other.run_bounds():
+            self.runs.append(start[0] + offset)
+        self.tick.extend(other.tick)
+        self.channel.extend(other.channel)
+        self.kind.extend(other.kind)
+        self.note.extend(other.note)
+        self.velocity.extend(other.velocity)
+
+    def take(self, indices: Iterable[int]) -> "EventBuffer":
+        """Return a new buffer holding the events at ``indices`` in that order."""
+        out = EventBuffer()
+        tick, channel, kind, note, velocity = self.tick, self.channel, self.kind, self.note, self.velocity
+        for i in indices:
+            out.append(tick[i], channel[i], kind[i], note[i], velocity[i])
+        return out
+
+    def rows(self) -> Iterator[tuple[int, int, int, int, int]]:
+        """Yield ``(tick, channel, kind, note, velocity)`` tuples."""
+        return zip(self.tick, self.channel, self.kind, self.note, self.velocity)
+
+    def note_on_indices(self, channel: int | None = None) -> list[int]:
+        """Indices of sounding note-ons (velocity > 0), optionally for one channel."""
+        kind, velocity, chan = self.kind, self.velocity, self.channel
+        return [
+            i
+            for i in range(len(kind))
+            if kind[i] == KIND_NOTE_ON and velocity[i] > 0 and (channel is None or chan[i] == channel)
+        ]
+
+    def message(self, i: int, time: int = 0) -> Message:
+        k = self.kind[i]
+        if k == KIND_PROGRAM:
+            return Message("program_change", channel=self.channel[i], program=self.note[i], time=time)
+        return Message(_KIND_TYPES[k], channel=self.channel[i], note=self.note[i], velocity=self.velocity[i], time=time)
+
+    def to_messages(self) -> list[tuple[int, Message]]:
+        """Convert to the legacy ``[(abs_tick, Message), ...]`` format."""
+        return list(self)
+
+    @classmethod
+    def from_messages(cls, events: Iterable[tuple[int, Message]]) -> "EventBuffer":
+        """Build a buffer from ``(abs_tick, Message)`` pairs (note on/off, program change)."""
+        out = cls()
+        for tick, msg in events:
+            t = msg.type
+            if t == "note_on":
+                out.append(int(tick), msg.channel, KIND_NOTE_ON, msg.note, msg.velocity)
+            elif t == "note_off":
+                out.append(int(tick), msg.channel, KIND_NOTE_OFF, msg.note, msg.velocity)
+            elif t == "program_change":
+                out.append(int(tick), msg.channel, KIND_PROGRAM, msg.program, 0)
+        return out
+
+
+def _sorted_run(events: EventBuffer, part_no: int, start: int, end: int) -> list[tuple[int, int, int, int]]:
+    return sorted(zip(events.tick[start:end], events.kind[start:end], repeat(part_no), range(start, end)))
+
+
+def merged_chunks(buffers: Sequence[EventBuffer]) -> Iterator[list[tuple[int, int, int, int]]]:
+    """Yield consecutive slices of ``(tick, kind, part_no, index)`` keys in merge order.
+
+    Batch form of :func:`merge_runs` for hot loops that want to avoid a
+    generator round-trip per event.
+    """
+    runs = sorted(
+        (min(buf.tick[a:b]), part_no, a, b)
+        for part_no, buf in enumerate(buffers)
+        for a, b in buf.run_bounds()
+    )
+    n_runs = len(runs)
+    heap: list = []  # (key, position, run keys)
+    next_run = 0
+    while heap or next_run < n_runs:
+        bound = runs[next_run][0] if next_run < n_runs else None
+        if bound is not None and (not heap or bound <= heap[0][0][0]):
+            _, part_no, a, b = runs[next_run]
+            next_run += 1
+            keys = _sorted_run(buffers[part_no], part_no, a, b)
+            heapq.heappush(heap, (keys[0], 0, keys))
+            continue
+
+        _, pos, keys = heap[0]
+        # Gallop: drain the top run up to the smaller of the next run's first
+        # tick and the next-smallest key among the other active runs.
+        stop = len(keys) if bound is None else bisect_left(keys, (bound,), pos)
+        if len(heap) > 1:
+            limit = heap[1][0] if len(heap) == 2 or heap[1][0] < heap[2][0] else heap[2][0]
+            stop = bisect_left(keys, limit, pos, stop)
+        yield keys[pos:stop]
+        pos = stop
+
+        if pos < len(keys):
+            heapq.heapreplace(heap, (keys[pos], pos, keys))
+        else:
+            heapq.heappop(heap)
+
+
+def merge_runs(buffers: Sequence[EventBuffer]) -> Iterator[tuple[int, int, int]]:
+    """Lazily yield ``(tick, part_no, index)`` for every event of ``buffers``.
+
+    Events come out ordered by tick; at equal ticks program changes come
+    first, then note-offs, then note-ons, then part order and insertion
+    order. Each run (see :meth:`EventBuffer.mark_run`) is sorted on its own and
+    the runs are combined with a heap-based k-way merge. A run only enters the
+    heap once the merge reaches its first tick, so the heap holds a handful
+    of runs at a time and nothing is materialized ahead of the output.
+    """
+    for chunk in merged_chunks(buffers):
+        for tick, _, part_no, i in chunk:
+            yield tick, part_no, i
+
+
+def sorted_indices(events: EventBuffer) -> list[int]:
+    """Indices of ``events`` in playback order (see :func:`merge_runs`)."""
+    out: list[int] = []
+    for chunk in merged_chunks((events,)):
+        out.extend([key[3] for key in chunk])
+    return out
+
+
+def iter_delta_stream(buffers: Sequence[EventBuffer]) -> Iterator[tuple[int, int, int]]:
+    """Yield ``(delta_ticks, part_no, index)`` for all parts interleaved, lazily.
+
+    Suitable for type-0 export or feeding a live player without building the
+    merged song first.
+    """
+    last_tick = 0
+    for chunk in merged_chunks(buffers):
+        for tick, _, part_no, i in chunk:
+            yield (tick - last_tick if tick > last_tick else 0), part_no, i
+            last_tick = tick
+
+
+def merge_chunk_stream(chunks: Iterable[Sequence[EventBuffer]]) -> Iterator[tuple[int, EventBuffer, int]]:
+    """Merge a stream of per-bar chunks (one buffer per part) lazily.
+
+    Yields ``(tick, buffer, index)`` in the same order :func:`merge_runs`
+    gives for the concatenated parts. An event is released once a later
+    chunk starts after its tick, so chunks must arrive in order of their
+    earliest tick (true for bar chunks, where humanization moves notes by a
+    few ticks only).
+    """
+    heap: list = []
+    for chunk_no, chunk in enumerate(chunks):
+        first = None
+        for part_no, buf in enumerate(chunk):
+            ticks, kinds = buf.tick, buf.kind
+            for i in range(len(ticks)):
+                heapq.heappush(heap, (ticks[i], kinds[i], part_no, chunk_no, i, buf))
+            if len(ticks):
+                low = min(ticks)
+                first = low if first is None or low < first else first
+        if first is None:
+            continue
+        while heap and heap[0][0] < first:
+            tick, _, _, _, i, buf = heapq.heappop(heap)
+            yield tick, buf, i
+    while heap:
+        tick, _, _, _, i, buf = heapq.heappop(heap)
+        yield tick, buf, i
+
+
+def as_event_buffer(events) -> EventBuffer:
+    """Accept an EventBuffer or a legacy ``[(abs_tick, Message), ...]`` list."""
+    if isinstance(events, EventBuffer):
+        return events
+    return EventBuffer.from_messages(events or [])
@@ -2,20 +2,24 @@ from __future__ import annotations
 
 import random
 import re
-from typing import List, Tuple
+from array import array
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple
 
 from mido import Message
 
 from .constants import GM_PIANO, HARMONY_CH
+from .events import EventBuffer, as_event_buffer, iter_delta_stream
 from .models import ChordSegment, Controls, SongPlan
 from .theory.chords import ChordSpec, harmonic_function, guess_inversion
-from .planning import build_song_plan
-from .theory.voice_leading import initial_voicing, smooth_voice_leading
+from .planning import PHRASE_END, bar_columns, build_song_plan
+from .sampling import cached_sampler
+from .theory.voice_leading import initial_voicing, iter_optimal_voicings, smooth_voice_leading
 from .utils import (
     bar_step_to_abs_tick,
-    chord_tones_in_range,
     scale_pcs,
-    scale_tones_in_range,
+    tones_in_range,
     clamp01,
     clamp,
     lerp,
@@ -35,42 +39,28 @@ from .utils import (
 )
 
 
-def finalize_events(absolute_events: List[Tuple[int, Message]]) -> List[Message]:
-    """Convert a list of (absolute_tick, Message) into MIDI-friendly delta-time messages.
+def finalize_events(absolute_events: EventBuffer | List[Tuple[int, Message]]) -> List[Message]:
+    """Convert absolute-tick events into MIDI-friendly delta-time messages.
 
     MIDO expects *delta* times (time since the previous event) on each message.
-    Internally, most of the generators in this project emit (absolute_tick, msg)
-    pairs because they are easier to compose.
+    Internally, the generators emit absolute-tick events into an
+    :class:`~mind.events.EventBuffer` because they are easier to compose.
+    A legacy list of (absolute_tick, Message) pairs is accepted as well.
 
     This helper makes the output "drop-in ready" for direct insertion into a
-    MidiTrack.
+    MidiTrack; it is the point where Message objects get created.
 
     Ordering: when multiple events share the same tick, we force a stable
-    ordering so note-offs happen before note-ons to avoid stuck notes.
+    ordering so note-offs happen before note-ons to avoid stuck notes. The
+    per-bar runs recorded by the generator are k-way merged rather than
+    sorting the whole list (see :func:`mind.events.merge_runs`).
     """
+    events = as_event_buffer(absolute_events)
+    return [events.message(i, time=delta) for delta, _, i in iter_delta_stream((events,))]
 
-    def _prio(msg: Message) -> int:
-        t = getattr(msg, "type", "")
-        if t == "program_change":
-            return 0
-        if t == "note_off":
-            return 1
-        if t == "note_on":
-            return 2
-        return 3
-
-    absolute_events.sort(key=lambda x: (int(x[0]), _prio(x[1])))
-
-    delta_events: List[Message] = []
-    last_tick = 0
-    for tick, msg in absolute_events:
-        tick_i = int(tick)
-        delta = tick_i - last_tick
-        msg.time = int(max(0, delta))
-        delta_events.append(msg)
-        last_tick = tick_i
-    return delta_events
 
+_ROMAN_RE = re.compile(r"^([b#]*)([ivIV]{1,4})([°o]?)$")
+_ROMAN_DEGREES = {"I": 0, "II": 1, "III": 2, "IV": 3, "V": 4, "VI": 5, "VII": 6}
 
 def _resolve_token_to_chord(tonic_pc: int, mode: str, token, rng: random.Random):
     """
@@ -82,6 +72,9 @@ def _resolve_token_to_chord(tonic_pc: int, mode: str, token, rng: random.Random)
           - secondary dominants: "V/<target>" (e.g. "V/V", "V/ii", "V/5")
           - tritone subs: "subV/<target>" (e.g. "subV/V")
     Returns (root_pc, quality, label, is_borrowed, token_tag)
+
+    The result depends only on (tonic_pc, mode, token); ``rng`` is unused and
+    kept for call compatibility. Hot paths go through :class:`ChordVocabulary`.
     """
     if isinstance(token, int):
         deg = token % 7
@@ -146,14 +139,12 @@ def _resolve_token_to_chord(tonic_pc: int, mode: str, token, rng: random.Random)
     #   - I, ii, V, vi
     #   - bII (handled above) and bVII/bVI/bIII (handled above)
     #   - #iv (rare but supported)
-    roman_re = re.compile(r"^([b#]*)([ivIV]{1,4})([°o]?)$")
-    m = roman_re.match(t)
+    m = _ROMAN_RE.match(t)
     if m:
         acc, roman_raw, dim_mark = m.group(1), m.group(2), m.group(3)
         roman_up = roman_raw.upper()
-        roman_map = {"I": 0, "II": 1, "III": 2, "IV": 3, "V": 4, "VI": 5, "VII": 6}
-        if roman_up in roman_map:
-            deg = roman_map[roman_up]
+        if roman_up in _ROMAN_DEGREES:
+            deg = _ROMAN_DEGREES[roman_up]
             root_pc = degree_to_pc(tonic_pc, mode, deg)
             # accidentals (e.g., bII, #iv)
             semis = acc.count("#") - acc.count("b")
@@ -178,7 +169,33 @@ def _resolve_token_to_chord(tonic_pc: int, mode: str, token, rng: random.Random)
     return root_pc, quality, t, True, f"tok:{t}"
 
 
-def _choose_extension(extension_richness: float, rng: random.Random, section: str, label: str, quality: str) -> str:
+# Extension palettes by richness tier, and the modal-interchange palette.
+_EXTENSIONS_PLAIN = (("triad", 0.70), ("sus2", 0.15), ("sus4", 0.15))
+_EXTENSIONS_LIGHT = (("triad", 0.30), ("add9", 0.45), ("sus2", 0.10), ("sus4", 0.10), ("7", 0.05))
+_EXTENSIONS_MEDIUM = (("triad", 0.18), ("add9", 0.30), ("7", 0.32), ("sus4", 0.10), ("maj9", 0.05), ("min9", 0.05))
+_EXTENSIONS_RICH_DOMINANT = (("7", 0.45), ("dom9", 0.40), ("add9", 0.10), ("sus4", 0.05))
+_EXTENSIONS_RICH = (("7", 0.30), ("maj9", 0.30), ("min9", 0.20), ("add9", 0.15), ("sus2", 0.05))
+
+# Expanded modal interchange palette (major-key defaults).
+# - ♭VII / ♭VI are classic pop/rock mixture
+# - iv is the "sad lift"
+# - ♭II (Neapolitan) adds a cinematic pull
+# - ♭III is a strong color in many modern progressions
+_MIXTURE_PALETTE = (("bVII", 0.45), ("iv", 0.26), ("bVI", 0.12), ("bIII", 0.10), ("bII", 0.07))
+
+_CADENCES_CLASSICAL = (("V_I", 0.55), ("ii_V_I", 0.45))
+_CADENCES_DEFAULT = (("V_I", 0.70), ("IV_I", 0.30))
+_FINAL_TURNAROUNDS = (("V_I", 0.75), ("IV_I", 0.25))
+
+
+def _choose_extension(
+    extension_richness: float,
+    rng: random.Random,
+    section: str,
+    label: str,
+    quality: str,
+    sampling: str = "compat",
+) -> str:
     c = clamp01(extension_richness)
     if section == "chorus":
         c = clamp01(c * 1.15)
@@ -186,17 +203,39 @@ def _choose_extension(extension_richness: float, rng: random.Random, section: st
     is_dominant = (label in ("V", "V/V") or label.startswith("V"))
 
     if c < 0.25:
-        return pick_weighted(rng, [("triad", 0.70), ("sus2", 0.15), ("sus4", 0.15)])
-    if c < 0.55:
-        return pick_weighted(rng, [("triad", 0.30), ("add9", 0.45), ("sus2", 0.10), ("sus4", 0.10), ("7", 0.05)])
-    if c < 0.80:
-        return pick_weighted(rng, [("triad", 0.18), ("add9", 0.30), ("7", 0.32), ("sus4", 0.10), ("maj9", 0.05), ("min9", 0.05)])
-    if is_dominant:
-        return pick_weighted(rng, [("7", 0.45), ("dom9", 0.40), ("add9", 0.10), ("sus4", 0.05)])
-    return pick_weighted(rng, [("7", 0.30), ("maj9", 0.30), ("min9", 0.20), ("add9", 0.15), ("sus2", 0.05)])
+        palette = _EXTENSIONS_PLAIN
+    elif c < 0.55:
+        palette = _EXTENSIONS_LIGHT
+    elif c < 0.80:
+        palette = _EXTENSIONS_MEDIUM
+    elif is_dominant:
+        palette = _EXTENSIONS_RICH_DOMINANT
+    else:
+        palette = _EXTENSIONS_RICH
+    return cached_sampler(palette, sampling).draw(rng)
+
+
+# Chance of adding the 13th (major 6th) as a colour tone, per extension.
+_COLOR_13_PROB = {"maj9": 0.20, "min9": 0.15, "dom9": 0.25}
+
 
+def _extension_variant(extension: str, rng: random.Random, mode: str, label: str) -> tuple[bool, bool]:
+    """The random part of an extension: ``(dominant7, color13)``.
 
-def _build_pcs_with_extension(root_pc: int, quality: str, extension: str, rng: random.Random, mode: str, label: str):
+    Draws from ``rng`` exactly as the voicing rules always have (the
+    dominant-7 coin is only tossed for major-key V chords), so the pure
+    pitch-class lookup after it can be cached.
+    """
+    if extension == "7":
+        dominant7 = (mode == "major" and (label in ("V", "V/V") or label.startswith("V")) and rng.random() < 0.80)
+        return dominant7, False
+    prob = _COLOR_13_PROB.get(extension)
+    if prob is not None:
+        return False, rng.random() < prob
+    return False, False
+
+
+def _extension_pcs(root_pc: int, quality: str, extension: str, dominant7: bool = False, color13: bool = False) -> list[int]:
     base = build_triad(root_pc, quality)
     pcs = base[:]
 
@@ -220,34 +259,77 @@ def _build_pcs_with_extension(root_pc: int, quality: str, extension: str, rng: r
         return unique_pcs(pcs)
 
     if extension == "7":
-        dominant7 = (mode == "major" and (label in ("V", "V/V") or label.startswith("V")) and rng.random() < 0.80)
         pcs = build_seventh(root_pc, quality, dominant7=dominant7)
         return unique_pcs(pcs)
 
-    if extension == "maj9":
-        pcs = build_seventh(root_pc, "maj", dominant7=False)
+    if extension in ("maj9", "min9", "dom9"):
+        if extension == "maj9":
+            pcs = build_seventh(root_pc, "maj", dominant7=False)
+        elif extension == "min9":
+            pcs = build_seventh(root_pc, "min", dominant7=False)
+        else:
+            pcs = build_seventh(root_pc, "maj", dominant7=True)
         pcs = _drop_fifth(pcs) + [(root_pc + 2) % 12]
-        # Optional color tone (13) when things get "lush".
-        if rng.random() < 0.20:
+        # Optional color tone (13) when things get "lush"; dominants love 13s.
+        if color13:
             pcs = pcs + [(root_pc + 9) % 12]
         return unique_pcs(pcs)
 
-    if extension == "min9":
-        pcs = build_seventh(root_pc, "min", dominant7=False)
-        pcs = _drop_fifth(pcs) + [(root_pc + 2) % 12]
-        if rng.random() < 0.15:
-            pcs = pcs + [(root_pc + 9) % 12]
-        return unique_pcs(pcs)
+    return unique_pcs(pcs)
 
-    if extension == "dom9":
-        pcs = build_seventh(root_pc, "maj", dominant7=True)
-        pcs = _drop_fifth(pcs) + [(root_pc + 2) % 12]
-        # Dominants love 13s (and it stays cleaner when the 5th is gone).
-        if rng.random() < 0.25:
-            pcs = pcs + [(root_pc + 9) % 12]
-        return unique_pcs(pcs)
 
-    return unique_pcs(pcs)
+class ChordVocabulary:
+    """Interned chord resolutions for one key, shared by every song in that key.
+
+    Template tokens resolve to the same ``(root_pc, quality, label,
+    is_borrowed, tag)`` tuple every time, and a (root, quality, extension,
+    variant) always voices to the same pitch classes, so both are computed
+    once. Only the deterministic part is cached: callers still make every
+    RNG draw (:func:`_extension_variant`) before looking anything up, so
+    output is identical with or without the cache. Get instances through
+    :func:`chord_vocabulary`.
+    """
+
+    __slots__ = ("tonic_pc", "mode", "_tokens", "_pcs", "_specs")
+
+    def __init__(self, tonic_pc: int, mode: str):
+        self.tonic_pc = tonic_pc
+        self.mode = mode
+        self._tokens: dict = {}
+        self._pcs: dict[tuple, tuple[int, ...]] = {}
+        self._specs: dict[tuple, ChordSpec] = {}
+
+    def resolve(self, token) -> tuple[int, str, str, bool, str]:
+        key = (type(token), token)
+        hit = self._tokens.get(key)
+        if hit is None:
+            hit = self._tokens[key] = _resolve_token_to_chord(self.tonic_pc, self.mode, token, None)
+        return hit
+
+    def pcs(self, root_pc: int, quality: str, extension: str, dominant7: bool = False, color13: bool = False) -> tuple[int, ...]:
+        key = (root_pc, quality, extension, dominant7, color13)
+        hit = self._pcs.get(key)
+        if hit is None:
+            hit = self._pcs[key] = tuple(_extension_pcs(root_pc, quality, extension, dominant7, color13))
+        return hit
+
+    def spec(self, pcs: tuple[int, ...], root_pc: int, quality: str, extension: str, label: str) -> ChordSpec:
+        key = (pcs, root_pc, quality, extension, label)
+        hit = self._specs.get(key)
+        if hit is None:
+            hit = self._specs[key] = ChordSpec(
+                root_pc=root_pc,
+                quality=quality,
+                extension=extension,
+                inversion=guess_inversion(pcs, root_pc),
+                function=harmonic_function(label, quality),
+            )
+        return hit
+
+
+@lru_cache(maxsize=None)
+def chord_vocabulary(tonic_pc: int, mode: str) -> ChordVocabulary:
+    return ChordVocabulary(tonic_pc, mode)
 
 
 def make_chord_segment(
@@ -263,11 +345,12 @@ def make_chord_segment(
     rng: random.Random,
     plan: SongPlan,
 ) -> ChordSegment:
-    mod = plan.bar_mods[bar]
-    chroma_eff = clamp01(ctrl.derived.level2.chromaticism * mod.chord_comp_mul)
-    extension_eff = clamp01(ctrl.derived.level2.extension_richness * mod.chord_comp_mul)
+    columns = bar_columns(plan)
+    chroma_eff = columns.scaled("chord_comp_mul", ctrl.derived.level2.chromaticism)[bar]
+    extension_eff = columns.scaled("chord_comp_mul", ctrl.derived.level2.extension_richness)[bar]
 
-    root_pc, quality, label, is_borrowed, _tok_tag = _resolve_token_to_chord(tonic_pc, ctrl.mode, token, rng)
+    vocab = chord_vocabulary(tonic_pc, ctrl.mode)
+    root_pc, quality, label, is_borrowed, _tok_tag = vocab.resolve(token)
 
     if forced_label is not None:
         label = forced_label
@@ -276,42 +359,20 @@ def make_chord_segment(
         mixture_prob = clamp01(lerp(0.00, 0.18, chroma_eff) * lerp(0.25, 1.00, ctrl.derived.variation))
         mixture_prob *= (1.05 if section in ("bridge", "chorus") else 0.80)
         if (not is_borrowed) and rng.random() < mixture_prob:
-            # Expanded modal interchange palette (major-key defaults).
-            # - ♭VII / ♭VI are classic pop/rock mixture
-            # - iv is the "sad lift"
-            # - ♭II (Neapolitan) adds a cinematic pull
-            # - ♭III is a strong color in many modern progressions
-            choice = pick_weighted(
-                rng,
-                [
-                    ("bVII", 0.45),
-                    ("iv", 0.26),
-                    ("bVI", 0.12),
-                    ("bIII", 0.10),
-                    ("bII", 0.07),
-                ],
-            )
-            root_pc2, quality2, label2, borrowed2, _ = _resolve_token_to_chord(tonic_pc, ctrl.mode, choice, rng)
+            choice = cached_sampler(_MIXTURE_PALETTE, ctrl.sampling).draw(rng)
+            root_pc2, quality2, label2, borrowed2, _ = vocab.resolve(choice)
             root_pc, quality, label, is_borrowed = root_pc2, quality2, label2, borrowed2
 
-    extension = _choose_extension(extension_eff, rng, section, label, quality)
-    pcs = _build_pcs_with_extension(root_pc, quality, extension, rng, ctrl.mode, label)
-    inversion = guess_inversion(pcs, root_pc)
-    function = harmonic_function(label, quality)
-    chord_spec = ChordSpec(
-        root_pc=root_pc,
-        quality=quality,
-        extension=extension,
-        inversion=inversion,
-        function=function,
-    )
+    extension = _choose_extension(extension_eff, rng, section, label, quality, ctrl.sampling)
+    pcs = vocab.pcs(root_pc, quality, extension, *_extension_variant(extension, rng, ctrl.mode, label))
+    chord_spec = vocab.spec(pcs, root_pc, quality, extension, label)
 
     return ChordSegment(
         bar_index=bar,
         start_step=start_step,
         end_step=end_step,
         label=label,
-        pcs=pcs,
+        pcs=list(pcs),
         root_pc=root_pc,
         quality=quality,
         extension=extension,
@@ -322,16 +383,14 @@ def make_chord_segment(
     )
 
 
-def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
-    """
-    Chords-first with seed-driven progression templates + sectioning + pop turnarounds.
-    """
-    if plan is None:
-        plan = build_song_plan(ctrl)
+def iter_chord_bars(ctrl: Controls, plan: SongPlan) -> Iterator[list[ChordSegment]]:
+    """Yield the chord segments of each bar, one list per bar, lazily.
 
+    Chords-first with seed-driven progression templates + sectioning + pop
+    turnarounds. :func:`build_chord_segments` is the eager, flattened form.
+    """
     rng = random.Random(ctrl.seed)
     tonic_pc = key_to_pc(ctrl.key_name)
-    segments: list[ChordSegment] = []
 
     length = max(1, int(ctrl.length_bars))
     style_key = (ctrl.derived.progression_style or "pop").strip().lower()
@@ -345,9 +404,14 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
 
     forced_tokens: dict[int, tuple[object, str | None]] = {}
 
+    columns = bar_columns(plan)
+    chroma_col = columns.scaled("chord_comp_mul", ctrl.derived.level2.chromaticism)
+    extension_col = columns.scaled("chord_comp_mul", ctrl.derived.level2.extension_richness)
+    turnaround_col = columns.scaled("variation_mul", ctrl.derived.level2.turnaround_intensity)
+
     for bar in range(length):
-        mod = plan.bar_mods[bar]
-        section = mod.section
+        section = columns.section(bar)
+        phrase_end = columns.flag(bar, PHRASE_END)
         tpl = plan.templates.get(section) or plan.templates.get("verse")
         degrees = tpl["degrees"]
         tpl_name = tpl["name"]
@@ -358,12 +422,12 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
         if bar in forced_tokens:
             token, forced_label = forced_tokens.pop(bar)
 
-        chroma_eff = clamp01(ctrl.derived.level2.chromaticism * mod.chord_comp_mul)
-        extension_eff = clamp01(ctrl.derived.level2.extension_richness * mod.chord_comp_mul)
-        turnaround_eff = clamp01(ctrl.derived.level2.turnaround_intensity * mod.variation_mul)
+        chroma_eff = chroma_col[bar]
+        extension_eff = extension_col[bar]
+        turnaround_eff = turnaround_col[bar]
 
         do_turnaround = False
-        if mod.is_phrase_end and bar != length - 1:
+        if phrase_end and bar != length - 1:
             do_turnaround = (rng.random() < clamp01(lerp(0.18, 0.80, turnaround_eff)))
 
         cadence_prob = clamp01(lerp(0.20, 0.88, turnaround_eff))
@@ -374,15 +438,15 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
         elif style_key == "classical":
             cadence_prob = clamp01(cadence_prob * 1.20)
 
-        if mod.is_phrase_end and rng.random() < cadence_prob:
+        if phrase_end and rng.random() < cadence_prob:
             cadence_choice = None
             if style_key == "jazz":
                 ii_v_weight = clamp01(lerp(0.40, 0.85, turnaround_eff))
                 cadence_choice = pick_weighted(rng, [("ii_V_I", ii_v_weight), ("V_I", 1.0 - ii_v_weight)])
             elif style_key == "classical":
-                cadence_choice = pick_weighted(rng, [("V_I", 0.55), ("ii_V_I", 0.45)])
+                cadence_choice = cached_sampler(_CADENCES_CLASSICAL, ctrl.sampling).draw(rng)
             else:
-                cadence_choice = pick_weighted(rng, [("V_I", 0.70), ("IV_I", 0.30)])
+                cadence_choice = cached_sampler(_CADENCES_DEFAULT, ctrl.sampling).draw(rng)
 
             if cadence_choice == "ii_V_I":
                 tok1, tok2 = 1, 4
@@ -429,11 +493,11 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
                 rng=rng,
                 plan=plan,
             )
-            segments.extend([seg1, seg2])
+            yield [seg1, seg2]
             continue
 
         if bar == length - 1 and turnaround_eff >= 0.45:
-            cadence_choice = pick_weighted(rng, [("V_I", 0.75), ("IV_I", 0.25)])
+            cadence_choice = cached_sampler(_FINAL_TURNAROUNDS, ctrl.sampling).draw(rng)
             if cadence_choice == "V_I":
                 tok1, tok2 = 4, 0
                 lab1, lab2 = "V", "I"
@@ -467,7 +531,7 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
                 rng=rng,
                 plan=plan,
             )
-            segments.extend([seg1, seg2])
+            yield [seg1, seg2]
             continue
 
         two_prob = base_two_prob
@@ -528,7 +592,7 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
                 rng=rng,
                 plan=plan,
             )
-            segments.extend([seg_main, seg_push])
+            yield [seg_main, seg_push]
             continue
 
         if rng.random() < two_prob:
@@ -576,7 +640,7 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
                 rng=rng,
                 plan=plan,
             )
-            segments.extend([seg1, seg2])
+            yield [seg1, seg2]
         else:
             seg = make_chord_segment(
                 ctrl=ctrl,
@@ -591,11 +655,31 @@ def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
                 rng=rng,
                 plan=plan,
             )
-            segments.append(seg)
+            yield [seg]
+
 
+def build_chord_segments(ctrl: Controls, plan: SongPlan | None = None):
+    """
+    Chords-first with seed-driven progression templates + sectioning + pop turnarounds.
+    """
+    if plan is None:
+        plan = build_song_plan(ctrl)
+
+    segments: list[ChordSegment] = []
+    for bar_segments in iter_chord_bars(ctrl, plan):
+        segments.extend(bar_segments)
     return segments
 
 
+def group_segments_by_bar(chord_segments: Iterable[ChordSegment], length_bars: int) -> list[list[ChordSegment]]:
+    """Split a flat segment list into one list per bar (empty for bars without chords)."""
+    bars: list[list[ChordSegment]] = [[] for _ in range(max(0, length_bars))]
+    for seg in chord_segments:
+        if 0 <= seg.bar_index < len(bars):
+            bars[seg.bar_index].append(seg)
+    return bars
+
+
 def segment_for_step(segments_in_bar: list[ChordSegment], step: int):
     for seg in segments_in_bar:
         if seg.start_step <= step < seg.end_step:
@@ -603,6 +687,88 @@ def segment_for_step(segments_in_bar: list[ChordSegment], step: int):
     return segments_in_bar[0] if segments_in_bar else None
 
 
+STEPS_PER_BAR = 16
+
+
+def bar_step_table(segments_in_bar: list[ChordSegment]) -> list[ChordSegment | None]:
+    """``table[step]`` is :func:`segment_for_step` for each of the 16 steps of one bar."""
+    if not segments_in_bar:
+        return [None] * STEPS_PER_BAR
+    table: list[ChordSegment | None] = [None] * STEPS_PER_BAR
+    for seg in segments_in_bar:
+        for step in range(max(0, seg.start_step), min(STEPS_PER_BAR, seg.end_step)):
+            if table[step] is None:
+                table[step] = seg
+    first = segments_in_bar[0]
+    return [first if seg is None else seg for seg in table]
+
+
+class SegmentIndex:
+    """Bar and step lookups into a song's chord segments, built once per song.
+
+    ``segments`` holds the segments grouped by bar;
+    ``segments[bar_offsets[b]:bar_offsets[b + 1]]`` are the segments of bar
+    ``b`` and ``step_ids[b * 16 + step]`` is the index of the segment
+    :func:`segment_for_step` picks at that step (-1 for a bar without
+    chords). Every lookup is O(1) (or O(result) for ranges), and the index is
+    shared by the part generators and the report builder instead of each
+    re-filtering the flat segment list.
+    """
+
+    __slots__ = ("segments", "length_bars", "bar_offsets", "step_ids")
+
+    def __init__(self, chord_segments: Iterable[ChordSegment], length_bars: int):
+        self.length_bars = max(0, length_bars)
+        self.segments: list[ChordSegment] = []
+        self.bar_offsets = array("i", [0])
+        self.step_ids = array("i")
+        for bar in group_segments_by_bar(chord_segments, self.length_bars):
+            base = len(self.segments)
+            ids = {id(seg): base + i for i, seg in enumerate(bar)}
+            self.segments.extend(bar)
+            self.bar_offsets.append(len(self.segments))
+            self.step_ids.extend(-1 if seg is None else ids[id(seg)] for seg in bar_step_table(bar))
+
+    @classmethod
+    def of(cls, chord_segments: SegmentIndex | Iterable[ChordSegment], length_bars: int) -> SegmentIndex:
+        """``chord_segments`` itself if it already is an index for ``length_bars``, else a new index."""
+        if isinstance(chord_segments, SegmentIndex) and chord_segments.length_bars == max(0, length_bars):
+            return chord_segments
+        return cls(chord_segments, length_bars)
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __iter__(self) -> Iterator[ChordSegment]:
+        return iter(self.segments)
+
+    def bar(self, bar_index: int) -> list[ChordSegment]:
+        if not 0 <= bar_index < self.length_bars:
+            return []
+        return self.segments[self.bar_offsets[bar_index] : self.bar_offsets[bar_index + 1]]
+
+    def bars(self) -> list[list[ChordSegment]]:
+        """One list per bar, like :func:`group_segments_by_bar`."""
+        return [self.bar(b) for b in range(self.length_bars)]
+
+    def between(self, first_bar: int, last_bar: int) -> list[ChordSegment]:
+        """Segments of bars ``first_bar..last_bar`` (inclusive)."""
+        first_bar = max(0, first_bar)
+        last_bar = min(self.length_bars - 1, last_bar)
+        if first_bar > last_bar:
+            return []
+        return self.segments[self.bar_offsets[first_bar] : self.bar_offsets[last_bar + 1]]
+
+    def at(self, bar_index: int, step: int) -> ChordSegment | None:
+        """The segment sounding at ``step`` of ``bar_index`` (see :func:`segment_for_step`)."""
+        if not 0 <= bar_index < self.length_bars:
+            return None
+        if not 0 <= step < STEPS_PER_BAR:
+            return segment_for_step(self.bar(bar_index), step)
+        seg_id = self.step_ids[bar_index * STEPS_PER_BAR + step]
+        return None if seg_id < 0 else self.segments[seg_id]
+
+
 def _initial_harmony_voicing(rng: random.Random, chord_pcs: list[int], low: int, high: int, center: int, voice_count: int):
     return initial_voicing(rng, chord_pcs, low, high, center, voice_count)
 
@@ -611,7 +777,48 @@ def _voice_lead(prev_voicing: list[int], chord_pcs: list[int], low: int, high: i
     return smooth_voice_leading(prev_voicing, chord_pcs, low, high)
 
 
-def generate_harmony_track(ctrl: Controls, chord_segments: list[ChordSegment], plan: SongPlan):
+def _voice_bars_optimally(
+    chord_bars: Iterable[list[ChordSegment]], low: int, high: int, voice_count: int, center: int
+) -> Iterator[tuple[list[ChordSegment], list[list[int]]]]:
+    """Pair each bar with its voicings from the streaming optimal solver.
+
+    Bars are only read as far ahead as the solver's lookahead needs.
+    """
+    bars: deque[list[ChordSegment]] = deque()
+
+    def segment_pcs():
+        for bar in chord_bars:
+            bars.append(bar)
+            yield from (seg.pcs for seg in bar)
+
+    voicings = iter_optimal_voicings(segment_pcs(), low, high, voice_count, center)
+    ready: deque[list[int]] = deque()
+
+    def fill(n: int) -> None:
+        while len(ready) < n:
+            try:
+                ready.append(next(voicings))
+            except StopIteration:
+                return
+
+    while True:
+        if not bars:
+            fill(len(ready) + 1)
+            if not bars:
+                return
+        bar = bars.popleft()
+        fill(len(bar))
+        yield bar, [ready.popleft() for _ in bar]
+
+
+def iter_harmony_bars(ctrl: Controls, chord_bars: Iterable[list[ChordSegment]], plan: SongPlan) -> Iterator[EventBuffer]:
+    """Yield the harmony events of each bar as a separate EventBuffer.
+
+    ``chord_bars`` holds one list of segments per bar (see
+    :func:`iter_chord_bars`) and is consumed lazily. With
+    ``ctrl.voice_leading == "optimal"`` voicings come from the windowed
+    Viterbi solver instead of the greedy chord-to-chord rule.
+    """
     rng = random.Random(ctrl.seed + 101)
     tonic_pc = key_to_pc(ctrl.key_name)
     scale = scale_pcs(tonic_pc, ctrl.mode)
@@ -620,8 +827,8 @@ def generate_harmony_track(ctrl: Controls, chord_segments: list[ChordSegment], p
     low = harmony_base - 10
     high = harmony_base + 14
 
-    events = []
-    events.append((0, Message("program_change", channel=HARMONY_CH, program=GM_PIANO, time=0)))
+    events = EventBuffer()
+    events.program_change(0, HARMONY_CH, GM_PIANO)
 
     voice_count = 3
     if ctrl.derived.level2.extension_richness >= 0.55:
@@ -631,69 +838,91 @@ def generate_harmony_track(ctrl: Controls, chord_segments: list[ChordSegment], p
 
     prev_voicing: list[int] = []
 
-    for seg in chord_segments:
-        mod = plan.bar_mods[seg.bar_index]
-
-        density_eff = clamp01(ctrl.derived.density * mod.density_mul)
-        energy_eff = clamp01(ctrl.derived.energy * mod.energy_mul)
-
-        chord_notes = chord_tones_in_range(seg.pcs, low, high)
-        if not chord_notes:
-            chord_notes = scale_tones_in_range(scale, low, high)
-        if not chord_notes:
-            chord_notes = [harmony_base]
-
-        if not prev_voicing:
-            voicing = _initial_harmony_voicing(rng, seg.pcs, low, high, harmony_base, voice_count)
-            if not voicing:
-                voicing = sorted(set(chord_notes))[:voice_count]
-        else:
-            voicing = _voice_lead(prev_voicing, seg.pcs, low, high)
-            if not voicing:
-                voicing = prev_voicing[:]
+    if ctrl.voice_leading == "optimal":
+        voiced_bars = _voice_bars_optimally(chord_bars, low, high, voice_count, harmony_base)
+    else:
+        voiced_bars = ((bar, None) for bar in chord_bars)
+
+    columns = bar_columns(plan)
+    density_col = columns.scaled("density_mul", ctrl.derived.density)
+    energy_col = columns.scaled("energy_mul", ctrl.derived.energy)
+
+    for bar_segments, planned in voiced_bars:
+        for seg_index, seg in enumerate(bar_segments):
+            events.mark_run()
+            section = columns.section(seg.bar_index)
+            phrase_end = columns.flag(seg.bar_index, PHRASE_END)
+
+            density_eff = density_col[seg.bar_index]
+            energy_eff = energy_col[seg.bar_index]
+
+            chord_notes = tones_in_range(seg.pcs, low, high)
+            if not chord_notes:
+                chord_notes = tones_in_range(scale, low, high)
+            if not chord_notes:
+                chord_notes = (harmony_base,)
+
+            if planned is not None:
+                voicing = planned[seg_index] or prev_voicing[:] or sorted(set(chord_notes))[:voice_count]
+            elif not prev_voicing:
+                voicing = _initial_harmony_voicing(rng, seg.pcs, low, high, harmony_base, voice_count)
+                if not voicing:
+                    voicing = sorted(set(chord_notes))[:voice_count]
+            else:
+                voicing = _voice_lead(prev_voicing, seg.pcs, low, high)
+                if not voicing:
+                    voicing = prev_voicing[:]
 
-        prev_voicing = voicing[:]
+            prev_voicing = voicing[:]
 
-        seg_start = bar_step_to_abs_tick(seg.bar_index, seg.start_step)
-        seg_end = bar_step_to_abs_tick(seg.bar_index, seg.end_step)
+            seg_start = bar_step_to_abs_tick(seg.bar_index, seg.start_step)
+            seg_end = bar_step_to_abs_tick(seg.bar_index, seg.end_step)
 
-        base_vel = int(round(lerp(52, 88, energy_eff)))
+            base_vel = int(round(lerp(52, 88, energy_eff)))
 
-        pulse_prob = clamp01(lerp(0.10, 0.68, density_eff))
-        if mod.section == "chorus":
-            pulse_prob = clamp01(pulse_prob * 1.15)
+            pulse_prob = clamp01(lerp(0.10, 0.68, density_eff))
+            if section == "chorus":
+                pulse_prob = clamp01(pulse_prob * 1.15)
 
-        do_pulse = (rng.random() < pulse_prob)
+            do_pulse = (rng.random() < pulse_prob)
 
-        if not do_pulse:
-            on_tick = seg_start + apply_swing_to_step(seg.start_step, ctrl.derived.swing) + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
-            off_tick = seg_end
-            for n in voicing:
-                vel = velocity_humanize(rng, base_vel, ctrl.derived.humanize_velocity)
-                events.append((max(0, on_tick), Message("note_on", channel=HARMONY_CH, note=n, velocity=vel, time=0)))
-            for n in voicing:
-                events.append((max(0, off_tick), Message("note_off", channel=HARMONY_CH, note=n, velocity=0, time=0)))
-        else:
-            ticks_per_beat = 480
-            ticks_per_8th = 240
-            start_tick = seg_start
-            end_tick = seg_end
-
-            use_8ths = (mod.is_phrase_end and rng.random() < lerp(0.10, 0.45, ctrl.derived.variation))
-            pulse_step = ticks_per_8th if use_8ths else ticks_per_beat
-            pulse_len = ticks_per_8th
-
-            t = start_tick
-            while t < end_tick:
-                on_tick = t + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
-                off_tick = min(end_tick, on_tick + pulse_len)
+            if not do_pulse:
+                on_tick = seg_start + apply_swing_to_step(seg.start_step, ctrl.derived.swing) + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
+                off_tick = seg_end
                 for n in voicing:
                     vel = velocity_humanize(rng, base_vel, ctrl.derived.humanize_velocity)
-                    events.append((max(0, on_tick), Message("note_on", channel=HARMONY_CH, note=n, velocity=vel, time=0)))
+                    events.note_on(max(0, on_tick), HARMONY_CH, n, vel)
                 for n in voicing:
-                    events.append((max(0, off_tick), Message("note_off", channel=HARMONY_CH, note=n, velocity=0, time=0)))
-                t += pulse_step
-
+                    events.note_off(max(0, off_tick), HARMONY_CH, n)
+            else:
+                ticks_per_beat = 480
+                ticks_per_8th = 240
+                start_tick = seg_start
+                end_tick = seg_end
+
+                use_8ths = (phrase_end and rng.random() < lerp(0.10, 0.45, ctrl.derived.variation))
+                pulse_step = ticks_per_8th if use_8ths else ticks_per_beat
+                pulse_len = ticks_per_8th
+
+                t = start_tick
+                while t < end_tick:
+                    on_tick = t + humanize_ticks(rng, ctrl.derived.humanize_timing_ms, ctrl.bpm)
+                    off_tick = min(end_tick, on_tick + pulse_len)
+                    for n in voicing:
+                        vel = velocity_humanize(rng, base_vel, ctrl.derived.humanize_velocity)
+                        events.note_on(max(0, on_tick), HARMONY_CH, n, vel)
+                    for n in voicing:
+                        events.note_off(max(0, off_tick), HARMONY_CH, n)
+                    t += pulse_step
+
+        yield events
+        events = EventBuffer()
+
+
+def generate_harmony_track(ctrl: Controls, chord_segments: list[ChordSegment] | SegmentIndex, plan: SongPlan):
+    events = EventBuffer()
+    for chunk in iter_harmony_bars(ctrl, SegmentIndex.of(chord_segments, ctrl.length_bars).bars(), plan):
+        events.extend(chunk)
     return events
 
 
@@ -2,88 +2,134 @@ from __future__ import annotations
 
 import math
 import random
-
-from mido import Message
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, NamedTuple
 
 from .constants import GM_EPIANO, MELODY_CH
+from .events import EventBuffer
 from .models import ChordSegment, Controls, SongPlan
-from .harmony import segment_for_step
+from .harmony import SegmentIndex, bar_step_table
+from .motif_store import ANY_CONTOUR, CONTOUR_CLASSES, Motif, MotifStore, chord_shape, motif_from_bar, rhythm_mask
+from .pcset import notes_in_range, pcs_mask
+from .planning import PHRASE_END, bar_columns, contour_offset
+from .sampling import WeightedSampler, cached_sampler
 from .utils import (
     bar_step_to_abs_tick,
-    chord_tones_in_range,
     scale_pcs,
-    scale_tones_in_range,
     clamp01,
     clamp,
     lerp,
-    pick_weighted,
     apply_swing_to_step,
     humanize_ticks,
     velocity_humanize,
     key_to_pc,
     choose_register_base,
-    nearest_in_set,
+    nearest_in_sorted,
     derive_groove_sync,
 )
 
 
-def contour_offset(contour, bar_index: int, length_bars: int) -> float:
-    if length_bars <= 1:
-        return 0.0
+class MelodyPools(NamedTuple):
+    """Note candidates of one chord within one register window (all ascending)."""
 
-    t = bar_index / max(1, length_bars - 1)
-    intensity = contour.intensity
+    chord: tuple[int, ...]
+    scale: tuple[int, ...]
+    approach: tuple[tuple[int, int], ...]  # (below, above) neighbour of each chord tone, clamped to the window
 
-    if contour.kind == "arch":
-        val = 1.0 - (2.0 * (t - 0.5)) ** 2
-        return lerp(-1.5, +4.0, clamp01(val)) * intensity
-    if contour.kind == "descending":
-        return lerp(+4.0, -2.0, t) * intensity
-    if contour.kind == "ascending":
-        return lerp(-2.0, +4.0, t) * intensity
-    if contour.kind == "wave":
-        val = math.sin(2.0 * math.pi * (t * 2.0))
-        return (val * 3.0) * intensity
-    if contour.kind == "plateau":
-        return (lerp(0.0, 2.0, clamp01((t - 0.65) / 0.35))) * intensity
 
-    return 0.0
+@lru_cache(maxsize=4096)
+def melody_pools(chord_mask: int, scale_mask: int, low: int, high: int) -> MelodyPools:
+    """Candidate pools for a chord (``chord_mask``) over a scale, shared by every note that uses them."""
+    chord = notes_in_range(chord_mask, low, high)
+    approach = tuple((clamp(n - 1, low, high), clamp(n + 1, low, high)) for n in chord)
+    return MelodyPools(chord, notes_in_range(scale_mask, low, high), approach)
 
 
-def generate_melody_track(
+_CONTOUR_ASCENDING = CONTOUR_CLASSES.index("ascending")
+_CONTOUR_DESCENDING = CONTOUR_CLASSES.index("descending")
+
+# Motif transpositions in a chorus, and note lengths (in steps) for dense / sparse bars.
+_CHORUS_TRANSPOSITIONS = ((0, 0.55), (2, 0.20), (-2, 0.20), (5, 0.05))
+_DENSE_DURATIONS = ((1, 0.38), (2, 0.50), (4, 0.10), (6, 0.02))
+_SPARSE_DURATIONS = ((2, 0.45), (4, 0.40), (1, 0.10), (6, 0.05))
+
+
+# Step class of each of the 16 steps: downbeat, offbeat 8th, offbeat 16th.
+_STEP_CLASSES = tuple(0 if s % 4 == 0 else 1 if s % 2 == 0 else 2 for s in range(16))
+_DOWNBEAT_WEIGHTS = (2.9, 2.9 * 1.05)  # verse, chorus
+
+
+def _step_sampler(offbeat_prob: float, chorus: bool, sampling: str) -> WeightedSampler:
+    """Onset weights of the 16 steps of a bar (downbeats > 8ths > 16ths).
+
+    The step layout and downbeat weight are fixed; only the two offbeat
+    class weights depend on the bar.
+    """
+    off8 = lerp(0.9, 2.3, offbeat_prob)
+    if chorus:
+        off8 *= 1.05
+    class_weights = (_DOWNBEAT_WEIGHTS[chorus], off8, lerp(0.55, 1.75, offbeat_prob))
+    return WeightedSampler(zip(range(16), [class_weights[c] for c in _STEP_CLASSES]), sampling)
+
+
+def iter_melody_bars(
     ctrl: Controls,
-    chord_segments: list[ChordSegment],
+    chord_bars: Iterable[list[ChordSegment]],
     plan: SongPlan,
     style: str | None = None,
-):
-    rng = random.Random(ctrl.seed + 303)
+    seed: int | None = None,
+    motif_store: MotifStore | None = None,
+    motif_sink: Callable[[Motif | None], None] | None = None,
+) -> Iterator[EventBuffer]:
+    """Yield the melody events of each bar as a separate EventBuffer.
+
+    Reads one bar of ``chord_bars`` ahead of the bar being generated, for the
+    pickup into the next phrase. ``seed`` replaces ``ctrl.seed`` for the
+    melody's own random stream (everything else stays as ``ctrl`` says).
+
+    With a ``motif_store``, a bar whose rhythm and chord shape match a stored
+    motif re-voices that motif over the bar's chord instead of searching
+    note by note. ``motif_sink`` receives the motif of every bar generated
+    (see :mod:`mind.motif_store`).
+    """
+    rng = random.Random((ctrl.seed if seed is None else seed) + 303)
     tonic_pc = key_to_pc(ctrl.key_name)
     scale = scale_pcs(tonic_pc, ctrl.mode)
+    scale_mask = pcs_mask(scale)
     style_key = (style or ctrl.derived.progression_style or "pop").strip().lower()
     groove_level, sync_base = derive_groove_sync(ctrl.derived.level2, plan.rhythm.archetype)
     anchor_strength = clamp01(ctrl.derived.level2.chord_tone_anchoring)
 
     melody_base, _, _ = choose_register_base()
 
-    events = []
-    events.append((0, Message("program_change", channel=MELODY_CH, program=GM_EPIANO, time=0)))
+    events = EventBuffer()
+    events.program_change(0, MELODY_CH, GM_EPIANO)
 
     motif_len_bars = 2
     motif_cache: list[tuple[int, int, int, int, int]] | None = None  # (bar_in_motif, step, note, dur, vel)
 
+    columns = bar_columns(plan)
+    density_col = columns.scaled("density_mul", ctrl.derived.density * lerp(0.85, 1.12, groove_level))
+    energy_col = columns.scaled("energy_mul", ctrl.derived.energy)
+    sync_col = columns.scaled("sync_mul", sync_base)
+    variation_col = columns.scaled("variation_mul", ctrl.derived.variation)
+    repetition_col = columns.scaled("repetition_mul", ctrl.derived.repetition)
+
     def bar_density_energy_sync(bar_index: int):
-        mod = plan.bar_mods[bar_index]
-        density_eff = clamp01(ctrl.derived.density * lerp(0.85, 1.12, groove_level) * mod.density_mul)
-        energy_eff = clamp01(ctrl.derived.energy * mod.energy_mul)
-        sync_eff = clamp01(sync_base * mod.sync_mul)
-        variation_eff = clamp01(ctrl.derived.variation * mod.variation_mul)
-        repetition_eff = clamp01(ctrl.derived.repetition * mod.repetition_mul)
-        return mod, density_eff, energy_eff, sync_eff, variation_eff, repetition_eff
-
-    def build_bar_notes(bar_index: int):
+        return (
+            density_col[bar_index],
+            energy_col[bar_index],
+            sync_col[bar_index],
+            variation_col[bar_index],
+            repetition_col[bar_index],
+        )
+
+    def build_bar_notes(bar_index: int, segs: list[ChordSegment], next_segs: list[ChordSegment]):
         nonlocal motif_cache
 
-        mod, density_eff, energy_eff, sync_eff, variation_eff, repetition_eff = bar_density_energy_sync(bar_index)
+        density_eff, energy_eff, sync_eff, variation_eff, repetition_eff = bar_density_energy_sync(bar_index)
+        chorus = columns.section(bar_index) == "chorus"
+        phrase_end = columns.flag(bar_index, PHRASE_END)
 
         motif_reuse_prob = clamp01(repetition_eff)
         if style_key == "pop":
@@ -92,26 +138,25 @@ def generate_melody_track(
             motif_reuse_prob = clamp01(motif_reuse_prob * 0.70)
         elif style_key == "classical":
             motif_reuse_prob = clamp01(motif_reuse_prob * 0.95 + 0.02)
-        if mod.section == "chorus":
+        if chorus:
             motif_reuse_prob = clamp01(motif_reuse_prob * 0.85 + 0.05)
 
         if motif_cache is not None and rng.random() < motif_reuse_prob:
             bar_in_motif = (bar_index % motif_len_bars)
             motif_events = [e for e in motif_cache if e[0] == bar_in_motif]
-            if mod.section == "chorus" and rng.random() < lerp(0.12, 0.35, variation_eff):
-                transpose = pick_weighted(rng, [(0, 0.55), (2, 0.20), (-2, 0.20), (5, 0.05)])
+            if chorus and rng.random() < lerp(0.12, 0.35, variation_eff):
+                transpose = cached_sampler(_CHORUS_TRANSPOSITIONS, ctrl.sampling).draw(rng)
                 adjusted = []
                 for e in motif_events:
                     adjusted.append((e[0], e[1], e[2] + transpose, e[3], e[4]))
                 return adjusted
             return motif_events
 
-        segs = [s for s in chord_segments if s.bar_index == bar_index]
         if not segs:
             return []
 
-        contour_off = contour_offset(plan.contour, bar_index, ctrl.length_bars)
-        center_shift = mod.melody_shift_semitones + contour_off
+        contour_off = columns.contour_offset(bar_index)
+        center_shift = columns.melody_shift[bar_index] + contour_off
         center = int(round(melody_base + center_shift))
 
         range_semitones = int(round(lerp(8, 15, (energy_eff * 0.55 + variation_eff * 0.45))))
@@ -128,32 +173,12 @@ def generate_melody_track(
             offbeat_prob = clamp01(offbeat_prob - 0.12)
 
         prefer_step_prob = clamp01(lerp(0.82, 0.50, variation_eff))
-        if mod.section == "chorus":
+        if chorus:
             prefer_step_prob = clamp01(prefer_step_prob * 1.05)
         if style_key == "classical":
             prefer_step_prob = clamp01(prefer_step_prob + 0.12)
 
-        candidates = list(range(0, 16))
-        weighted = []
-        for s in candidates:
-            is_strong = (s in (0, 4, 8, 12))
-            is_off8 = (s in (2, 6, 10, 14))
-            w = 1.0
-            if is_strong:
-                w *= 2.9
-            elif is_off8:
-                w *= lerp(0.9, 2.3, offbeat_prob)
-            else:
-                w *= lerp(0.55, 1.75, offbeat_prob)
-            if mod.section == "chorus" and (s % 2 == 0):
-                w *= 1.05
-            weighted.append((s, w))
-
-        chosen_steps = []
-        while len(chosen_steps) < notes_per_bar and weighted:
-            s = pick_weighted(rng, weighted)
-            if s not in chosen_steps:
-                chosen_steps.append(s)
+        chosen_steps = _step_sampler(offbeat_prob, chorus, ctrl.sampling).sample(rng, notes_per_bar)
         chosen_steps = sorted(chosen_steps)
 
         bar_notes = []
@@ -164,35 +189,54 @@ def generate_melody_track(
             wobble = math.sin(math.pi * t_in_bar) * 2.0
             return center + int(round(wobble * plan.contour.intensity * 0.55))
 
+        # Pools per chord of this bar (and register window), indexed by step.
+        pools_by_seg = {id(seg): melody_pools(pcs_mask(seg.pcs), scale_mask, low, high) for seg in segs}
+        step_pools = [pools_by_seg[id(seg)] for seg in bar_step_table(segs)]
+
+        stored = None
+        if motif_store is not None:
+            slope = contour_offset(plan.contour, bar_index + 1, ctrl.length_bars) - contour_off
+            contour = _CONTOUR_ASCENDING if slope > 0.5 else _CONTOUR_DESCENDING if slope < -0.5 else ANY_CONTOUR
+            shape = chord_shape(segs[0].pcs, segs[0].root_pc)
+            stored = motif_store.pick(rng, rhythm_mask(chosen_steps), shape, contour)
+        if stored is not None:
+            # Re-voice the stored intervals from the chord root nearest below the centre,
+            # snapped to chord tones on the beat and to the scale elsewhere.
+            ref = center - (center - segs[0].root_pc) % 12
+            for s, interval, dur_steps, vel in stored.notes:
+                pools = step_pools[s]
+                on_beat = s % 4 == 0 and pools.chord
+                note = nearest_in_sorted(ref + interval, pools.chord if on_beat else (pools.scale or pools.chord))
+                bar_notes.append((0, s, note, dur_steps, velocity_humanize(rng, vel, ctrl.derived.humanize_velocity)))
+            chosen_steps = []  # nothing left to search note by note
         for s in chosen_steps:
-            seg = segment_for_step(segs, s)
-            chord_pcs = seg.pcs if seg else scale
-
-            chord_tones = chord_tones_in_range(chord_pcs, low, high)
-            scale_tones = scale_tones_in_range(scale, low, high)
+            pools = step_pools[s]
+            chord_tones = pools.chord
+            scale_tones = pools.scale
 
             is_strong = (s in (0, 4, 8, 12))
             is_offbeat = (s in (2, 6, 10, 14))
             strong_anchor_prob = lerp(0.35, 0.95, anchor_strength)
             weak_anchor_prob = lerp(0.10, 0.50, anchor_strength)
-            choose_from = scale_tones if scale_tones else chord_tones
+            # Candidate pools, searched as if concatenated (see nearest_in_sorted).
+            choose_from = (scale_tones,) if scale_tones else (chord_tones,)
             if is_strong and chord_tones and rng.random() < strong_anchor_prob:
-                choose_from = chord_tones
+                choose_from = (chord_tones,)
             elif (not is_strong) and chord_tones and rng.random() < weak_anchor_prob:
-                choose_from = chord_tones + (scale_tones if scale_tones else [])
+                choose_from = (chord_tones, scale_tones)
             if style_key == "pop" and s in (0, 8) and chord_tones:
-                choose_from = chord_tones
+                choose_from = (chord_tones,)
             if style_key == "jazz" and is_offbeat and chord_tones:
-                choose_from = chord_tones + scale_tones
-            if style_key == "classical" and mod.is_phrase_end and chord_tones:
-                choose_from = chord_tones
-            if not choose_from:
-                choose_from = [center]
+                choose_from = (chord_tones, scale_tones)
+            if style_key == "classical" and phrase_end and chord_tones:
+                choose_from = (chord_tones,)
+            if not any(choose_from):
+                choose_from = ((center,),)
 
             tgt = step_target(s)
 
             if last_note is None:
-                note = nearest_in_set(tgt, choose_from)
+                note = nearest_in_sorted(tgt, *choose_from)
             else:
                 chroma_prob = 0.0
                 if style_key == "jazz" and is_offbeat:
@@ -203,18 +247,17 @@ def generate_melody_track(
                     chroma_prob = 0.02
 
                 if chroma_prob > 0.0 and chord_tones and rng.random() < chroma_prob:
-                    approach = rng.choice(chord_tones)
-                    direction = rng.choice([-1, 1])
-                    note = clamp(approach + direction, low, high)
+                    # A chord tone, then below (-1) or above (+1) it: the same two draws.
+                    note = rng.choice(rng.choice(pools.approach))
                 elif rng.random() < prefer_step_prob:
-                    if style_key == "classical" and mod.is_phrase_end and chord_tones:
-                        cadence_target = nearest_in_set(tgt, chord_tones)
+                    if style_key == "classical" and phrase_end and chord_tones:
+                        cadence_target = nearest_in_sorted(tgt, chord_tones)
                         step_dir = 2 if (cadence_target >= last_note) else -2
                     else:
                         step_dir = 2 if (tgt >= last_note) else -2
                     target = last_note + step_dir
                     target = int(round(lerp(target, tgt, 0.35)))
-                    note = nearest_in_set(target, choose_from)
+                    note = nearest_in_sorted(target, *choose_from)
                 else:
                     if style_key == "classical":
                         leap = rng.choice([3, 4, -3, -4, 5, -5])
@@ -222,17 +265,17 @@ def generate_melody_track(
                         leap = rng.choice([4, 5, 7, -4, -5, -7, 9, -9])
                     target = last_note + leap
                     target = int(round(lerp(target, tgt, 0.50)))
-                    note = nearest_in_set(target, choose_from)
+                    note = nearest_in_sorted(target, *choose_from)
 
             if last_note is not None and note == last_note and repetition_eff < 0.55:
-                note = nearest_in_set(note + (2 if rng.random() < 0.5 else -2), choose_from)
+                note = nearest_in_sorted(note + (2 if rng.random() < 0.5 else -2), *choose_from)
 
             last_note = note
 
             if density_eff > 0.62:
-                dur_steps = pick_weighted(rng, [(1, 0.38), (2, 0.50), (4, 0.10), (6, 0.02)])
+                dur_steps = cached_sampler(_DENSE_DURATIONS, ctrl.sampling).draw(rng)
             else:
-                dur_steps = pick_weighted(rng, [(2, 0.45), (4, 0.40), (1, 0.10), (6, 0.05)])
+                dur_steps = cached_sampler(_SPARSE_DURATIONS, ctrl.sampling).draw(rng)
 
             base_vel = int(round(lerp(55, 98, energy_eff)))
             if is_strong:
@@ -243,18 +286,19 @@ def generate_melody_track(
 
             bar_notes.append((0, s, note, dur_steps, vel))
 
-        if mod.is_phrase_end and bar_index != ctrl.length_bars - 1:
+        if motif_sink is not None:
+            # Recorded before the pickup, which belongs to the next chord.
+            motif_sink(motif_from_bar(bar_notes, segs[0].root_pc, segs[0].pcs))
+
+        if phrase_end and bar_index != ctrl.length_bars - 1:
             if rng.random() < clamp01(lerp(0.12, 0.55, variation_eff) * lerp(0.65, 1.25, sync_eff)):
-                next_bar = bar_index + 1
-                next_segs = [s for s in chord_segments if s.bar_index == next_bar]
                 next_chord = next_segs[0].pcs if next_segs else scale
-                next_choices = chord_tones_in_range(next_chord, low, high)
-                if not next_choices:
-                    next_choices = scale_tones_in_range(scale, low, high)
+                next_pools = melody_pools(pcs_mask(next_chord), scale_mask, low, high)
+                next_choices = next_pools.chord or next_pools.scale
                 if next_choices:
                     pickup_step = 14 if rng.random() < 0.65 else 15
                     tgt2 = step_target(pickup_step) + 2
-                    pickup_note = nearest_in_set(tgt2, next_choices)
+                    pickup_note = nearest_in_sorted(tgt2, next_choices)
                     pickup_vel = velocity_humanize(rng, int(lerp(60, 105, energy_eff)), ctrl.derived.humanize_velocity)
                     bar_notes.append((0, pickup_step, pickup_note, 1, pickup_vel))
                     bar_notes = sorted(bar_notes, key=lambda x: x[1])
@@ -266,8 +310,12 @@ def generate_melody_track(
 
         return bar_notes
 
+    chord_iter = iter(chord_bars)
+    next_segs = next(chord_iter, [])
     for bar in range(ctrl.length_bars):
-        bar_events = build_bar_notes(bar)
+        segs = next_segs
+        next_segs = next(chord_iter, []) if bar + 1 < ctrl.length_bars else []
+        bar_events = build_bar_notes(bar, segs, next_segs)
         for _, step, note, dur_steps, vel in bar_events:
             on_tick = bar_step_to_abs_tick(bar, step)
             on_tick += apply_swing_to_step(step, ctrl.derived.swing)
@@ -276,7 +324,25 @@ def generate_melody_track(
             off_step = min(16, step + dur_steps)
             off_tick = bar_step_to_abs_tick(bar, off_step)
 
-            events.append((max(0, on_tick), Message("note_on", channel=MELODY_CH, note=note, velocity=vel, time=0)))
-            events.append((max(0, off_tick), Message("note_off", channel=MELODY_CH, note=note, velocity=0, time=0)))
+            events.note_on(max(0, on_tick), MELODY_CH, note, vel)
+            events.note_off(max(0, off_tick), MELODY_CH, note)
+
+        yield events
+        events = EventBuffer()
 
+
+def generate_melody_track(
+    ctrl: Controls,
+    chord_segments: list[ChordSegment] | SegmentIndex,
+    plan: SongPlan,
+    style: str | None = None,
+    seed: int | None = None,
+    motif_store: MotifStore | None = None,
+    motif_sink: Callable[[Motif | None], None] | None = None,
+):
+    events = EventBuffer()
+    chord_bars = SegmentIndex.of(chord_segments, ctrl.length_bars).bars()
+    chunks = iter_melody_bars(ctrl, chord_bars, plan, style=style, seed=seed, motif_store=motif_store, motif_sink=motif_sink)
+    for chunk in chunks:
+        events.extend(chunk)
     return events
@@ -0,0 +1,251 @@
+"""Best-of-N melody search.
+
+Generates several melodies for one song (the song's own melody plus
+``candidates - 1`` re-seeded ones), scores every phrase of each with the
+theory analyzers and splices the best phrase of every candidate together:
+
+    result = search_melody(ctrl, plan, segments, harmony, MelodySearch(candidates=8), parallel=True)
+    result.events                     # the spliced melody
+    result.summary()                  # per-phrase choices and costs
+
+A melody note never sounds past the end of its bar, so phrases can be
+swapped between candidates at bar boundaries. Lower cost is better:
+
+- melodic cost (:func:`melodic_cost`, from ``analyze_melody_events``):
+  distance from a target stepwise ratio, leaps beyond a share of the
+  intervals, climax placement and repeated climax notes. A phrase with a
+  leap wider than :data:`MAX_LEAP` fails this cheap check outright.
+- counterpoint cost (from ``analyze_counterpoint`` against the harmony):
+  parallel fifths/octaves and voice crossings.
+
+Counterpoint cost is never negative, so a candidate whose melodic cost
+alone is no better than the best total so far is pruned without running
+the counterpoint analysis.
+"""
+from __future__ import annotations
+
+import math
+import os
+import time
+from bisect import bisect_left
+from concurrent.futures import Executor, ProcessPoolExecutor, TimeoutError, as_completed
+from dataclasses import dataclass
+from typing import Any
+
+from .constants import PPQ
+from .events import EventBuffer, as_event_buffer
+from .harmony import SegmentIndex
+from .melody import iter_melody_bars
+from .models import ChordSegment, Controls, SongPlan
+from .planning import PHRASE_END, bar_columns
+from .theory.counterpoint import analyze_counterpoint
+from .theory.melody_analysis import analyze_melody_events
+
+SEED_STRIDE = 7919  # seed offset between candidates
+
+STEPWISE_TARGET = 0.65
+STEPWISE_WEIGHT = 4.0
+MAX_LEAP_SHARE = 0.35  # leaps beyond this share of the intervals cost LEAP_WEIGHT each
+LEAP_WEIGHT = 0.5
+MAX_LEAP = 12  # semitones; a wider leap fails the cheap check
+CLIMAX_TARGET = 0.70  # preferred position of the phrase's highest note (0 = first note, 1 = last)
+CLIMAX_WEIGHT = 2.0
+CLIMAX_REPEAT_PENALTY = 0.5  # per extra occurrence of the highest note
+SPARSE_PHRASE_COST = 5.0  # fewer than two notes
+PARALLEL_PENALTY = 1.5  # per parallel fifth or octave
+CROSSING_PENALTY = 0.25  # per voice crossing
+
+
+@dataclass(frozen=True)
+class MelodySearch:
+    """Search budget: up to ``candidates`` melodies, and at most ``time_budget``
+    seconds spent generating them (``None``: no time limit).
+
+    The song's own melody is always generated, so the search never returns
+    less than that. With a time budget the result depends on machine speed.
+    """
+
+    candidates: int = 8
+    time_budget: float | None = None
+
+
+@dataclass
+class MelodySearchResult:
+    events: EventBuffer
+    phrases: list[tuple[int, int]]  # (first bar, end bar) of each phrase
+    phrase_seeds: list[int]  # seed of the candidate chosen for each phrase
+    phrase_costs: list[float]
+    candidates: int  # melodies generated
+    pruned: int  # phrase scorings cut short by the bound
+    rejected: int  # phrase scorings that failed the cheap checks
+    seconds: float = 0.0
+
+    def summary(self) -> dict[str, Any]:
+        """JSON-serializable description of the search."""
+        return {
+            "candidates": self.candidates,
+            "pruned": self.pruned,
+            "rejected": self.rejected,
+            "seconds": round(self.seconds, 4),
+            "phrases": [
+                {"bars": [start, end], "seed": seed, "cost": None if math.isinf(cost) else round(cost, 4)}
+                for (start, end), seed, cost in zip(self.phrases, self.phrase_seeds, self.phrase_costs)
+            ],
+        }
+
+
+def phrase_spans(plan: SongPlan, length_bars: int) -> list[tuple[int, int]]:
+    """``(first bar, end bar)`` of each phrase, from the plan's phrase ends."""
+    columns = bar_columns(plan)
+    spans = []
+    start = 0
+    for b in range(length_bars):
+        if columns.flag(b, PHRASE_END):
+            spans.append((start, b + 1))
+            start = b + 1
+    if start < length_bars:
+        spans.append((start, length_bars))
+    return spans
+
+
+def _pitches(events: EventBuffer) -> list[int]:
+    ticks, notes = events.tick, events.note
+    return [notes[i] for i in sorted(events.note_on_indices(), key=lambda i: ticks[i])]
+
+
+def melodic_cost(events: EventBuffer | list) -> float:
+    """Cost of one phrase on its own (``math.inf`` when it fails the cheap checks)."""
+    events = as_event_buffer(events)
+    pitches = _pitches(events)
+    if len(pitches) < 2:
+        return SPARSE_PHRASE_COST
+    if any(abs(b - a) > MAX_LEAP for a, b in zip(pitches, pitches[1:])):
+        return math.inf
+
+    stats = analyze_melody_events(events)
+    intervals = len(pitches) - 1
+    cost = STEPWISE_WEIGHT * abs(stats["stepwise_ratio"] - STEPWISE_TARGET)
+    cost += LEAP_WEIGHT * max(0.0, stats["leap_count"] - MAX_LEAP_SHARE * intervals)
+    climax = stats["climax_note"]["note"]
+    cost += CLIMAX_WEIGHT * abs(pitches.index(climax) / intervals - CLIMAX_TARGET)
+    cost += CLIMAX_REPEAT_PENALTY * (pitches.count(climax) - 1)
+    return cost
+
+
+def counterpoint_cost(melody: EventBuffer, harmony: EventBuffer) -> float:
+    report = analyze_counterpoint(melody, harmony)
+    parallels = len(report["parallel_fifths"]) + len(report["parallel_octaves"])
+    return PARALLEL_PENALTY * parallels + CROSSING_PENALTY * len(report["voice_crossings"])
+
+
+def _join(bars: list[EventBuffer], start: int, end: int) -> EventBuffer:
+    events = EventBuffer()
+    for chunk in bars[start:end]:
+        events.extend(chunk)
+    return events
+
+
+def _generate_candidate(
+    ctrl: Controls,
+    plan: SongPlan,
+    segment_index: SegmentIndex,
+    seed: int,
+    spans: list[tuple[int, int]],
+) -> tuple[list[EventBuffer], list[float]]:
+    """One melody, bar by bar, with the melodic cost of each phrase. Runs in a worker process."""
+    bars = list(iter_melody_bars(ctrl, segment_index.bars(), plan, seed=seed))
+    return bars, [melodic_cost(_join(bars, start, end)) for start, end in spans]
+
+
+def _harmony_by_phrase(harmony: EventBuffer, spans: list[tuple[int, int]]) -> list[EventBuffer]:
+    ticks = harmony.tick
+    on = sorted(harmony.note_on_indices(), key=lambda i: ticks[i])
+    on_ticks = [ticks[i] for i in on]
+    ticks_per_bar = PPQ * 4
+    out = []
+    for start, end in spans:
+        lo = bisect_left(on_ticks, start * ticks_per_bar)
+        hi = bisect_left(on_ticks, end * ticks_per_bar)
+        out.append(harmony.take(on[lo:hi]))
+    return out
+
+
+def search_melody(
+    ctrl: Controls,
+    plan: SongPlan,
+    chord_segments: list[ChordSegment] | SegmentIndex,
+    harmony_events: EventBuffer | list,
+    search: MelodySearch = MelodySearch(),
+    parallel: bool = False,
+    executor: Executor | None = None,
+) -> MelodySearchResult:
+    """Best-of-N melody for ``ctrl``, scored phrase by phrase against ``harmony_events``.
+
+    Candidate ``k`` is the melody generated with seed ``ctrl.seed + k * SEED_STRIDE``
+    (candidate 0 is the song's own melody). With ``parallel=True`` the
+    candidates are generated in a process pool (``executor`` if given,
+    otherwise a temporary one); with a candidate budget only, the result is
+    the same as in serial mode.
+    """
+    t0 = time.monotonic()
+    deadline = None if search.time_budget is None else t0 + search.time_budget
+    segment_index = SegmentIndex.of(chord_segments, ctrl.length_bars)
+    spans = phrase_spans(plan, ctrl.length_bars)
+    seeds = [ctrl.seed + k * SEED_STRIDE for k in range(max(1, search.candidates))]
+
+    results: dict[int, tuple[list[EventBuffer], list[float]]] = {}
+    if parallel and len(seeds) > 1:
+        pool = executor or ProcessPoolExecutor(max_workers=min(len(seeds) - 1, os.cpu_count() or 1))
+        futures = {pool.submit(_generate_candidate, ctrl, plan, segment_index, seed, spans): k for k, seed in enumerate(seeds) if k}
+        results[0] = _generate_candidate(ctrl, plan, segment_index, seeds[0], spans)
+        try:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            for fut in as_completed(futures, timeout=remaining):
+                results[futures[fut]] = fut.result()
+        except TimeoutError:
+            pass
+        finally:
+            for fut in futures:
+                fut.cancel()
+            if executor is None:
+                pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        for k, seed in enumerate(seeds):
+            if k and deadline is not None and time.monotonic() >= deadline:
+                break
+            results[k] = _generate_candidate(ctrl, plan, segment_index, seed, spans)
+
+    harmony_phrases = _harmony_by_phrase(as_event_buffer(harmony_events), spans)
+    order = sorted(results)
+    events = EventBuffer()
+    phrase_seeds: list[int] = []
+    phrase_costs: list[float] = []
+    pruned = rejected = 0
+    for p, (start, end) in enumerate(spans):
+        best_k, best_cost = 0, math.inf
+        ranked = sorted(order, key=lambda k: (results[k][1][p], k))
+        for n, k in enumerate(ranked):
+            melodic = results[k][1][p]
+            if melodic == math.inf:
+                rejected += len(ranked) - n
+                break
+            if melodic >= best_cost:
+                pruned += len(ranked) - n
+                break
+            total = melodic + counterpoint_cost(_join(results[k][0], start, end), harmony_phrases[p])
+            if total < best_cost:
+                best_k, best_cost = k, total
+        events.extend(_join(results[best_k][0], start, end))
+        phrase_seeds.append(seeds[best_k])
+        phrase_costs.append(best_cost)
+
+    return MelodySearchResult(
+        events=events,
+        phrases=spans,
+        phrase_seeds=phrase_seeds,
+        phrase_costs=phrase_costs,
+        candidates=len(results),
+        pruned=pruned,
+        rejected=rejected,
+        seconds=time.monotonic() - t0,
+    )
@@ -1,63 +1,211 @@
 from __future__ import annotations
 
+import itertools
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator
+
 import mido
 from mido import Message, MidiFile, MidiTrack, MetaMessage
 
-from .constants import PPQ
-from .models import Controls
+from .artifacts import PART_ORDER, SongArtifacts, controls_key
+from .events import EventBuffer, iter_delta_stream, merge_chunk_stream
+from .models import ChordSegment, Controls, SongPlan
 from .planning import build_song_plan
-from .harmony import build_chord_segments, generate_harmony_track
-from .bass import generate_bass_track
-from .melody import generate_melody_track
-from .drums import generate_drums_track
+from .harmony import SegmentIndex, build_chord_segments, generate_harmony_track, iter_chord_bars, iter_harmony_bars
+from .bass import generate_bass_track, iter_bass_bars
+from .melody import generate_melody_track, iter_melody_bars
+from .melody_search import MelodySearch, search_melody
+from .drums import generate_drums_track, iter_drums_bars
 from .reporting import build_song_report
 
 
-def build_midifile(ctrl: Controls, include_parts=("melody", "harmony", "bass", "drums")) -> MidiFile:
-    """Build a standard MIDI file."""
-    mid = MidiFile(ticks_per_beat=PPQ)
-
+def build_meta_track(ctrl: Controls) -> MidiTrack:
     meta = MidiTrack()
-    mid.tracks.append(meta)
     meta.append(MetaMessage("set_tempo", tempo=mido.bpm2tempo(ctrl.bpm), time=0))
     meta.append(MetaMessage("time_signature", numerator=4, denominator=4, clocks_per_click=24, notated_32nd_notes_per_beat=8, time=0))
     meta.append(MetaMessage("track_name", name="PopKnobPlayer", time=0))
+    return meta
 
-    plan = build_song_plan(ctrl)
-    chord_segments = build_chord_segments(ctrl, plan)
 
-    part_events: dict[str, list[tuple[int, Message]]] = {}
+def encode_part_track(part_name: str, events: EventBuffer) -> MidiTrack:
+    """Encode absolute-tick part events into a delta-time MidiTrack.
+
+    This is the serialization edge: Message objects are created here, once.
+    Events are ordered by the k-way run merge, so note-offs precede note-ons
+    on the same tick.
+    """
+    tr = MidiTrack()
+    tr.append(MetaMessage("track_name", name=part_name, time=0))
+
+    for delta, _, i in iter_delta_stream((events,)):
+        tr.append(events.message(i, time=delta))
+
+    tr.append(MetaMessage("end_of_track", time=0))
+    return tr
+
+
+def _generate_part(
+    part_name: str,
+    ctrl: Controls,
+    plan: SongPlan,
+    chord_segments: list[ChordSegment] | SegmentIndex,
+) -> EventBuffer:
+    if part_name == "harmony":
+        return generate_harmony_track(ctrl, chord_segments, plan)
+    if part_name == "bass":
+        return generate_bass_track(ctrl, chord_segments, plan)
+    if part_name == "melody":
+        return generate_melody_track(ctrl, chord_segments, plan)
+    if part_name == "drums":
+        return generate_drums_track(ctrl, plan)
+    raise ValueError(f"Unknown part: {part_name}")
+
+
+def generate_parts(
+    ctrl: Controls,
+    plan: SongPlan,
+    chord_segments: list[ChordSegment] | SegmentIndex,
+    include_parts=PART_ORDER,
+    parallel: bool = False,
+    executor: Executor | None = None,
+) -> dict[str, EventBuffer]:
+    """Run the part generators for ``include_parts``.
+
+    With ``parallel=True`` the generators run concurrently in a process pool
+    (``executor`` if given, otherwise a temporary one). The output is identical
+    to serial mode: every generator seeds its own ``random.Random(ctrl.seed + N)``
+    and only reads the shared plan and chord segments. The segments are
+    indexed once (:class:`mind.harmony.SegmentIndex`) and shared by all parts.
+    """
+    names = [name for name in ("harmony", "bass", "melody", "drums") if name in include_parts]
+    chord_segments = SegmentIndex.of(chord_segments, ctrl.length_bars)
 
-    if "harmony" in include_parts:
-        part_events["harmony"] = generate_harmony_track(ctrl, chord_segments, plan)
-    if "bass" in include_parts:
-        part_events["bass"] = generate_bass_track(ctrl, chord_segments, plan)
-    if "melody" in include_parts:
-        part_events["melody"] = generate_melody_track(ctrl, chord_segments, plan)
-    if "drums" in include_parts:
-        part_events["drums"] = generate_drums_track(ctrl, plan)
+    if not parallel or len(names) < 2:
+        return {name: _generate_part(name, ctrl, plan, chord_segments) for name in names}
 
-    for part_name in ["melody", "harmony", "bass", "drums"]:
-        if part_name not in part_events:
-            continue
-        tr = MidiTrack()
-        mid.tracks.append(tr)
-        tr.append(MetaMessage("track_name", name=part_name, time=0))
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=len(names)) as pool:
+            return generate_parts(ctrl, plan, chord_segments, names, parallel=True, executor=pool)
 
-        evs = sorted(part_events[part_name], key=lambda x: x[0])
-        last_tick = 0
-        for abs_tick, msg in evs:
-            delta = max(0, abs_tick - last_tick)
-            last_tick = abs_tick
-            msg2 = msg.copy(time=delta)
-            tr.append(msg2)
+    futures = {name: executor.submit(_generate_part, name, ctrl, plan, chord_segments) for name in names}
+    return {name: futures[name].result() for name in names}
 
-        tr.append(MetaMessage("end_of_track", time=0))
 
-    return mid
+def iter_song_bars(
+    ctrl: Controls,
+    include_parts=PART_ORDER,
+    plan: SongPlan | None = None,
+) -> Iterator[dict[str, EventBuffer]]:
+    """Generate the song one bar at a time.
+
+    Yields ``{part_name: EventBuffer}`` per bar (parts in PART_ORDER). Chords
+    are produced lazily and shared between the parts, so the first bar is
+    ready after a constant amount of work regardless of ``length_bars``.
+    Concatenating the chunks gives exactly what :func:`generate_parts` returns.
+    """
+    if plan is None:
+        plan = build_song_plan(ctrl)
+    names = [name for name in PART_ORDER if name in include_parts]
+    chord_parts = [name for name in names if name != "drums"]
+    chord_feeds = dict(zip(chord_parts, itertools.tee(iter_chord_bars(ctrl, plan), len(chord_parts))))
+
+    part_iters = {}
+    for name in names:
+        if name == "harmony":
+            part_iters[name] = iter_harmony_bars(ctrl, chord_feeds[name], plan)
+        elif name == "bass":
+            part_iters[name] = iter_bass_bars(ctrl, chord_feeds[name], plan)
+        elif name == "melody":
+            part_iters[name] = iter_melody_bars(ctrl, chord_feeds[name], plan)
+        else:
+            part_iters[name] = iter_drums_bars(ctrl, plan)
+
+    for _ in range(ctrl.length_bars):
+        yield {name: next(part_iters[name]) for name in names}
+
+
+def iter_song_messages(ctrl: Controls, include_parts=PART_ORDER) -> Iterator[Message]:
+    """Yield the song as one interleaved stream of delta-time Messages, lazily.
+
+    Message ``time`` is in ticks. Bars are generated only as the consumer
+    reaches them; the order matches a type 0 export of the full song.
+    """
+    chunks = (list(bar.values()) for bar in iter_song_bars(ctrl, include_parts))
+    last_tick = 0
+    for tick, events, i in merge_chunk_stream(chunks):
+        yield events.message(i, time=tick - last_tick if tick > last_tick else 0)
+        last_tick = tick
+
+
+def build_song_artifacts(
+    ctrl: Controls,
+    include_parts=PART_ORDER,
+    with_report: bool = True,
+    parallel: bool = False,
+    executor: Executor | None = None,
+    encode_tracks: bool = True,
+    melody_search: MelodySearch | None = None,
+) -> SongArtifacts:
+    """Run the full pipeline once and keep every intermediate result.
+
+    ``encode_tracks=False`` skips building mido tracks; use
+    :meth:`SongArtifacts.to_smf` to serialize in that case.
+    ``melody_search`` replaces the melody with the best-of-N search of
+    :mod:`mind.melody_search` (its summary goes to ``report["melody_search"]``).
+    """
+    plan = build_song_plan(ctrl)
+    chord_segments = build_chord_segments(ctrl, plan)
+    segment_index = SegmentIndex(chord_segments, ctrl.length_bars)
+    search_result = None
+    if melody_search is not None and "melody" in include_parts:
+        # The search scores melodies against the harmony, so that goes first.
+        names = [name for name in include_parts if name != "melody"]
+        part_events = generate_parts(ctrl, plan, segment_index, names, parallel=parallel, executor=executor)
+        harmony = part_events.get("harmony")
+        if harmony is None:
+            harmony = generate_harmony_track(ctrl, segment_index, plan)
+        search_result = search_melody(
+            ctrl, plan, segment_index, harmony, melody_search, parallel=parallel, executor=executor
+        )
+        part_events["melody"] = search_result.events
+        part_events = {name: part_events[name] for name in ("harmony", "bass", "melody", "drums") if name in part_events}
+    else:
+        part_events = generate_parts(ctrl, plan, segment_index, include_parts, parallel=parallel, executor=executor)
+
+    artifacts = SongArtifacts(
+        key=controls_key(ctrl, melody_search if search_result is not None else None),
+        ctrl=ctrl,
+        plan=plan,
+        chord_segments=chord_segments,
+        part_events=part_events,
+        meta_track=build_meta_track(ctrl),
+    )
+    if encode_tracks:
+        artifacts.part_tracks = {name: encode_part_track(name, evs) for name, evs in part_events.items()}
+    if with_report:
+        artifacts.report = build_song_report(ctrl, plan, chord_segments, part_events, segment_index=segment_index)
+        if search_result is not None:
+            artifacts.report["melody_search"] = search_result.summary()
+    return artifacts
+
+
+def build_midifile(
+    ctrl: Controls,
+    include_parts=PART_ORDER,
+    parallel: bool = False,
+    executor: Executor | None = None,
+) -> MidiFile:
+    """Build a standard MIDI file."""
+    artifacts = build_song_artifacts(ctrl, include_parts, with_report=False, parallel=parallel, executor=executor)
+    return artifacts.midifile(include_parts)
 
 
-def build_song_bundle(ctrl: Controls, include_parts=("melody", "harmony", "bass", "drums")):
+def build_song_bundle(
+    ctrl: Controls,
+    include_parts=PART_ORDER,
+    parallel: bool = False,
+    executor: Executor | None = None,
+):
     """
     Build:
       - mid
@@ -65,43 +213,9 @@ def build_song_bundle(ctrl: Controls, include_parts=("melody", "harmony", "bass"
       - chord_segments
       - part_events
       - report
-    """
-    plan = build_song_plan(ctrl)
-    chord_segments = build_chord_segments(ctrl, plan)
-
-    part_events: dict[str, list[tuple[int, Message]]] = {}
-
-    if "harmony" in include_parts:
-        part_events["harmony"] = generate_harmony_track(ctrl, chord_segments, plan)
-    if "bass" in include_parts:
-        part_events["bass"] = generate_bass_track(ctrl, chord_segments, plan)
-    if "melody" in include_parts:
-        part_events["melody"] = generate_melody_track(ctrl, chord_segments, plan)
-    if "drums" in include_parts:
-        part_events["drums"] = generate_drums_track(ctrl, plan)
-
-    mid = MidiFile(ticks_per_beat=PPQ)
-    meta = MidiTrack()
-    mid.tracks.append(meta)
-    meta.append(MetaMessage("set_tempo", tempo=mido.bpm2tempo(ctrl.bpm), time=0))
-    meta.append(MetaMessage("time_signature", numerator=4, denominator=4, clocks_per_click=24, notated_32nd_notes_per_beat=8, time=0))
-    meta.append(MetaMessage("track_name", name="PopKnobPlayer", time=0))
-
-    for part_name in ["melody", "harmony", "bass", "drums"]:
-        if part_name not in part_events:
-            continue
-        tr = MidiTrack()
-        mid.tracks.append(tr)
-        tr.append(MetaMessage("track_name", name=part_name, time=0))
 
-        evs = sorted(part_events[part_name], key=lambda x: x[0])
-        last_tick = 0
-        for abs_tick, msg in evs:
-            delta = max(0, abs_tick - last_tick)
-            last_tick = abs_tick
-            tr.append(msg.copy(time=delta))
-
-        tr.append(MetaMessage("end_of_track", time=0))
-
-    report = build_song_report(ctrl, plan, chord_segments, part_events)
-    return mid, plan, chord_segments, part_events, report
+    ``parallel=True`` generates the parts in a process pool (see generate_parts).
+    """
+    artifacts = build_song_artifacts(ctrl, include_parts, parallel=parallel, executor=executor)
+    mid = artifacts.midifile(include_parts)
+    return mid, artifacts.plan, artifacts.chord_segments, artifacts.part_events, artifacts.report
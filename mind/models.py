@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
 from .theory.chords import ChordSpec
 
+if TYPE_CHECKING:
+    from .planning import BarColumns
+
 
 @dataclass(frozen=True)
 class StyleMoodControls:
@@ -85,6 +91,8 @@ class Controls:
     seed: int
     style_mood: StyleMoodControls
     derived: DerivedControls
+    voice_leading: str = "greedy"  # "greedy" (chord to chord) or "optimal" (DP over the progression)
+    sampling: str = "compat"  # "compat" (today's seed -> song mapping) or "alias" (see mind.sampling)
 
 
 @dataclass
@@ -129,11 +137,13 @@ class MelodyContourProfile:
 @dataclass
 class SongPlan:
     sections: list[SectionDef]
-    bar_mods: list[BarModifiers]
+    bar_mods: Sequence[BarModifiers]
     rhythm: RhythmProfile
     contour: MelodyContourProfile
     templates: dict  # section_name -> template dict
     phrase_len_bars: int = 4
+    # Column view of bar_mods, set by planning.bar_columns (not copied by replace()).
+    columns: BarColumns | None = field(default=None, init=False, repr=False, compare=False)
 
 
 @dataclass
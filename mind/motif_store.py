@@ -0,0 +1,273 @@
+"""Persistent store of one-bar melody motifs, shared across songs.
+
+A motif is the notes of one generated melody bar, keyed by its rhythm
+signature (16-bit step mask), the shape of the chord under it (pitch-class
+mask transposed to root 0) and its contour class. Pitches are kept as
+intervals from the chord root, so a motif can be re-voiced over any chord of
+the same shape in any key.
+
+File layout (little-endian, fixed width so the file can be mapped as is)::
+
+    header   magic b"MNDMOTIF", version u32, count u32
+    keys     count x u64, ascending
+    records  count x RECORD_SIZE bytes, in key order
+
+Opening a store maps the file and reads nothing else, so a store with
+millions of motifs opens in well under a millisecond; a lookup is a bisect
+over the key column plus one record decode per match.
+
+    with MotifWriter("motifs.bin") as writer:        # merges into an existing store
+        generate_melody_track(ctrl, segments, plan, motif_sink=writer.add)
+    with MotifStore("motifs.bin") as store:
+        generate_melody_track(ctrl2, segments2, plan2, motif_store=store)
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import random
+import struct
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Sequence
+
+from .pcset import pcs_mask, transpose_mask
+from .theory.melody_analysis import contour_type
+
+MAGIC = b"MNDMOTIF"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+KEY = struct.Struct("<Q")
+MAX_NOTES = 16
+# count, 3 pad bytes, then MAX_NOTES x (step, interval from the root, duration in steps, velocity).
+RECORD = struct.Struct("<B3x" + "BbBB" * MAX_NOTES)
+RECORD_SIZE = RECORD.size
+
+CONTOUR_CLASSES = ("static", "ascending", "descending", "arch", "valley", "mixed")
+ANY_CONTOUR = 0xFF
+LOOKUP_LIMIT = 64  # matches considered per lookup
+
+
+def rhythm_mask(steps: Iterable[int]) -> int:
+    mask = 0
+    for s in steps:
+        if 0 <= s < 16:
+            mask |= 1 << s
+    return mask
+
+
+def chord_shape(chord_pcs: Iterable[int], root_pc: int) -> int:
+    """Pitch-class mask of a chord transposed so its root is 0."""
+    return transpose_mask(pcs_mask(p % 12 for p in chord_pcs), -root_pc)
+
+
+def make_key(rhythm: int, shape: int, contour: int) -> int:
+    return (rhythm << 20) | (shape << 8) | contour
+
+
+@dataclass(frozen=True)
+class Motif:
+    rhythm: int
+    shape: int
+    contour: int  # index into CONTOUR_CLASSES
+    notes: tuple[tuple[int, int, int, int], ...]  # (step, interval, dur_steps, velocity)
+
+    @property
+    def key(self) -> int:
+        return make_key(self.rhythm, self.shape, self.contour)
+
+    def pack(self) -> bytes:
+        flat = []
+        for note in self.notes:
+            flat.extend(note)
+        flat.extend([0] * (4 * (MAX_NOTES - len(self.notes))))
+        return RECORD.pack(len(self.notes), *flat)
+
+    @classmethod
+    def unpack(cls, key: int, data) -> Motif:
+        count, *flat = RECORD.unpack(data)
+        notes = tuple(tuple(flat[i : i + 4]) for i in range(0, 4 * count, 4))
+        return cls(key >> 20, (key >> 8) & 0xFFF, key & 0xFF, notes)
+
+
+def motif_from_bar(
+    bar_notes: Sequence[tuple[int, int, int, int, int]],
+    root_pc: int,
+    chord_pcs: Iterable[int],
+) -> Motif | None:
+    """Motif of one melody bar (``(_, step, note, dur_steps, vel)`` rows, as the generator builds them).
+
+    Intervals are measured from the chord root at or below the first note.
+    ``None`` for an empty bar or one that does not fit a record.
+    """
+    notes = sorted(bar_notes, key=lambda n: n[1])
+    if not notes or len(notes) > MAX_NOTES:
+        return None
+    first = notes[0][2]
+    ref = first - (first - root_pc) % 12
+    intervals = [n[2] - ref for n in notes]
+    if not all(-128 <= i <= 127 for i in intervals):
+        return None
+    return Motif(
+        rhythm=rhythm_mask(n[1] for n in notes),
+        shape=chord_shape(chord_pcs, root_pc),
+        contour=CONTOUR_CLASSES.index(contour_type([n[2] for n in notes])),
+        notes=tuple(
+            (n[1] & 0xFF, interval, max(1, min(255, n[3])), max(0, min(127, n[4])))
+            for n, interval in zip(notes, intervals)
+        ),
+    )
+
+
+class MotifStore:
+    """Read-only, memory-mapped motif store."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a motif store (version {VERSION})")
+        self._count = count
+        keys_end = HEADER.size + KEY.size * count
+        self._keys = memoryview(self._map)[HEADER.size : keys_end].cast("Q")
+        self._records = keys_end
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> MotifStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        keys = getattr(self, "_keys", None)
+        if keys is not None:
+            keys.release()
+            self._keys = None
+        self._map.close()
+        self._file.close()
+
+    def _record(self, i: int) -> bytes:
+        start = self._records + i * RECORD_SIZE
+        return self._map[start : start + RECORD_SIZE]
+
+    def motif(self, i: int) -> Motif:
+        return Motif.unpack(self._keys[i], self._record(i))
+
+    def __iter__(self) -> Iterator[Motif]:
+        return (self.motif(i) for i in range(self._count))
+
+    def find(self, rhythm: int, shape: int, contour: int = ANY_CONTOUR) -> range:
+        """Indices of the motifs with this rhythm and chord shape (and contour, unless ``ANY_CONTOUR``)."""
+        if contour == ANY_CONTOUR:
+            lo, hi = make_key(rhythm, shape, 0), make_key(rhythm, shape, 0xFF) + 1
+        else:
+            lo = make_key(rhythm, shape, contour)
+            hi = lo + 1
+        return range(bisect_left(self._keys, lo), bisect_left(self._keys, hi))
+
+    def lookup(self, rhythm: int, shape: int, contour: int = ANY_CONTOUR, limit: int = LOOKUP_LIMIT) -> list[Motif]:
+        return [self.motif(i) for i in self.find(rhythm, shape, contour)[:limit]]
+
+    def pick(self, rng: random.Random, rhythm: int, shape: int, contour: int = ANY_CONTOUR) -> Motif | None:
+        """A random matching motif, preferring ``contour`` and falling back to any contour."""
+        found = self.find(rhythm, shape, contour)
+        if not found and contour != ANY_CONTOUR:
+            found = self.find(rhythm, shape)
+        if not found:
+            return None
+        return self.motif(found[rng.randrange(min(len(found), LOOKUP_LIMIT))])
+
+
+def write_motif_store(path: str, motifs: Iterable[Motif]) -> int:
+    """Write ``motifs`` (duplicates dropped) as a new store at ``path``; returns the count.
+
+    The file is written next to ``path`` and moved into place, so readers
+    never see a partial store.
+    """
+    records = sorted({(m.key, m.pack()) for m in motifs})
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        f.write(struct.pack(f"<{len(records)}Q", *(key for key, _ in records)))
+        for _, data in records:
+            f.write(data)
+    os.replace(tmp, path)
+    return len(records)
+
+
+def _merge_into(tmp: str, store: MotifStore, records: list[tuple[int, bytes]]) -> int:
+    """Write ``store`` plus the sorted, unique ``records`` it lacks to ``tmp``; returns the count.
+
+    Each new record is placed with a bisect over the key column; the runs of
+    the store between them are copied as raw key and record bytes.
+    """
+    keys = store._keys
+    inserts = []  # (store index the record goes before, key, record)
+    pos = 0
+    for key, data in records:
+        i = bisect_left(keys, key, pos)
+        end = bisect_left(keys, key + 1, i)
+        while i < end and store._record(i) < data:
+            i += 1
+        if i < end and store._record(i) == data:
+            continue
+        inserts.append((i, key, data))
+        pos = i
+
+    count = len(store) + len(inserts)
+    with open(tmp, "wb") as f, memoryview(store._map)[store._records :] as stored:
+        f.write(HEADER.pack(MAGIC, VERSION, count))
+        start = 0
+        for i, key, _ in inserts:
+            f.write(keys[start:i])
+            f.write(KEY.pack(key))
+            start = i
+        f.write(keys[start:])
+        start = 0
+        for i, _, data in inserts:
+            f.write(stored[start * RECORD_SIZE : i * RECORD_SIZE])
+            f.write(data)
+            start = i
+        f.write(stored[start * RECORD_SIZE :])
+    return count
+
+
+class MotifWriter:
+    """Collects motifs and merges them into the store at ``path`` on close."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pending: list[Motif] = []
+
+    def add(self, motif: Motif | None) -> None:
+        if motif is not None:
+            self.pending.append(motif)
+
+    def __enter__(self) -> MotifWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+
+    def close(self) -> int:
+        """Merge the pending motifs into the store; returns the new count.
+
+        The sorted pending records are merged into the existing store's
+        key/record columns, so the store is never decoded or re-sorted.
+        """
+        if not os.path.exists(self.path):
+            count = write_motif_store(self.path, self.pending)
+        else:
+            tmp = self.path + ".tmp"
+            with MotifStore(self.path) as store:
+                count = _merge_into(tmp, store, sorted({(m.key, m.pack()) for m in self.pending}))
+            os.replace(tmp, self.path)
+        self.pending = []
+        return count
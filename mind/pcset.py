@@ -0,0 +1,117 @@
+"""Pitch-class sets as 12-bit masks, with cached register tables.
+
+Bit ``p`` of the mask is set when pitch class ``p`` (0 = C) is in the set,
+so union, intersection, transposition and membership are single integer
+operations. The MIDI notes of a set between two bounds are computed once
+per ``(mask, low, high)`` and shared as sorted tuples, and nearest-note
+lookups bisect those tuples instead of scanning them.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, Iterator, Sequence
+
+FULL_MASK = 0xFFF
+
+
+def pcs_mask(pcs: Iterable[int]) -> int:
+    """Mask of the pitch classes 0..11 in ``pcs`` (other values are ignored)."""
+    mask = 0
+    for p in pcs:
+        if 0 <= p < 12:
+            mask |= 1 << p
+    return mask
+
+
+def transpose_mask(mask: int, semitones: int) -> int:
+    s = semitones % 12
+    return ((mask << s) | (mask >> (12 - s))) & FULL_MASK
+
+
+@lru_cache(maxsize=4096)
+def notes_in_range(mask: int, low: int, high: int) -> tuple[int, ...]:
+    """Ascending MIDI notes in ``low..high`` (inclusive) whose pitch class is in ``mask``."""
+    return tuple(n for n in range(low, high + 1) if (mask >> (n % 12)) & 1)
+
+
+def nearest_note(target: int, *pools: Sequence[int]) -> int | None:
+    """Note closest to ``target`` in the concatenation of ascending, duplicate-free ``pools``.
+
+    Ties go to the note that comes first in that concatenation (the lower
+    note within a pool, the earlier pool across pools), which is what a
+    linear first-minimum scan of ``pools[0] + pools[1] + ...`` returns.
+    ``None`` when every pool is empty.
+    """
+    best = None
+    best_d = 0
+    for notes in pools:
+        if not notes:
+            continue
+        i = bisect_left(notes, target)
+        if i == len(notes):
+            cand = notes[-1]
+        elif i == 0 or notes[i] == target:
+            cand = notes[i]
+        else:
+            below, above = notes[i - 1], notes[i]
+            cand = below if target - below <= above - target else above
+        d = abs(cand - target)
+        if best is None or d < best_d:
+            best, best_d = cand, d
+    return best
+
+
+class PitchClassSet:
+    """Immutable set of pitch classes backed by a 12-bit mask."""
+
+    __slots__ = ("mask",)
+
+    def __init__(self, mask: int = 0):
+        object.__setattr__(self, "mask", mask & FULL_MASK)
+
+    @classmethod
+    def from_pcs(cls, pcs: Iterable[int]) -> PitchClassSet:
+        return cls(pcs_mask(p % 12 for p in pcs))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PitchClassSet is immutable")
+
+    def __contains__(self, pc: int) -> bool:
+        return bool((self.mask >> (pc % 12)) & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        return (p for p in range(12) if (self.mask >> p) & 1)
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.mask != 0
+
+    def __or__(self, other: PitchClassSet) -> PitchClassSet:
+        return PitchClassSet(self.mask | other.mask)
+
+    def __and__(self, other: PitchClassSet) -> PitchClassSet:
+        return PitchClassSet(self.mask & other.mask)
+
+    def __sub__(self, other: PitchClassSet) -> PitchClassSet:
+        return PitchClassSet(self.mask & ~other.mask)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PitchClassSet) and other.mask == self.mask
+
+    def __hash__(self) -> int:
+        return hash(self.mask)
+
+    def __repr__(self) -> str:
+        return f"PitchClassSet({list(self)})"
+
+    def transpose(self, semitones: int) -> PitchClassSet:
+        return PitchClassSet(transpose_mask(self.mask, semitones))
+
+    def notes_in_range(self, low: int, high: int) -> tuple[int, ...]:
+        return notes_in_range(self.mask, low, high)
+
+    def nearest(self, target: int, low: int, high: int) -> int | None:
+        return nearest_note(target, notes_in_range(self.mask, low, high))
@@ -0,0 +1,259 @@
+"""Dependency-aware, memoized generation pipeline.
+
+Every stage (plan, chord segments, each part, report) declares the Controls
+fields it reads and the upstream stages it consumes. A stage's cache key is a
+hash of those field values plus its upstream keys, so after a knob change only
+the stages downstream of that knob run again:
+
+    pipeline = Pipeline()
+    artifacts = pipeline.run(ctrl)
+    artifacts = pipeline.run(replace(ctrl, bpm=96))   # plan/chords reused
+    pipeline.last_run                                 # stages that ran
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import Executor
+from dataclasses import asdict, is_dataclass
+from typing import Any, Callable
+
+from .artifacts import PART_ORDER, SongArtifacts, controls_key
+from .harmony import SegmentIndex, build_chord_segments
+from .midi_build import build_meta_track, encode_part_track, generate_parts
+from .models import Controls
+from .planning import build_song_plan
+from .reporting import build_song_report
+
+STAGES = ("plan", "chords", "harmony", "bass", "melody", "drums", "report")
+
+_PART_COMMON = (
+    "seed",
+    "length_bars",
+    "bpm",
+    "derived.density",
+    "derived.energy",
+    "derived.swing",
+    "derived.humanize_timing_ms",
+    "derived.humanize_velocity",
+)
+
+# Controls fields each stage reads (dotted paths; "" is the whole Controls).
+STAGE_FIELDS: dict[str, tuple[str, ...]] = {
+    "plan": (
+        "seed",
+        "length_bars",
+        "mode",
+        "derived.progression_style",
+        "derived.style_profile",
+        "derived.density",
+        "derived.swing",
+        "derived.syncopation",
+        "derived.variation",
+        "derived.cadence_strength",
+        "derived.level2.chromaticism",
+        "derived.level2.extension_richness",
+        "derived.level2.form_strictness",
+        "derived.level2.functional_clarity",
+        "derived.level2.groove_archetype",
+        "derived.level2.lift_profile",
+        "derived.level2.melodic_range",
+        "derived.level2.motif_repetition",
+    ),
+    "chords": (
+        "seed",
+        "length_bars",
+        "key_name",
+        "mode",
+        "sampling",
+        "derived.progression_style",
+        "derived.density",
+        "derived.energy",
+        "derived.variation",
+        "derived.level2.chromaticism",
+        "derived.level2.extension_richness",
+        "derived.level2.turnaround_intensity",
+    ),
+    "harmony": _PART_COMMON + (
+        "key_name",
+        "mode",
+        "voice_leading",
+        "derived.variation",
+        "derived.level2.extension_richness",
+    ),
+    "bass": _PART_COMMON + (
+        "key_name",
+        "mode",
+        "derived.progression_style",
+        "derived.chord_complexity",
+        "derived.level2.chord_tone_anchoring",
+        "derived.level2.swing_amount",
+        "derived.level2.syncopation",
+    ),
+    "melody": _PART_COMMON + (
+        "key_name",
+        "mode",
+        "sampling",
+        "derived.progression_style",
+        "derived.repetition",
+        "derived.variation",
+        "derived.level2.chord_tone_anchoring",
+        "derived.level2.swing_amount",
+        "derived.level2.syncopation",
+    ),
+    "drums": _PART_COMMON + (
+        "derived.variation",
+        "derived.level2.swing_amount",
+        "derived.level2.syncopation",
+    ),
+    # The report embeds every control value.
+    "report": ("",),
+}
+
+# Upstream stages whose outputs each stage consumes.
+STAGE_INPUTS: dict[str, tuple[str, ...]] = {
+    "plan": (),
+    "chords": ("plan",),
+    "harmony": ("plan", "chords"),
+    "bass": ("plan", "chords"),
+    "melody": ("plan", "chords"),
+    "drums": ("plan",),
+    "report": ("plan", "chords", "harmony", "bass", "melody", "drums"),
+}
+
+
+class GenerationCancelled(Exception):
+    """Raised by :meth:`Pipeline.run` when its ``cancel`` check returns True."""
+
+
+def field_value(ctrl: Controls, path: str) -> Any:
+    value: Any = ctrl
+    for name in filter(None, path.split(".")):
+        value = getattr(value, name)
+    return asdict(value) if is_dataclass(value) else value
+
+
+def stage_keys(ctrl: Controls) -> dict[str, str]:
+    """Cache key of every stage for ``ctrl``, in STAGES order."""
+    keys: dict[str, str] = {}
+    for stage in STAGES:
+        payload = json.dumps(
+            {
+                "stage": stage,
+                "fields": {path: field_value(ctrl, path) for path in STAGE_FIELDS[stage]},
+                "inputs": [keys[s] for s in STAGE_INPUTS[stage]],
+            },
+            sort_keys=True,
+            default=str,
+        )
+        keys[stage] = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return keys
+
+
+def affected_stages(old: Controls, new: Controls) -> list[str]:
+    """Stages that must run again when the controls change from ``old`` to ``new``."""
+    old_keys, new_keys = stage_keys(old), stage_keys(new)
+    return [stage for stage in STAGES if old_keys[stage] != new_keys[stage]]
+
+
+class Pipeline:
+    """Runs the generation stages, reusing every output whose key is unchanged.
+
+    One result is kept per stage (the most recent), which is what interactive
+    knob tweaking needs.
+    """
+
+    def __init__(self):
+        self._memo: dict[str, tuple[str, Any]] = {}
+        self._tracks: dict[str, tuple[str, Any]] = {}
+        self.last_run: list[str] = []
+
+    def clear(self) -> None:
+        self._memo.clear()
+        self._tracks.clear()
+        self.last_run = []
+
+    def _cached(self, stage: str, key: str):
+        hit = self._memo.get(stage)
+        return hit[1] if hit is not None and hit[0] == key else None
+
+    def _store(self, stage: str, key: str, value: Any) -> Any:
+        self._memo[stage] = (key, value)
+        self.last_run.append(stage)
+        return value
+
+    def run(
+        self,
+        ctrl: Controls,
+        include_parts=PART_ORDER,
+        with_report: bool = True,
+        parallel: bool = False,
+        executor: Executor | None = None,
+        encode_tracks: bool = True,
+        cancel: Callable[[], bool] | None = None,
+    ) -> SongArtifacts:
+        """Same result as :func:`mind.midi_build.build_song_artifacts`, computed incrementally.
+
+        ``cancel`` is polled before every stage; when it returns True the run
+        stops with :class:`GenerationCancelled`. Stages finished so far stay
+        memoized, so the next run picks up from there.
+        """
+        keys = stage_keys(ctrl)
+        self.last_run = []
+
+        def check() -> None:
+            if cancel is not None and cancel():
+                raise GenerationCancelled()
+
+        plan = self._cached("plan", keys["plan"])
+        if plan is None:
+            check()
+            plan = self._store("plan", keys["plan"], build_song_plan(ctrl))
+
+        chord_segments = self._cached("chords", keys["chords"])
+        if chord_segments is None:
+            check()
+            chord_segments = self._store("chords", keys["chords"], build_chord_segments(ctrl, plan))
+
+        # Indexed once per chord list and shared by the part generators and the report.
+        segment_index = self._cached("segment_index", keys["chords"])
+        if segment_index is None:
+            segment_index = SegmentIndex(chord_segments, ctrl.length_bars)
+            self._memo["segment_index"] = (keys["chords"], segment_index)
+
+        names = [name for name in PART_ORDER if name in include_parts]
+        part_events = {name: self._cached(name, keys[name]) for name in names}
+        stale = [name for name in names if part_events[name] is None]
+        if stale:
+            check()
+            fresh = generate_parts(ctrl, plan, segment_index, stale, parallel=parallel, executor=executor)
+            for name in ("harmony", "bass", "melody", "drums"):
+                if name in fresh:
+                    part_events[name] = self._store(name, keys[name], fresh[name])
+
+        artifacts = SongArtifacts(
+            key=controls_key(ctrl),
+            ctrl=ctrl,
+            plan=plan,
+            chord_segments=chord_segments,
+            part_events=part_events,
+            meta_track=build_meta_track(ctrl),
+        )
+        if encode_tracks:
+            for name in names:
+                hit = self._tracks.get(name)
+                if hit is None or hit[0] != keys[name]:
+                    hit = self._tracks[name] = (keys[name], encode_part_track(name, part_events[name]))
+                artifacts.part_tracks[name] = hit[1]
+        if with_report:
+            complete = tuple(names) == PART_ORDER
+            report = self._cached("report", keys["report"]) if complete else None
+            if report is None:
+                check()
+                report = build_song_report(ctrl, plan, chord_segments, part_events, segment_index=segment_index)
+                if complete:
+                    self._store("report", keys["report"], report)
+                else:
+                    self.last_run.append("report")
+            artifacts.report = report
+        return artifacts
@@ -2,11 +2,19 @@ from __future__ import annotations
 
 import math
 import random
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
 
 from .models import BarModifiers, MelodyContourProfile, RhythmProfile, SectionDef, SongPlan
-from .utils import clamp, clamp01, lerp, pick_weighted
+from .utils import clamp01, lerp, pick_weighted
 from .theory.progression import ProgressionGenerator
 
+try:
+    import numpy as np
+except ImportError:  # optional: BarColumns falls back to list comprehensions
+    np = None
+
 
 def _choose_section_pattern_by_phrases(rng: random.Random, phrase_count: int) -> list[str]:
     """
@@ -322,21 +330,389 @@ def build_melody_contour(ctrl, rng_master: random.Random) -> MelodyContourProfil
     return MelodyContourProfile(kind=kind, intensity=intensity)
 
 
+# Every bar draws exactly this many values from the plan RNG, one per entry of
+# its section's _SECTION_RANGES row.
+_DRAWS_PER_BAR = 7
+
+# (low, high) of each drawn value per section, in draw order: density, energy,
+# sync, chord comp, variation, repetition, melody shift. Other names use outro.
+_SECTION_RANGES = {
+    "intro": ((0.65, 0.90), (0.65, 0.95), (0.75, 1.00), (0.85, 1.05), (0.85, 1.05), (1.00, 1.25), (-3, +1)),
+    "verse": ((0.75, 0.98), (0.78, 0.98), (0.85, 1.05), (0.90, 1.10), (0.85, 1.05), (1.05, 1.30), (-2, +1)),
+    "chorus": ((1.05, 1.25), (1.10, 1.40), (1.00, 1.25), (1.00, 1.20), (0.95, 1.20), (0.95, 1.15), (+2, +6)),
+    "bridge": ((0.85, 1.10), (0.85, 1.20), (0.95, 1.20), (1.00, 1.30), (1.10, 1.45), (0.75, 1.00), (0, +4)),
+    "outro": ((0.70, 0.95), (0.70, 0.95), (0.80, 1.05), (0.90, 1.10), (0.85, 1.10), (1.05, 1.35), (-3, +1)),
+}
+# Bounds of the six multipliers, in MULTIPLIERS order.
+_CLAMPS = ((0.55, 1.35), (0.55, 1.55), (0.55, 1.55), (0.70, 1.60), (0.60, 1.70), (0.60, 1.70))
+
+
+def _section_rules(ctrl, name: str) -> tuple:
+    """``(ranges, density_factor, energy_factor)`` for bars of section ``name``."""
+    level2 = ctrl.derived.level2
+    if name == "chorus":
+        density_factor = {"lift": 1.08, "plateau": 1.00, "drop": 0.92}.get(level2.lift_profile, 1.00)
+        energy_factor = {"lift": 1.12, "plateau": 1.00, "drop": 0.90}.get(level2.lift_profile, 1.00)
+    elif name in {"intro", "outro"}:
+        density_factor, energy_factor = lerp(1.02, 0.90, level2.form_strictness), 1.0
+    elif name == "bridge":
+        density_factor, energy_factor = lerp(0.95, 1.08, 1 - level2.form_strictness), 1.0
+    else:
+        density_factor, energy_factor = 1.0, 1.0
+    return _SECTION_RANGES.get(name, _SECTION_RANGES["outro"]), density_factor, energy_factor
+
+
+def _phrase_end_factors(ctrl) -> tuple[float, float, float]:
+    """Energy, sync and variation boosts for phrase-end bars (other than the last bar)."""
+    return (
+        lerp(1.03, 1.10, clamp01(ctrl.derived.cadence_strength)),
+        lerp(1.00, 1.10, clamp01(ctrl.derived.syncopation)),
+        lerp(1.02, 1.20, clamp01(ctrl.derived.variation)),
+    )
+
+
+def contour_offset(contour, bar_index: int, length_bars: int) -> float:
+    if length_bars <= 1:
+        return 0.0
+
+    t = bar_index / max(1, length_bars - 1)
+    intensity = contour.intensity
+
+    if contour.kind == "arch":
+        val = 1.0 - (2.0 * (t - 0.5)) ** 2
+        return lerp(-1.5, +4.0, clamp01(val)) * intensity
+    if contour.kind == "descending":
+        return lerp(+4.0, -2.0, t) * intensity
+    if contour.kind == "ascending":
+        return lerp(-2.0, +4.0, t) * intensity
+    if contour.kind == "wave":
+        val = math.sin(2.0 * math.pi * (t * 2.0))
+        return (val * 3.0) * intensity
+    if contour.kind == "plateau":
+        return (lerp(0.0, 2.0, clamp01((t - 0.65) / 0.35))) * intensity
+
+    return 0.0
+
+
+MULTIPLIERS = ("density_mul", "energy_mul", "sync_mul", "chord_comp_mul", "variation_mul", "repetition_mul")
+PHRASE_END, SECTION_START, SECTION_END = 1, 2, 4
+COLUMN_BLOCK = 256  # bars computed per fill
+SCALED_CACHE_SIZE = 32  # (multiplier, base) pairs kept by BarColumns.scaled; a song uses about 18
+
+
+class BarColumns:
+    """Per-bar modifiers stored column by column.
+
+    One ``array("d")`` per multiplier (see :data:`MULTIPLIERS`), plus the
+    melody shift, a section id, phrase/section flag bits and the melody
+    contour offset. Bars are computed in order, :data:`COLUMN_BLOCK` at a
+    time, from a copy of the plan RNG positioned at bar 0: a block takes all
+    of its draws at once and computes every column from them in bulk (NumPy
+    arrays when NumPy is installed, list comprehensions otherwise; both give
+    the same values). A streaming consumer only pays for the blocks it has
+    reached; :meth:`column` fills everything and returns a buffer
+    (``numpy.frombuffer`` reads it without copying).
+
+    :meth:`scaled` gives the clamped per-bar ``base * multiplier`` values the
+    generators derive (``density_eff``, ``energy_eff``, ...), computed once
+    per ``(multiplier, base)`` and shared by every generator that asks.
+    """
+
+    def __init__(self, ctrl, rng_state, sections: list[SectionDef], length: int, phrase_len: int, contour=None):
+        self.length = length
+        self.contour = contour
+        self._rng: random.Random | None = None
+        if rng_state is not None:
+            self._rng = random.Random()
+            self._rng.setstate(rng_state)
+        self._sections = sections
+        self._phrase_len = phrase_len
+        self._columns = {name: array("d") for name in MULTIPLIERS}
+        self.melody_shift = array("b")
+        self.section_id = array("B")
+        self.section_names: list[str] = list(dict.fromkeys(sec.name for sec in sections))
+        self.flags = bytearray()
+        self._contour_offsets = array("d")
+        self._scaled: OrderedDict[tuple[str, float], ScaledColumn] = OrderedDict()
+
+        # Everything a block needs besides its draws, per section (by index
+        # into ``sections``) and, for the drawn ranges, per draw.
+        rules = [_section_rules(ctrl, sec.name) for sec in sections]
+        self._section_ids = [self.section_names.index(sec.name) for sec in sections]
+        self._starts = [sec.bar_start for sec in sections]
+        self._lasts = [sec.bar_end_excl - 1 for sec in sections]
+        self._lows = [[ranges[i][0] for ranges, _, _ in rules] for i in range(_DRAWS_PER_BAR)]
+        self._spans = [[ranges[i][1] - ranges[i][0] for ranges, _, _ in rules] for i in range(_DRAWS_PER_BAR)]
+        self._density_factors = [density for _, density, _ in rules]
+        self._energy_factors = [energy for _, _, energy in rules]
+        if ctrl is not None:
+            level2 = ctrl.derived.level2
+            self._motif_density_bias = lerp(1.08, 0.92, level2.motif_repetition)
+            self._settle = level2.form_strictness * 0.25
+            self._phrase_end_factors = _phrase_end_factors(ctrl)
+
+    @classmethod
+    def from_mods(cls, mods: Sequence[BarModifiers], contour=None) -> BarColumns:
+        """Columns holding already computed ``mods`` (for hand-built plans)."""
+        columns = cls(None, None, [], len(mods), 4, contour)
+        for mod in mods:
+            columns._append(
+                (
+                    mod.section,
+                    mod.density_mul,
+                    mod.energy_mul,
+                    mod.sync_mul,
+                    mod.chord_comp_mul,
+                    mod.variation_mul,
+                    mod.repetition_mul,
+                    mod.melody_shift_semitones,
+                    mod.is_phrase_end,
+                    mod.is_section_start,
+                    mod.is_section_end,
+                )
+            )
+        return columns
+
+    @property
+    def filled(self) -> int:
+        """Bars computed so far."""
+        return len(self.flags)
+
+    def _append(self, row: tuple) -> None:
+        section, *muls, shift, phrase_end, section_start, section_end = row
+        for name, value in zip(MULTIPLIERS, muls):
+            self._columns[name].append(value)
+        self.melody_shift.append(shift)
+        if section not in self.section_names:
+            self.section_names.append(section)
+        self.section_id.append(self.section_names.index(section))
+        self.flags.append(
+            (PHRASE_END if phrase_end else 0) | (SECTION_START if section_start else 0) | (SECTION_END if section_end else 0)
+        )
+
+    def ensure(self, bar_index: int) -> None:
+        """Compute bars up to the end of the block holding ``bar_index``."""
+        if 0 <= bar_index < len(self.flags):
+            return
+        if not 0 <= bar_index < self.length:
+            raise IndexError("bar index out of range")
+        start = len(self.flags)
+        end = min(self.length, (bar_index // COLUMN_BLOCK + 1) * COLUMN_BLOCK)
+        draw = self._rng.random
+        draws = [draw() for _ in range((end - start) * _DRAWS_PER_BAR)]
+        if np is not None:
+            self._fill_numpy(start, end, draws)
+        else:
+            self._fill_python(start, end, draws)
+
+    def _fill_numpy(self, start: int, end: int, draws: list[float]) -> None:
+        bars = np.arange(start, end)
+        sec = np.minimum(bars // self._phrase_len, len(self._sections) - 1)
+        u = np.array(draws).reshape(-1, _DRAWS_PER_BAR).T
+        drawn = np.array(self._lows)[:, sec] + np.array(self._spans)[:, sec] * u
+
+        phrase_end = ((bars + 1) % self._phrase_len == 0) | (bars == self.length - 1)
+        boosted = phrase_end & (bars != self.length - 1)
+        energy_end, sync_end, variation_end = self._phrase_end_factors
+        density = drawn[0] * self._motif_density_bias * np.array(self._density_factors)[sec]
+        density = density + (1.0 - density) * self._settle
+        energy = drawn[1] * np.array(self._energy_factors)[sec] * np.where(boosted, energy_end, 1.0)
+        sync = drawn[2] * np.where(boosted, sync_end, 1.0)
+        variation = drawn[4] * np.where(boosted, variation_end, 1.0)
+
+        for name, values, (lo, hi) in zip(MULTIPLIERS, (density, energy, sync, drawn[3], variation, drawn[5]), _CLAMPS):
+            self._columns[name].frombytes(np.maximum(lo, np.minimum(hi, values)).tobytes())
+        self.melody_shift.frombytes(np.rint(drawn[6]).astype(np.int8).tobytes())
+        self.section_id.frombytes(np.array(self._section_ids, dtype=np.uint8)[sec].tobytes())
+        flags = (
+            np.where(phrase_end, PHRASE_END, 0)
+            | np.where(bars == np.array(self._starts)[sec], SECTION_START, 0)
+            | np.where(bars == np.array(self._lasts)[sec], SECTION_END, 0)
+        )
+        self.flags.extend(flags.astype(np.uint8).tobytes())  # last: ``filled`` counts flags
+
+    def _fill_python(self, start: int, end: int, draws: list[float]) -> None:
+        bars = range(start, end)
+        last_sec = len(self._sections) - 1
+        sec = [min(b // self._phrase_len, last_sec) for b in bars]
+        drawn = [
+            [lows[s] + spans[s] * u for s, u in zip(sec, draws[i::_DRAWS_PER_BAR])]
+            for i, (lows, spans) in enumerate(zip(self._lows, self._spans))
+        ]
+
+        last_bar = self.length - 1
+        phrase_end = [(b + 1) % self._phrase_len == 0 or b == last_bar for b in bars]
+        boosted = [end and b != last_bar for end, b in zip(phrase_end, bars)]
+        energy_end, sync_end, variation_end = self._phrase_end_factors
+        motif, settle = self._motif_density_bias, self._settle
+        density_factors, energy_factors = self._density_factors, self._energy_factors
+        density = [d * motif * density_factors[s] for d, s in zip(drawn[0], sec)]
+        density = [d + (1.0 - d) * settle for d in density]
+        energy = [
+            e * energy_factors[s] * (energy_end if boost else 1.0) for e, s, boost in zip(drawn[1], sec, boosted)
+        ]
+        sync = [v * sync_end if boost else v for v, boost in zip(drawn[2], boosted)]
+        variation = [v * variation_end if boost else v for v, boost in zip(drawn[4], boosted)]
+
+        for name, values, (lo, hi) in zip(MULTIPLIERS, (density, energy, sync, drawn[3], variation, drawn[5]), _CLAMPS):
+            self._columns[name].extend([max(lo, min(hi, v)) for v in values])
+        self.melody_shift.extend([int(round(v)) for v in drawn[6]])
+        self.section_id.extend([self._section_ids[s] for s in sec])
+        starts, lasts = self._starts, self._lasts
+        self.flags.extend(
+            [
+                (PHRASE_END if end else 0)
+                | (SECTION_START if b == starts[s] else 0)
+                | (SECTION_END if b == lasts[s] else 0)
+                for b, s, end in zip(bars, sec, phrase_end)
+            ]
+        )
+
+    def column(self, name: str) -> array:
+        """The whole ``name`` column (a multiplier, ``"melody_shift"``, ``"section_id"`` or ``"contour_offset"``)."""
+        if self.length:
+            self.ensure(self.length - 1)
+        if name == "contour_offset":
+            self.contour_offset(self.length - 1)
+            return self._contour_offsets
+        if name in ("melody_shift", "section_id"):
+            return getattr(self, name)
+        return self._columns[name]
+
+    def value(self, name: str, bar_index: int) -> float:
+        self.ensure(bar_index)
+        return self._columns[name][bar_index]
+
+    def section(self, bar_index: int) -> str:
+        self.ensure(bar_index)
+        return self.section_names[self.section_id[bar_index]]
+
+    def flag(self, bar_index: int, bit: int) -> bool:
+        self.ensure(bar_index)
+        return bool(self.flags[bar_index] & bit)
+
+    def contour_offset(self, bar_index: int) -> float:
+        """:func:`contour_offset` of the plan's melody contour at ``bar_index``."""
+        offsets = self._contour_offsets
+        if not 0 <= bar_index < len(offsets):
+            if not 0 <= bar_index < self.length:
+                raise IndexError("bar index out of range")
+            end = min(self.length, (bar_index // COLUMN_BLOCK + 1) * COLUMN_BLOCK)
+            offsets.extend(contour_offset(self.contour, b, self.length) for b in range(len(offsets), end))
+        return offsets[bar_index]
+
+    def modifiers(self, bar_index: int) -> BarModifiers:
+        self.ensure(bar_index)
+        flags = self.flags[bar_index]
+        c = self._columns
+        return BarModifiers(
+            section=self.section_names[self.section_id[bar_index]],
+            density_mul=c["density_mul"][bar_index],
+            energy_mul=c["energy_mul"][bar_index],
+            sync_mul=c["sync_mul"][bar_index],
+            chord_comp_mul=c["chord_comp_mul"][bar_index],
+            variation_mul=c["variation_mul"][bar_index],
+            repetition_mul=c["repetition_mul"][bar_index],
+            melody_shift_semitones=self.melody_shift[bar_index],
+            is_phrase_end=bool(flags & PHRASE_END),
+            is_section_start=bool(flags & SECTION_START),
+            is_section_end=bool(flags & SECTION_END),
+        )
+
+    def scaled(self, name: str, base: float) -> ScaledColumn:
+        """Per-bar ``clamp01(base * multiplier)`` for the ``name`` multiplier, shared across callers.
+
+        The last :data:`SCALED_CACHE_SIZE` pairs asked for are kept (least
+        recently used first out); an evicted column stays valid for whoever
+        still holds it, it just stops being shared.
+        """
+        key = (name, base)
+        cache = self._scaled
+        column = cache.get(key)
+        if column is None:
+            column = cache[key] = ScaledColumn(self, name, base)
+            if len(cache) > SCALED_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return column
+
+
+class ScaledColumn(Sequence):
+    """``clamp01(base * multiplier)`` per bar, filled block by block alongside its :class:`BarColumns`."""
+
+    def __init__(self, columns: BarColumns, name: str, base: float):
+        self._columns = columns
+        self._source = columns._columns[name]
+        self._base = base
+        self._values = array("d")
+
+    def __len__(self) -> int:
+        return self._columns.length
+
+    def __getitem__(self, bar_index):
+        if isinstance(bar_index, slice):
+            return [self[i] for i in range(*bar_index.indices(len(self)))]
+        if bar_index < 0:
+            bar_index += len(self)
+        values = self._values
+        if not 0 <= bar_index < len(values):
+            self._columns.ensure(bar_index)
+            source = self._source[len(values) : self._columns.filled]
+            if np is not None:
+                scaled = np.frombuffer(source, dtype=np.float64) * self._base
+                values.frombytes(np.maximum(0.0, np.minimum(1.0, scaled)).tobytes())
+            else:
+                base = self._base
+                values.extend([max(0.0, min(1.0, base * m)) for m in source])
+        return values[bar_index]
+
+
+class LazyBarMods(Sequence):
+    """Per-bar modifiers computed on first access, in bar order.
+
+    A view over :class:`BarColumns` (``.columns``): indexing bar ``b``
+    computes the block of bars holding ``b`` and returns a fresh
+    :class:`BarModifiers` read from the columns. The generators read the
+    columns directly (:func:`bar_columns`); this view is for callers that
+    want whole records.
+    """
+
+    def __init__(self, ctrl, rng_state, sections: list[SectionDef], length: int, phrase_len: int):
+        self.columns = BarColumns(ctrl, rng_state, sections, length, phrase_len)
+
+    def __len__(self) -> int:
+        return self.columns.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("bar index out of range")
+        return self.columns.modifiers(index)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"LazyBarMods({self.columns.filled}/{len(self)} bars computed)"
+
+
+def bar_columns(plan: SongPlan) -> BarColumns:
+    """The plan's :class:`BarColumns`, kept on ``plan.columns`` (built once from ``plan.bar_mods`` for hand-built plans)."""
+    if plan.columns is None:
+        mods = plan.bar_mods
+        plan.columns = mods.columns if isinstance(mods, LazyBarMods) else BarColumns.from_mods(mods, plan.contour)
+    return plan.columns
+
+
 def build_song_plan(ctrl) -> SongPlan:
     rng = random.Random(ctrl.seed)
     length = max(1, int(ctrl.length_bars))
-    level2 = ctrl.derived.level2
-    lift_density_bias = {
-        "lift": 1.08,
-        "plateau": 1.00,
-        "drop": 0.92,
-    }.get(level2.lift_profile, 1.00)
-    lift_energy_bias = {
-        "lift": 1.12,
-        "plateau": 1.00,
-        "drop": 0.90,
-    }.get(level2.lift_profile, 1.00)
-    motif_density_bias = lerp(1.08, 0.92, level2.motif_repetition)
 
     phrase_len = 4
     phrase_count = int(math.ceil(length / phrase_len))
@@ -354,97 +730,15 @@ def build_song_plan(ctrl) -> SongPlan:
         if bar >= length:
             break
 
-    bar_mods: list[BarModifiers] = []
-    for b in range(length):
-        sec = next((s for s in sections if s.bar_start <= b < s.bar_end_excl), sections[-1])
-        section = sec.name
-
-        is_phrase_end = ((b + 1) % phrase_len == 0) or (b == length - 1)
-        is_section_start = (b == sec.bar_start)
-        is_section_end = (b == sec.bar_end_excl - 1)
-
-        if section == "intro":
-            density_mul = lerp(0.65, 0.90, rng.random())
-            energy_mul = lerp(0.65, 0.95, rng.random())
-            sync_mul = lerp(0.75, 1.00, rng.random())
-            chord_mul = lerp(0.85, 1.05, rng.random())
-            var_mul = lerp(0.85, 1.05, rng.random())
-            rep_mul = lerp(1.00, 1.25, rng.random())
-            melody_shift = int(round(lerp(-3, +1, rng.random())))
-        elif section == "verse":
-            density_mul = lerp(0.75, 0.98, rng.random())
-            energy_mul = lerp(0.78, 0.98, rng.random())
-            sync_mul = lerp(0.85, 1.05, rng.random())
-            chord_mul = lerp(0.90, 1.10, rng.random())
-            var_mul = lerp(0.85, 1.05, rng.random())
-            rep_mul = lerp(1.05, 1.30, rng.random())
-            melody_shift = int(round(lerp(-2, +1, rng.random())))
-        elif section == "chorus":
-            density_mul = lerp(1.05, 1.25, rng.random())
-            energy_mul = lerp(1.10, 1.40, rng.random())
-            sync_mul = lerp(1.00, 1.25, rng.random())
-            chord_mul = lerp(1.00, 1.20, rng.random())
-            var_mul = lerp(0.95, 1.20, rng.random())
-            rep_mul = lerp(0.95, 1.15, rng.random())
-            melody_shift = int(round(lerp(+2, +6, rng.random())))
-        elif section == "bridge":
-            density_mul = lerp(0.85, 1.10, rng.random())
-            energy_mul = lerp(0.85, 1.20, rng.random())
-            sync_mul = lerp(0.95, 1.20, rng.random())
-            chord_mul = lerp(1.00, 1.30, rng.random())
-            var_mul = lerp(1.10, 1.45, rng.random())
-            rep_mul = lerp(0.75, 1.00, rng.random())
-            melody_shift = int(round(lerp(0, +4, rng.random())))
-        else:  # outro
-            density_mul = lerp(0.70, 0.95, rng.random())
-            energy_mul = lerp(0.70, 0.95, rng.random())
-            sync_mul = lerp(0.80, 1.05, rng.random())
-            chord_mul = lerp(0.90, 1.10, rng.random())
-            var_mul = lerp(0.85, 1.10, rng.random())
-            rep_mul = lerp(1.05, 1.35, rng.random())
-            melody_shift = int(round(lerp(-3, +1, rng.random())))
-
-        density_mul *= motif_density_bias
-        if section == "chorus":
-            density_mul *= lift_density_bias
-            energy_mul *= lift_energy_bias
-        elif section in {"intro", "outro"}:
-            density_mul *= lerp(1.02, 0.90, level2.form_strictness)
-        elif section == "bridge":
-            density_mul *= lerp(0.95, 1.08, 1 - level2.form_strictness)
-
-        density_mul = lerp(density_mul, 1.0, level2.form_strictness * 0.25)
-
-        if is_phrase_end and b != length - 1:
-            energy_mul *= lerp(1.03, 1.10, clamp01(ctrl.derived.cadence_strength))
-            sync_mul *= lerp(1.00, 1.10, clamp01(ctrl.derived.syncopation))
-            var_mul *= lerp(1.02, 1.20, clamp01(ctrl.derived.variation))
-
-        density_mul = clamp(density_mul, 0.55, 1.35)
-        energy_mul = clamp(energy_mul, 0.55, 1.55)
-        sync_mul = clamp(sync_mul, 0.55, 1.55)
-        chord_mul = clamp(chord_mul, 0.70, 1.60)
-        var_mul = clamp(var_mul, 0.60, 1.70)
-        rep_mul = clamp(rep_mul, 0.60, 1.70)
-
-        bar_mods.append(
-            BarModifiers(
-                section=section,
-                density_mul=density_mul,
-                energy_mul=energy_mul,
-                sync_mul=sync_mul,
-                chord_comp_mul=chord_mul,
-                variation_mul=var_mul,
-                repetition_mul=rep_mul,
-                melody_shift_semitones=melody_shift,
-                is_phrase_end=is_phrase_end,
-                is_section_start=is_section_start,
-                is_section_end=is_section_end,
-            )
-        )
+    # Bar modifiers are drawn before the rhythm/contour/templates, so skip the
+    # RNG past them (a fixed number of draws per bar) and compute them lazily.
+    bar_mods = LazyBarMods(ctrl, rng.getstate(), sections, length, phrase_len)
+    for _ in range(length * _DRAWS_PER_BAR):
+        rng.random()
 
     rhythm = build_rhythm_profile(ctrl, rng)
     contour = build_melody_contour(ctrl, rng)
+    bar_mods.columns.contour = contour
     templates = choose_section_templates(ctrl, rng)
 
     return SongPlan(
@@ -0,0 +1,307 @@
+"""Absolute-time MIDI playback engine.
+
+A song is turned into a schedule of *bursts*: ``(seconds, [messages])`` where
+``seconds`` is measured from the start of playback and every message sharing
+that timestamp is sent together. :class:`PlaybackEngine` walks the schedule on
+a monotonic clock, always aiming at ``start + seconds`` (so a late event never
+pushes later ones back), sleeps on an event until shortly before each deadline
+and spins for the final stretch. Stop and pause wake the sleep at once.
+
+For live use, :func:`encode_song` converts generated artifacts to bursts once
+and :class:`LoopSchedule` loops them endlessly, switching to a newly queued
+song at the next bar or phrase boundary.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+import mido
+from mido import Message, MidiFile
+
+from .artifacts import PART_ORDER, SongArtifacts
+from .constants import PPQ
+from .events import merge_runs
+from .telemetry import PlaybackTelemetry
+
+Burst = tuple[float, list[Message]]
+
+# Sleep until this many seconds before a deadline, then busy-wait the rest.
+SPIN_SECONDS = 0.002
+
+_RUNNING, _PAUSED, _STOPPED = "running", "paused", "stopped"
+
+
+def midifile_schedule(mid: MidiFile) -> list[Burst]:
+    """Bursts for every channel message of ``mid``, honouring its tempo map.
+
+    Times are computed from absolute ticks and the tempo in force, not by
+    summing per-message float deltas, so long songs do not accumulate rounding.
+    """
+    tempo = mido.bpm2tempo(120)
+    seconds_per_tick = tempo / (1e6 * mid.ticks_per_beat)
+    base_tick, base_seconds = 0, 0.0
+    tick = 0
+    messages: list[tuple[float, Message]] = []
+    for msg in mido.merge_tracks(mid.tracks):
+        tick += msg.time
+        at = base_seconds + (tick - base_tick) * seconds_per_tick
+        if msg.type == "set_tempo":
+            base_tick, base_seconds = tick, at
+            seconds_per_tick = msg.tempo / (1e6 * mid.ticks_per_beat)
+        elif not msg.is_meta:
+            messages.append((at, msg))
+    return list(bursts(messages))
+
+
+def stream_schedule(messages: Iterable[Message], tempo: int, ticks_per_beat: int = PPQ) -> Iterator[tuple[float, Message]]:
+    """Lazily convert delta-tick messages at a fixed tempo to ``(seconds, message)``."""
+    seconds_per_tick = tempo / (1e6 * ticks_per_beat)
+    tick = 0
+    for msg in messages:
+        tick += msg.time
+        if not msg.is_meta:
+            yield tick * seconds_per_tick, msg
+
+
+def bursts(timed: Iterable[tuple[float, Message]]) -> Iterator[Burst]:
+    """Group consecutive messages with the same timestamp into one burst."""
+    at: float | None = None
+    group: list[Message] = []
+    for t, msg in timed:
+        if t != at and group:
+            yield at, group
+            group = []
+        at = t
+        group.append(msg)
+    if group:
+        yield at, group
+
+
+class PlaybackEngine:
+    """Sends a burst schedule at absolute times on a monotonic clock.
+
+    One engine plays one schedule; :meth:`stop`, :meth:`pause` and
+    :meth:`resume` may be called from any thread. While paused the start time
+    is shifted by the paused duration, so playback resumes where it left off.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter, spin_seconds: float = SPIN_SECONDS):
+        self.clock = clock
+        self.spin_seconds = spin_seconds
+        self._cond = threading.Condition()
+        self._state = _RUNNING
+
+    @property
+    def paused(self) -> bool:
+        return self._state == _PAUSED
+
+    @property
+    def stopped(self) -> bool:
+        return self._state == _STOPPED
+
+    def stop(self) -> None:
+        self._set_state(_STOPPED)
+
+    def pause(self) -> None:
+        with self._cond:
+            if self._state == _RUNNING:
+                self._state = _PAUSED
+                self._cond.notify_all()
+
+    def resume(self) -> None:
+        with self._cond:
+            if self._state == _PAUSED:
+                self._state = _RUNNING
+                self._cond.notify_all()
+
+    def _set_state(self, state: str) -> None:
+        with self._cond:
+            self._state = state
+            self._cond.notify_all()
+
+    def run(
+        self,
+        schedule: Iterable[Burst],
+        send: Callable[[Message], None],
+        on_pause: Callable[[], None] | None = None,
+        telemetry: PlaybackTelemetry | None = None,
+    ) -> bool:
+        """Play ``schedule`` through ``send``; True if it ran to the end.
+
+        ``on_pause`` runs on the playback thread when a pause takes effect
+        (e.g. to silence sounding notes). With ``telemetry`` every message's
+        schedule time is recorded against the clock just before it is sent.
+        """
+        clock = self.clock
+        start = clock()
+        for at, messages in schedule:
+            while not self._wait_until(start + at):
+                if self._state == _STOPPED:
+                    return False
+                paused_at = clock()
+                if on_pause is not None:
+                    on_pause()
+                with self._cond:
+                    while self._state == _PAUSED:
+                        self._cond.wait()
+                if self._state == _STOPPED:
+                    return False
+                start += clock() - paused_at
+            if telemetry is None:
+                for msg in messages:
+                    send(msg)
+            else:
+                for msg in messages:
+                    telemetry.record(at, clock() - start)
+                    send(msg)
+        return self._state != _STOPPED
+
+    def _wait_until(self, deadline: float) -> bool:
+        """Block until ``deadline``; False as soon as the engine leaves the running state."""
+        clock, spin = self.clock, self.spin_seconds
+        while True:
+            remaining = deadline - clock()
+            with self._cond:
+                if self._state != _RUNNING:
+                    return False
+                if remaining <= 0:
+                    return True
+                if remaining > spin:
+                    self._cond.wait(remaining - spin)
+                    continue
+            break
+        while clock() < deadline:
+            if self._state != _RUNNING:
+                return False
+        return True
+
+
+@dataclass(frozen=True)
+class EncodedSong:
+    """A song converted to bursts once, ready for looping playback.
+
+    Burst times are seconds from the start of the song and never exceed
+    :attr:`period`; ``times`` mirrors them for bisecting to a bar.
+    """
+
+    bursts: list[Burst]
+    times: list[float]
+    programs: list[Message]
+    bar_seconds: float
+    length_bars: int
+    phrase_len_bars: int
+
+    @property
+    def period(self) -> float:
+        return self.bar_seconds * self.length_bars
+
+
+def encode_song(artifacts: SongArtifacts, include_parts=PART_ORDER) -> EncodedSong:
+    """Merge the requested parts of ``artifacts`` into an :class:`EncodedSong`.
+
+    Events humanized past the last bar line are clamped onto it so the loop
+    period stays exactly ``length_bars`` bars.
+    """
+    ctrl = artifacts.ctrl
+    names = [name for name in PART_ORDER if name in include_parts and name in artifacts.part_events]
+    buffers = [artifacts.part_events[name] for name in names]
+    seconds_per_tick = mido.bpm2tempo(ctrl.bpm) / (1e6 * PPQ)
+    end_tick = ctrl.length_bars * PPQ * 4
+
+    timed: list[tuple[float, Message]] = []
+    programs: list[Message] = []
+    for tick, part_no, i in merge_runs(buffers):
+        msg = buffers[part_no].message(i)
+        if msg.type == "program_change":
+            programs.append(msg)
+        timed.append((min(max(tick, 0), end_tick) * seconds_per_tick, msg))
+
+    song_bursts = list(bursts(timed))
+    return EncodedSong(
+        bursts=song_bursts,
+        times=[t for t, _ in song_bursts],
+        programs=programs,
+        bar_seconds=PPQ * 4 * seconds_per_tick,
+        length_bars=ctrl.length_bars,
+        phrase_len_bars=max(1, artifacts.plan.phrase_len_bars),
+    )
+
+
+class LoopSchedule:
+    """Endless burst schedule that loops a song and hot-swaps queued songs.
+
+    A song passed to :meth:`queue` (from any thread) takes over at the next
+    bar or phrase boundary of the playing song and continues from the same
+    bar position. Notes still sounding at the swap get a note-off in the same
+    burst as the new song's program changes, so nothing hangs.
+    """
+
+    def __init__(self, song: EncodedSong, boundary: str = "phrase"):
+        if boundary not in ("bar", "phrase"):
+            raise ValueError(f"boundary must be 'bar' or 'phrase', not {boundary!r}")
+        self.song = song
+        self.boundary = boundary
+        self.swaps = 0
+        self._pending: EncodedSong | None = None
+        self._lock = threading.Lock()
+
+    def queue(self, song: EncodedSong) -> None:
+        with self._lock:
+            self._pending = song
+
+    def _take_pending(self) -> EncodedSong:
+        # Read and clear together, so a song queued meanwhile is never dropped.
+        with self._lock:
+            song, self._pending = self._pending, None
+        return song
+
+    def _swap_time(self, song: EncodedSong, t: float) -> float:
+        bars = song.phrase_len_bars if self.boundary == "phrase" else 1
+        unit = bars * song.bar_seconds
+        return min(math.ceil(t / unit - 1e-9) * unit, song.period)
+
+    def __iter__(self) -> Iterator[Burst]:
+        song = self.song
+        base = 0.0  # playback time of the current song's t=0
+        i = 0
+        swap_at: float | None = None
+        sounding: set[tuple[int, int]] = set()
+        while True:
+            if swap_at is None and self._pending is not None:
+                swap_at = self._swap_time(song, song.times[i] if i < len(song.times) else song.period)
+
+            if swap_at is not None and (i == len(song.times) or song.times[i] >= swap_at):
+                new = self._take_pending()
+                bar = round(swap_at / song.bar_seconds) % new.length_bars
+                offset = bar * new.bar_seconds
+                at = base + swap_at
+                release = [Message("note_off", channel=c, note=n, velocity=0) for c, n in sorted(sounding)]
+                sounding.clear()
+                yield at, release + new.programs
+                song = self.song = new
+                base = at - offset
+                i = bisect_left(song.times, offset)
+                swap_at = None
+                self.swaps += 1
+                continue
+
+            if i == len(song.times):
+                if not song.times:
+                    yield base + song.period, []
+                base += song.period
+                i = 0
+                continue
+
+            t, messages = song.bursts[i]
+            i += 1
+            for msg in messages:
+                if msg.type == "note_on" and msg.velocity > 0:
+                    sounding.add((msg.channel, msg.note))
+                elif msg.type in ("note_on", "note_off"):
+                    sounding.discard((msg.channel, msg.note))
+            yield base + t, messages
@@ -1,69 +1,194 @@
 from __future__ import annotations
 
 import threading
-import time
-from typing import Callable, Optional
+from typing import Callable, Iterable, Optional
 
 import mido
-from mido import MidiFile
+from mido import Message, MidiFile
+
+from .artifacts import PART_ORDER, SongArtifacts
+from .playback import Burst, LoopSchedule, PlaybackEngine, bursts, encode_song, midifile_schedule, stream_schedule
+from .ports import PortPool
+from .telemetry import PlaybackTelemetry
 
 
 class MidiPlayer:
-    def __init__(self):
+    """Plays songs on a background thread through a MIDI output.
+
+    With ``collect_telemetry`` each playback gets a fresh
+    :class:`~mind.telemetry.PlaybackTelemetry` in :attr:`telemetry`, and
+    :attr:`telemetry_key` holds the artifacts key of the song it was recorded
+    for (None when unknown). Output ports come from :attr:`ports` and stay
+    open between plays.
+    """
+
+    def __init__(self, collect_telemetry: bool = False, ports: Optional[PortPool] = None):
+        self.collect_telemetry = collect_telemetry
+        self.ports = ports or PortPool()
+        self.telemetry: Optional[PlaybackTelemetry] = None
+        self.telemetry_key: Optional[str] = None
         self._thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
+        self._engine: Optional[PlaybackEngine] = None
+        self._loop: Optional[LoopSchedule] = None
+        self._loop_parts = PART_ORDER
+        self._queued = 0
         self._lock = threading.Lock()
         self._is_playing = False
+        self._run = 0  # id of the current playback run
 
     def is_playing(self) -> bool:
         with self._lock:
             return self._is_playing
 
+    def is_looping(self) -> bool:
+        return self._loop is not None and self.is_playing()
+
+    def is_paused(self) -> bool:
+        engine = self._engine
+        return engine is not None and engine.paused
+
     def stop(self) -> None:
-        self._stop_event.set()
+        if self._engine is not None:
+            self._engine.stop()
+
+    def pause(self) -> None:
+        """Hold playback; sounding notes are released until :meth:`resume`."""
+        if self._engine is not None:
+            self._engine.pause()
+
+    def resume(self) -> None:
+        if self._engine is not None:
+            self._engine.resume()
+
+    def play_midifile(
+        self,
+        mid: MidiFile,
+        output_name: str | None,
+        on_done: Optional[Callable[[], None]] = None,
+        key: str | None = None,
+    ) -> None:
+        """Play ``mid``; ``key`` is the artifacts key it was built from, if any."""
+        self._start(midifile_schedule(mid), output_name, on_done, key)
+
+    def play_stream(
+        self,
+        messages: Iterable[Message],
+        bpm: int,
+        output_name: str | None,
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Play delta-tick messages as they are produced.
+
+        ``messages`` is typically :func:`mind.midi_build.iter_song_messages`:
+        the first bar sounds while later bars are still being generated.
+        """
+        self._start(bursts(stream_schedule(messages, mido.bpm2tempo(bpm))), output_name, on_done)
+
+    def play_loop(
+        self,
+        artifacts: SongArtifacts,
+        output_name: str | None,
+        include_parts=PART_ORDER,
+        boundary: str = "phrase",
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Loop ``artifacts`` without gaps until stopped; see :meth:`queue_song`."""
+        loop = LoopSchedule(encode_song(artifacts, include_parts), boundary=boundary)
+        self._start(loop, output_name, on_done, artifacts.key)
+        self._loop, self._loop_parts = loop, include_parts
+
+    def queue_song(self, artifacts: SongArtifacts) -> Optional[threading.Thread]:
+        """Hand a regenerated song to the running loop.
+
+        The song is encoded on a background thread; the loop switches to it at
+        the next bar/phrase boundary. If several songs are queued while one is
+        still encoding, only the most recent one is used.
+        """
+        loop = self._loop
+        if loop is None or not self.is_playing():
+            return None
+        self._queued += 1
+        ticket = self._queued
+        self.telemetry_key = None  # the recording now spans more than one song
 
-    def play_midifile(self, mid: MidiFile, output_name: str | None, on_done: Optional[Callable[[], None]] = None) -> None:
-        if self.is_playing():
+        def encode():
+            song = encode_song(artifacts, self._loop_parts)
+            if ticket == self._queued and self._loop is loop:
+                loop.queue(song)
+
+        worker = threading.Thread(target=encode, daemon=True)
+        worker.start()
+        return worker
+
+    def _start(
+        self,
+        schedule: Iterable[Burst],
+        output_name: str | None,
+        on_done: Optional[Callable[[], None]],
+        key: str | None = None,
+    ) -> None:
+        previous = self._thread
+        if previous is not None and previous.is_alive() and previous is not threading.current_thread():
+            # The engine checks for a stop before every burst, so the old run
+            # ends promptly; waiting for it keeps two runs off the same port.
             self.stop()
-            time.sleep(0.05)
+            previous.join()
 
-        self._stop_event.clear()
+        self._loop = None
+        engine = self._engine = PlaybackEngine()
+        telemetry = self.telemetry = PlaybackTelemetry() if self.collect_telemetry else None
+        self.telemetry_key = key
 
         def run():
             out = None
+            name = None
+            sounding: set[tuple[int, int]] = set()
+
+            def send(msg: Message) -> None:
+                nonlocal out
+                if msg.type == "note_on" and msg.velocity > 0:
+                    sounding.add((msg.channel, msg.note))
+                elif msg.type in ("note_on", "note_off"):
+                    sounding.discard((msg.channel, msg.note))
+                try:
+                    out.send(msg)
+                except Exception:
+                    # The device may have gone away; reopen it once and retry.
+                    out = self.ports.reconnect(name)
+                    out.send(msg)
+
+            def release() -> None:
+                for channel, note in sorted(sounding):
+                    out.send(Message("note_off", channel=channel, note=note, velocity=0))
+                sounding.clear()
+
             try:
-                with self._lock:
-                    self._is_playing = True
+                name = self.ports.resolve(output_name)
+                if name is not None:
+                    out = self.ports.acquire(name)
 
-                if output_name:
-                    out = mido.open_output(output_name)
+                if out is not None:
+                    engine.run(schedule, send, on_pause=release, telemetry=telemetry)
+                    release()
                 else:
-                    names = mido.get_output_names()
-                    if names:
-                        out = mido.open_output(names[0])
-
-                for msg in mid.play():
-                    if self._stop_event.is_set():
-                        break
-                    if out and not msg.is_meta:
-                        out.send(msg)
+                    engine.run(schedule, lambda msg: None, telemetry=telemetry)
 
             except Exception as e:
                 err = str(e)
                 print("MIDI playback error:", err)
             finally:
-                try:
-                    if out:
-                        out.close()
-                except Exception:
-                    pass
                 with self._lock:
-                    self._is_playing = False
+                    if self._run == run_id:
+                        self._is_playing = False
                 if on_done:
                     try:
                         on_done()
                     except Exception:
                         pass
 
+        with self._lock:
+            self._run += 1
+            run_id = self._run
+            self._is_playing = True
         self._thread = threading.Thread(target=run, daemon=True)
         self._thread.start()
@@ -0,0 +1,109 @@
+"""Persistent MIDI output ports.
+
+Opening a port (and listing them) can take hundreds of milliseconds on some
+backends. :class:`PortPool` does both on one background worker, keeps opened
+ports across plays and reopens a port whose device went away. Backend calls
+are serialized on the worker because not every backend is thread-safe.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import mido
+
+
+class PortPool:
+    """Named MIDI output ports, opened in the background and kept open across plays."""
+
+    def __init__(
+        self,
+        open_output: Callable[[str], Any] = None,
+        get_output_names: Callable[[], list[str]] = None,
+    ):
+        self._open_output = open_output or mido.open_output
+        self._get_output_names = get_output_names or mido.get_output_names
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="midi-ports")
+        self._lock = threading.Lock()
+        self._ports: dict[str, Future] = {}
+        self._names: Optional[list[str]] = None
+
+    def refresh(self) -> Future:
+        """Enumerate output names in the background; the future yields the list."""
+        return self._executor.submit(self._list)
+
+    def _list(self) -> list[str]:
+        self._names = list(self._get_output_names())
+        return self._names
+
+    def names(self) -> list[str]:
+        """Last enumerated output names (enumerates once, blocking, if never listed)."""
+        if self._names is None:
+            return self.refresh().result()
+        return list(self._names)
+
+    def prepare(self, name: str) -> Future:
+        """Start opening ``name`` in the background unless it is open or opening."""
+        with self._lock:
+            fut = self._ports.get(name)
+            if fut is None or not _usable(fut):
+                fut = self._ports[name] = self._executor.submit(self._open_output, name)
+            return fut
+
+    def resolve(self, name: str | None) -> str | None:
+        """``name`` itself, or the first listed output when empty (None without outputs)."""
+        if name:
+            return name
+        names = self.names()
+        return names[0] if names else None
+
+    def acquire(self, name: str, timeout: float | None = 10.0):
+        """The open port for ``name``, waiting for a background open if needed."""
+        return self.prepare(name).result(timeout)
+
+    def invalidate(self, name: str) -> None:
+        """Forget (and close) the port for ``name``; the next acquire reopens it."""
+        with self._lock:
+            fut = self._ports.pop(name, None)
+        if fut is not None:
+            _close_when_open(fut)
+
+    def reconnect(self, name: str, timeout: float | None = 10.0):
+        """Reopen ``name`` after a send failed (e.g. the device was unplugged and came back)."""
+        self.invalidate(name)
+        self.refresh()
+        return self.acquire(name, timeout)
+
+    def close_all(self) -> None:
+        """Close every port, including ones still opening (they close once open)."""
+        with self._lock:
+            futures = list(self._ports.values())
+            self._ports.clear()
+        for fut in futures:
+            _close_when_open(fut)
+
+    def close(self) -> None:
+        """Close every port and stop the background worker; the pool is unusable afterwards."""
+        self.close_all()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _usable(fut: Future) -> bool:
+    if not fut.done():
+        return True
+    if fut.exception() is not None:
+        return False
+    return not getattr(fut.result(), "closed", False)
+
+
+def _close_when_open(fut: Future) -> None:
+    """Close the port ``fut`` opens: now if it is open, otherwise when the open finishes."""
+    fut.add_done_callback(lambda f: None if f.cancelled() or f.exception() is not None else _close(f.result()))
+
+
+def _close(port) -> None:
+    try:
+        port.close()
+    except Exception:
+        pass
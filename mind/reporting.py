@@ -3,9 +3,8 @@ from __future__ import annotations
 from dataclasses import asdict
 from typing import Any
 
-from mido import Message
-
 from .constants import DRUM_CHANNEL, PPQ, STYLE_RHYTHM_ARCHETYPES, LEVEL2_KNOB_METADATA, level2_knob_label
+from .events import EventBuffer, as_event_buffer
 from .models import Controls, SongPlan, ChordSegment
 from .control_mapping import map_controls
 from .utils import pc_to_name, midi_note_name, clamp, ticks_to_time_seconds, bar_of_tick, step_of_tick_in_bar
@@ -14,22 +13,15 @@ from .theory.engine import analyze as analyze_plugins, registered as registered_
 from .theory.rhythm import analyze_rhythm
 from .theory.melody_analysis import analyze_melody_events
 from .theory.counterpoint import analyze_counterpoint
-from .melody import contour_offset
+from .harmony import SegmentIndex
+from .planning import MULTIPLIERS, PHRASE_END, SECTION_END, SECTION_START, bar_columns
 
 
-def _extract_note_ons(events: list[tuple[int, Message]], channel: int | None = None, drum: bool = False):
-    note_ons = []
-    for abs_tick, msg in events:
-        if msg.type != "note_on":
-            continue
-        if msg.velocity is None or msg.velocity <= 0:
-            continue
-        if channel is not None and getattr(msg, "channel", None) != channel:
-            continue
-        if drum and getattr(msg, "channel", None) != DRUM_CHANNEL:
-            continue
-        note_ons.append((abs_tick, msg))
-    return note_ons
+def _note_on_columns(events: EventBuffer, channel: int | None = None) -> tuple[list[int], list[int], list[int]]:
+    """Return (ticks, notes, velocities) of the sounding note-ons in ``events``."""
+    idx = events.note_on_indices(channel)
+    ticks, notes, velocities = events.tick, events.note, events.velocity
+    return [ticks[i] for i in idx], [notes[i] for i in idx], [velocities[i] for i in idx]
 
 
 def _value_changed(current: Any, base: Any, tol: float = 1e-6) -> bool:
@@ -42,10 +34,20 @@ def build_song_report(
     ctrl: Controls,
     plan: SongPlan,
     chord_segments: list[ChordSegment],
-    part_events: dict[str, list[tuple[int, Message]]],
+    part_events: dict[str, EventBuffer],
     run_plugins: bool = True,
+    playback: dict[str, Any] | None = None,
+    segment_index: SegmentIndex | None = None,
 ):
-    """Build a JSON-serializable report for later analysis."""
+    """Build a JSON-serializable report for later analysis.
+
+    ``segment_index`` is the song's :class:`mind.harmony.SegmentIndex` when
+    the caller already has one; otherwise it is built here. Plugins receive
+    it as ``data["segment_index"]``.
+
+    ``playback`` (e.g. :meth:`mind.telemetry.PlaybackTelemetry.summary`) is
+    added as an optional ``playback`` section.
+    """
     style_key = (ctrl.derived.progression_style or "pop").strip().lower()
     base_derived = map_controls(ctrl.style_mood, seed=ctrl.seed)
     level2_overrides: dict[str, dict[str, Any]] = {}
@@ -125,32 +127,31 @@ def build_song_report(
         "layers": {},
     }
 
+    if segment_index is None:
+        segment_index = SegmentIndex(chord_segments, ctrl.length_bars)
+
     key_context = {"key_name": ctrl.key_name, "mode": ctrl.mode}
+    columns = bar_columns(plan)
     for b in range(ctrl.length_bars):
-        mod = plan.bar_mods[b]
         cadence_type = None
-        if mod.is_phrase_end:
+        if columns.flag(b, PHRASE_END):
             phrase_start = max(0, b - plan.phrase_len_bars + 1)
-            phrase_chords = [seg for seg in chord_segments if phrase_start <= seg.bar_index <= b]
+            phrase_chords = segment_index.between(phrase_start, b)
             cadence_type = detect_cadence(phrase_chords, key_context)
+        flags = columns.flags[b]
         report["bars"].append(
             {
                 "bar_index": b,
-                "section": mod.section,
-                "is_phrase_end": mod.is_phrase_end,
-                "is_section_start": mod.is_section_start,
-                "is_section_end": mod.is_section_end,
+                "section": columns.section(b),
+                "is_phrase_end": bool(flags & PHRASE_END),
+                "is_section_start": bool(flags & SECTION_START),
+                "is_section_end": bool(flags & SECTION_END),
                 "cadence": cadence_type,
                 "multipliers": {
-                    "density_mul": mod.density_mul,
-                    "energy_mul": mod.energy_mul,
-                    "sync_mul": mod.sync_mul,
-                    "chord_comp_mul": mod.chord_comp_mul,
-                    "variation_mul": mod.variation_mul,
-                    "repetition_mul": mod.repetition_mul,
-                    "melody_shift_semitones": mod.melody_shift_semitones,
+                    **{name: columns.value(name, b) for name in MULTIPLIERS},
+                    "melody_shift_semitones": columns.melody_shift[b],
                 },
-                "contour_offset_semitones": contour_offset(plan.contour, b, ctrl.length_bars),
+                "contour_offset_semitones": columns.contour_offset(b),
             }
         )
 
@@ -178,19 +179,18 @@ def build_song_report(
         )
 
     for layer_name, events in part_events.items():
-        ons = _extract_note_ons(events, drum=(layer_name == "drums"))
-        pitches = [m.note for _, m in ons]
-        velocities = [m.velocity for _, m in ons]
-        bars = [bar_of_tick(t) for t, _ in ons]
-        steps = [step_of_tick_in_bar(t) for t, _ in ons]
+        events = as_event_buffer(events)
+        ticks, pitches, velocities = _note_on_columns(events, DRUM_CHANNEL if layer_name == "drums" else None)
+        bars = [bar_of_tick(t) for t in ticks]
+        steps = [step_of_tick_in_bar(t) for t in ticks]
 
         layer: dict[str, Any] = {
-            "note_on_count": len(ons),
+            "note_on_count": len(ticks),
             "unique_pitches": sorted(set(pitches)),
             "pitch_range": [min(pitches), max(pitches)] if pitches else None,
             "avg_pitch": (sum(pitches) / len(pitches)) if pitches else None,
             "avg_velocity": (sum(velocities) / len(velocities)) if velocities else None,
-            "rhythm": analyze_rhythm([t for t, _ in ons], ctrl.length_bars),
+            "rhythm": analyze_rhythm(ticks, ctrl.length_bars),
             "notes_per_bar": {},
             "steps_histogram": {},
             "preview": [],
@@ -207,23 +207,23 @@ def build_song_report(
             sh[s] = sh.get(s, 0) + 1
         layer["steps_histogram"] = {str(k): v for k, v in sorted(sh.items(), key=lambda x: x[0])}
 
-        for abs_tick, msg in ons[:60]:
+        for abs_tick, note, velocity in zip(ticks[:60], pitches[:60], velocities[:60]):
             layer["preview"].append(
                 {
                     "time_sec": round(ticks_to_time_seconds(abs_tick, ctrl.bpm), 4),
                     "bar": bar_of_tick(abs_tick),
                     "step": step_of_tick_in_bar(abs_tick),
-                    "note": int(msg.note),
-                    "note_name": midi_note_name(int(msg.note)) if layer_name != "drums" else int(msg.note),
-                    "velocity": int(msg.velocity),
+                    "note": int(note),
+                    "note_name": midi_note_name(int(note)) if layer_name != "drums" else int(note),
+                    "velocity": int(velocity),
                 }
             )
 
         report["layers"][layer_name] = layer
 
-    melody_events = part_events.get("melody", [])
+    melody_events = as_event_buffer(part_events.get("melody"))
     report["melody"] = analyze_melody_events(melody_events)
-    harmony_events = part_events.get("harmony", [])
+    harmony_events = as_event_buffer(part_events.get("harmony"))
     report["counterpoint"] = analyze_counterpoint(melody_events, harmony_events)
 
     if run_plugins and registered_plugins():
@@ -231,9 +231,13 @@ def build_song_report(
             "controls": ctrl,
             "plan": plan,
             "chord_segments": chord_segments,
+            "segment_index": segment_index,
             "part_events": part_events,
             "report": report,
         }
         report["plugins"] = analyze_plugins(plugin_data)
 
+    if playback is not None:
+        report["playback"] = playback
+
     return report
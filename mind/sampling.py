@@ -0,0 +1,114 @@
+"""Reusable weighted samplers for fixed ``(item, weight)`` tables.
+
+A :class:`WeightedSampler` does the per-table work (totals, cumulative sums,
+alias tables) once, so drawing from it is cheap:
+
+- ``"compat"`` bisects the cumulative weights and makes exactly the draws
+  :func:`mind.utils.pick_weighted` makes, so a seed yields the same output;
+  ``sample`` repeats that draw until it has ``k`` distinct items, like the
+  rejection loops it replaces.
+- ``"alias"`` uses Vose's alias method (one ``rng.random()`` per O(1) draw)
+  and Efraimidis-Spirakis keys for sampling without replacement. Same
+  distribution, different seed -> output mapping.
+
+Samplers for literal tables are shared through :func:`cached_sampler`.
+"""
+from __future__ import annotations
+
+import heapq
+import random
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Iterable
+
+SAMPLING_METHODS = ("compat", "alias")
+
+
+class WeightedSampler:
+    """Draws items of a fixed table with probability proportional to their weight."""
+
+    __slots__ = ("items", "weights", "method", "_total", "_cumulative", "_prob", "_alias")
+
+    def __init__(self, items_with_weights: Iterable[tuple[Any, float]], method: str = "compat"):
+        if method not in SAMPLING_METHODS:
+            raise ValueError(f"Unknown sampling method {method!r}; expected one of {SAMPLING_METHODS}")
+        pairs = list(items_with_weights)
+        if not pairs:
+            raise ValueError("WeightedSampler needs at least one item")
+        self.items, self.weights = zip(*pairs)
+        if min(self.weights) < 0:
+            raise ValueError("Weights must be non-negative")
+        self.method = method
+
+        # Same summation order as pick_weighted, so the float totals agree.
+        self._total = sum(self.weights)
+        self._cumulative = list(accumulate(self.weights)) if method == "compat" else []
+        # The alias table is only needed by draw(), so it is built on the first one.
+        self._prob: list[float] = []
+        self._alias: list[int] = []
+
+    def _build_alias(self) -> None:
+        n = len(self.weights)
+        total = sum(self.weights)
+        scaled = [w * n / total for w in self.weights] if total > 0 else [1.0] * n
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            g = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] = (scaled[g] + scaled[s]) - 1.0
+            (small if scaled[g] < 1.0 else large).append(g)
+        # Leftovers are 1.0 up to rounding error.
+        self._prob = prob
+        self._alias = alias
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        return f"WeightedSampler({len(self.items)} items, method={self.method!r})"
+
+    def draw(self, rng: random.Random):
+        """One item (with replacement)."""
+        if self.method == "alias":
+            if not self._prob:
+                self._build_alias()
+            u = rng.random() * len(self.items)
+            i = int(u)
+            return self.items[i if u - i < self._prob[i] else self._alias[i]]
+        if not self._total:
+            # pick_weighted with nothing to weigh: only a draw of exactly 0.0
+            # reaches the first item, anything else falls through to the last.
+            return self.items[0] if rng.random() == 0.0 else self.items[-1]
+        i = bisect_left(self._cumulative, rng.random() * self._total)
+        return self.items[i] if i < len(self.items) else self.items[-1]
+
+    def sample(self, rng: random.Random, k: int) -> list:
+        """Up to ``k`` distinct items, in the order they were drawn.
+
+        Never returns more items than have a positive weight.
+        """
+        k = min(k, sum(1 for w in self.weights if w > 0))
+        if k <= 0:
+            return []
+        if self.method == "alias":
+            # Efraimidis-Spirakis: the k largest u ** (1 / w) keys.
+            keyed = ((rng.random() ** (1.0 / w), i) for i, w in enumerate(self.weights) if w > 0)
+            return [self.items[i] for _, i in heapq.nlargest(k, keyed)]
+        chosen: list = []
+        while len(chosen) < k:
+            item = self.draw(rng)
+            if item not in chosen:
+                chosen.append(item)
+        return chosen
+
+
+@lru_cache(maxsize=512)
+def cached_sampler(items_with_weights: tuple[tuple[Any, float], ...], method: str = "compat") -> WeightedSampler:
+    """Shared sampler for a hashable (tuple-of-pairs) table."""
+    return WeightedSampler(items_with_weights, method)
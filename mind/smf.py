@@ -0,0 +1,154 @@
+"""Direct Standard MIDI File writer.
+
+Encodes EventBuffer columns straight into SMF bytes (delta-time VLQs and
+running status) without building mido Message objects. For type 1 output the
+bytes are identical to ``MidiFile.save`` on the tracks built by
+:mod:`mind.midi_build`.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from typing import Sequence
+
+import mido
+
+from .constants import PPQ
+from .events import KIND_NOTE_OFF, KIND_NOTE_ON, KIND_PROGRAM, EventBuffer, merged_chunks
+
+# Status nibbles indexed by event kind.
+_STATUS = {KIND_PROGRAM: 0xC0, KIND_NOTE_OFF: 0x80, KIND_NOTE_ON: 0x90}
+
+_END_OF_TRACK = b"\xff\x2f\x00"
+
+
+def _vlq(value: int, out: bytearray) -> None:
+    """Append ``value`` as a MIDI variable-length quantity."""
+    if value < 0x80:
+        out.append(value)
+        return
+    buf = [value & 0x7F]
+    value >>= 7
+    while value:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.extend(reversed(buf))
+
+
+def _meta(meta_type: int, payload: bytes, out: bytearray) -> None:
+    out.append(0xFF)
+    out.append(meta_type)
+    _vlq(len(payload), out)
+    out.extend(payload)
+
+
+def _track_name(name: str, out: bytearray) -> None:
+    out.append(0)
+    _meta(0x03, name.encode("latin-1"), out)
+
+
+def encode_events(buffers: Sequence[EventBuffer], out: bytearray) -> None:
+    """Append the channel events of ``buffers`` to ``out`` with running status.
+
+    Events are pulled from the lazy k-way merge of every buffer's runs
+    (:func:`mind.events.merged_chunks`), so several parts interleave into
+    one track without building a merged copy first.
+    """
+    columns = [(b.channel, b.note, b.velocity) for b in buffers]
+    running = None
+    last_tick = 0
+    append = out.append
+    for chunk in merged_chunks(buffers):
+        for tick, kind, part_no, i in chunk:
+            delta = tick - last_tick if tick > last_tick else 0
+            last_tick = tick
+            if delta < 0x80:
+                append(delta)
+            else:
+                _vlq(delta, out)
+
+            channels, notes, velocities = columns[part_no]
+            status = _STATUS[kind] | channels[i]
+            if status != running:
+                append(status)
+                running = status
+            append(notes[i])
+            if kind != KIND_PROGRAM:
+                append(velocities[i])
+
+
+def encode_tempo_track(bpm: int, out: bytearray, name: str = "PopKnobPlayer") -> None:
+    """Append the tempo/time-signature/name meta events (no end of track)."""
+    out.append(0)
+    _meta(0x51, mido.bpm2tempo(bpm).to_bytes(3, "big"), out)
+    out.append(0)
+    _meta(0x58, bytes((4, 2, 24, 8)), out)
+    _track_name(name, out)
+
+
+def _chunk(tag: bytes, data: bytes | bytearray, out: bytearray) -> None:
+    out.extend(tag)
+    out.extend(struct.pack(">I", len(data)))
+    out.extend(data)
+
+
+def encode_smf(
+    part_events: dict[str, EventBuffer],
+    bpm: int,
+    part_order: Sequence[str] | None = None,
+    smf_type: int = 1,
+    ticks_per_beat: int = PPQ,
+    song_name: str = "PopKnobPlayer",
+) -> bytearray:
+    """Encode parts into a complete Standard MIDI File.
+
+    Type 1 writes a tempo track plus one track per part (the mido layout);
+    type 0 writes a single track with every part interleaved by tick
+    (note-offs before note-ons on shared ticks).
+    """
+    names = [n for n in (part_order or part_events.keys()) if n in part_events]
+    out = bytearray()
+
+    if smf_type == 0:
+        track = bytearray()
+        encode_tempo_track(bpm, track, song_name)
+        encode_events([part_events[name] for name in names], track)
+        track.append(0)
+        track.extend(_END_OF_TRACK)
+        _chunk(b"MThd", struct.pack(">hhh", 0, 1, ticks_per_beat), out)
+        _chunk(b"MTrk", track, out)
+        return out
+
+    if smf_type != 1:
+        raise ValueError(f"Unsupported SMF type: {smf_type}")
+
+    _chunk(b"MThd", struct.pack(">hhh", 1, len(names) + 1, ticks_per_beat), out)
+    meta = bytearray()
+    encode_tempo_track(bpm, meta, song_name)
+    meta.append(0)
+    meta.extend(_END_OF_TRACK)
+    _chunk(b"MTrk", meta, out)
+    for name in names:
+        events = part_events[name]
+        track = bytearray()
+        _track_name(name, track)
+        encode_events((events,), track)
+        track.append(0)
+        track.extend(_END_OF_TRACK)
+        _chunk(b"MTrk", track, out)
+    return out
+
+
+def write_smf(data: bytes | bytearray, target) -> None:
+    """Write SMF bytes to a path, an OS file descriptor, or a writable buffer."""
+    if isinstance(target, int):
+        view = memoryview(data)
+        while view:
+            written = os.write(target, view)
+            view = view[written:]
+        return
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            f.write(data)
+        return
+    target.write(data)
@@ -0,0 +1,163 @@
+"""Speculative pre-generation of the songs a user is likely to ask for next.
+
+People mostly step through seeds looking for a good take, so after each
+finished song :class:`Speculator` builds its neighbours (seed +/- 1 by
+default, optionally the same seed in other styles or keys) in a small
+low-priority process pool and stores them in an
+:class:`mind.artifacts.ArtifactCache`. Stepping to the next seed is then a
+cache hit instead of a full rebuild.
+
+    cache = ArtifactCache(max_bytes=128 * 1024 * 1024)
+    speculator = Speculator(cache)
+    artifacts = cache.get_or_build(ctrl)
+    speculator.speculate(neighbour_controls(ctrl))
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import fields, replace
+from typing import Any, Iterable, Sequence
+
+from .artifacts import ArtifactCache, SongArtifacts, controls_key
+from .control_mapping import map_controls
+from .models import Controls, DerivedControls, Level2Knobs
+
+# Derived fields that are recomputed from level 1 rather than carried over as overrides.
+_REMAPPED = ("level1", "level2", "style_profile", "progression_style")
+
+
+def _with_seed_or_style(ctrl: Controls, seed: int, style: str) -> Controls:
+    """``ctrl`` re-mapped for another seed/style, keeping the caller's manual overrides.
+
+    Any derived value that differs from what :func:`map_controls` gives for
+    ``ctrl``'s own seed (humanize sliders, level 2 overrides) was set by hand
+    and is carried over; everything else is re-derived.
+    """
+    style_mood = replace(ctrl.style_mood, style=style)
+    base = map_controls(ctrl.style_mood, seed=ctrl.seed)
+    fresh = map_controls(style_mood, seed=seed)
+
+    level2_overrides = {
+        f.name: getattr(ctrl.derived.level2, f.name)
+        for f in fields(Level2Knobs)
+        if getattr(ctrl.derived.level2, f.name) != getattr(base.level2, f.name)
+    }
+    overrides: dict[str, Any] = {
+        f.name: getattr(ctrl.derived, f.name)
+        for f in fields(DerivedControls)
+        if f.name not in _REMAPPED and getattr(ctrl.derived, f.name) != getattr(base, f.name)
+    }
+    if level2_overrides:
+        overrides["level2"] = replace(fresh.level2, **level2_overrides)
+    return replace(ctrl, seed=seed, style_mood=style_mood, derived=replace(fresh, **overrides))
+
+
+def neighbour_controls(
+    ctrl: Controls,
+    seed_steps: Sequence[int] = (1, -1),
+    styles: Iterable[str] = (),
+    keys: Iterable[str] = (),
+) -> list[Controls]:
+    """Likely next requests after ``ctrl``, most likely first.
+
+    ``seed_steps`` are offsets from the current seed; ``styles`` and ``keys``
+    give the same seed in another style or key. Duplicates of ``ctrl`` are
+    skipped.
+    """
+    out = [_with_seed_or_style(ctrl, ctrl.seed + step, ctrl.style_mood.style) for step in seed_steps if step]
+    out += [_with_seed_or_style(ctrl, ctrl.seed, style) for style in styles if style != ctrl.style_mood.style]
+    out += [replace(ctrl, key_name=key) for key in keys if key != ctrl.key_name]
+    return out
+
+
+def _lower_priority() -> None:
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):  # pragma: no cover - Windows / restricted environments
+        pass
+
+
+def _build(ctrl: Controls) -> SongArtifacts:
+    from .midi_build import build_song_artifacts
+
+    return build_song_artifacts(ctrl)
+
+
+class Speculator:
+    """Builds likely next songs in the background and stores them in ``cache``.
+
+    Work runs in a ``nice``-d process pool so it does not compete with the UI
+    or playback threads for the GIL. Each :meth:`speculate` call replaces the
+    previous wish list: queued builds that are no longer wanted are cancelled
+    (a build already running is allowed to finish).
+    """
+
+    def __init__(self, cache: ArtifactCache, max_workers: int = 1, executor: Executor | None = None):
+        self.cache = cache
+        self._executor = executor or ProcessPoolExecutor(max_workers=max_workers, initializer=_lower_priority)
+        self._owns_executor = executor is None
+        self._pending: dict[str, Future] = {}
+        self._lock = threading.RLock()  # done-callbacks may run inline under speculate()
+        self._idle = threading.Condition(self._lock)
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def speculate(self, candidates: Iterable[Controls]) -> list[str]:
+        """Queue builds for the candidates not already cached; returns their keys."""
+        wanted = {controls_key(c): c for c in candidates}
+        queued = []
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if key not in wanted and future.cancel():
+                    self._pending.pop(key, None)  # the done-callback may already have run
+                    self.cancelled += 1
+            for key, ctrl in wanted.items():
+                if key in self.cache or key in self._pending:
+                    continue
+                future = self._executor.submit(_build, ctrl)
+                self._pending[key] = future
+                self.submitted += 1
+                queued.append(key)
+                future.add_done_callback(lambda f, key=key: self._done(key, f))
+        return queued
+
+    def pending(self) -> list[Future]:
+        with self._lock:
+            return list(self._pending.values())
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until every queued build has landed in the cache (or was dropped)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def _done(self, key: str, future: Future) -> None:
+        if not future.cancelled():
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.cache.put(future.result())
+                self.completed += 1
+        with self._idle:
+            self._pending.pop(key, None)
+            self._idle.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "cache": self.cache.stats(),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,109 @@
+"""Playback timing telemetry: scheduled-vs-sent jitter in fixed buckets.
+
+:class:`PlaybackTelemetry` is fed one ``(intended, sent)`` pair per message
+by :class:`mind.playback.PlaybackEngine`. Lateness goes into a fixed log-linear
+histogram (8 sub-buckets per power of two of microseconds, so percentiles are
+within ~12% of the true value) and a handful of running sums; nothing grows
+with the number of events.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from typing import Any
+
+_SUB_BUCKETS = 8
+_OCTAVES = 24  # 1 us .. ~16.8 s
+
+# Upper bucket edges in microseconds; bucket i holds lateness < EDGES_US[i].
+EDGES_US: tuple[float, ...] = tuple(
+    (1 << octave) * (1 + sub / _SUB_BUCKETS) for octave in range(_OCTAVES) for sub in range(_SUB_BUCKETS)
+)
+
+
+class PlaybackTelemetry:
+    """Streaming jitter statistics for one playback.
+
+    Times are seconds on the playback timeline: ``intended`` is the burst's
+    schedule time, ``sent`` the engine clock just before ``out.send``. Events
+    sent before their intended time count as early with zero lateness.
+    """
+
+    __slots__ = ("late_threshold", "counts", "events", "early", "late", "max_s", "_sum", "_sx", "_sy", "_sxx", "_sxy")
+
+    def __init__(self, late_threshold: float = 0.001):
+        self.late_threshold = late_threshold
+        self.counts = array("Q", bytes(8 * (len(EDGES_US) + 1)))
+        self.reset()
+
+    def reset(self) -> None:
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.events = 0
+        self.early = 0
+        self.late = 0
+        self.max_s = 0.0
+        self._sum = 0.0
+        # Running sums for the least-squares slope of lateness over time.
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def record(self, intended: float, sent: float) -> None:
+        jitter = sent - intended
+        if jitter < 0.0:
+            self.early += 1
+            jitter = 0.0
+        elif jitter > self.late_threshold:
+            self.late += 1
+        if jitter > self.max_s:
+            self.max_s = jitter
+        self.counts[bisect_right(EDGES_US, jitter * 1e6)] += 1
+        self.events += 1
+        self._sum += jitter
+        self._sx += intended
+        self._sy += jitter
+        self._sxx += intended * intended
+        self._sxy += intended * jitter
+
+    def percentile(self, q: float) -> float:
+        """Lateness (seconds) at quantile ``q`` in [0, 1], as its bucket's upper edge."""
+        if not self.events:
+            return 0.0
+        rank = q * self.events
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                edge = EDGES_US[i] / 1e6 if i < len(EDGES_US) else self.max_s
+                return min(edge, self.max_s)
+        return self.max_s
+
+    def drift_per_minute(self) -> float:
+        """Slope of lateness against schedule time, in seconds per minute."""
+        n = self.events
+        denom = n * self._sxx - self._sx * self._sx
+        if n < 2 or denom <= 0.0:
+            return 0.0
+        return (n * self._sxy - self._sx * self._sy) / denom * 60.0
+
+    def summary(self) -> dict[str, Any]:
+        """JSON-serializable summary (milliseconds), used as the report's ``playback`` section."""
+        lower = (0.0,) + EDGES_US
+        return {
+            "events": self.events,
+            "early_events": self.early,
+            "late_events": self.late,
+            "late_threshold_ms": self.late_threshold * 1e3,
+            "jitter_ms": {
+                "mean": self._sum / self.events * 1e3 if self.events else 0.0,
+                "p50": self.percentile(0.50) * 1e3,
+                "p90": self.percentile(0.90) * 1e3,
+                "p99": self.percentile(0.99) * 1e3,
+                "max": self.max_s * 1e3,
+            },
+            "drift_ms_per_min": self.drift_per_minute() * 1e3,
+            "histogram_us": [
+                [lower[i], EDGES_US[i] if i < len(EDGES_US) else None, count]
+                for i, count in enumerate(self.counts)
+                if count
+            ],
+        }
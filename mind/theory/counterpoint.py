@@ -2,41 +2,34 @@ from __future__ import annotations
 
 from typing import Any
 
-from mido import Message
+from ..events import EventBuffer, as_event_buffer
 
 
-def _extract_note_ons(events: list[tuple[int, Message]]) -> list[tuple[int, Message]]:
-    note_ons = []
-    for abs_tick, msg in events:
-        if msg.type != "note_on":
-            continue
-        if msg.velocity is None or msg.velocity <= 0:
-            continue
-        note_ons.append((abs_tick, msg))
-    return note_ons
+def _sorted_note_ons(events: EventBuffer) -> list[tuple[int, int]]:
+    """(tick, note) of the sounding note-ons, in time order."""
+    ticks, notes = events.tick, events.note
+    idx = sorted(events.note_on_indices(), key=lambda i: ticks[i])
+    return [(ticks[i], notes[i]) for i in idx]
 
 
-def _pair_voices(
-    melody_events: list[tuple[int, Message]],
-    harmony_events: list[tuple[int, Message]],
-) -> list[tuple[int, int, int]]:
-    melody_notes = sorted(_extract_note_ons(melody_events), key=lambda item: item[0])
-    harmony_notes = sorted(_extract_note_ons(harmony_events), key=lambda item: item[0])
+def _pair_voices(melody_events: EventBuffer, harmony_events: EventBuffer) -> list[tuple[int, int, int]]:
+    melody_notes = _sorted_note_ons(melody_events)
+    harmony_notes = _sorted_note_ons(harmony_events)
     pair_count = min(len(melody_notes), len(harmony_notes))
     pairs: list[tuple[int, int, int]] = []
     for idx in range(pair_count):
-        melody_tick, melody_msg = melody_notes[idx]
-        harmony_tick, harmony_msg = harmony_notes[idx]
+        melody_tick, melody_note = melody_notes[idx]
+        harmony_tick, harmony_note = harmony_notes[idx]
         tick = max(melody_tick, harmony_tick)
-        pairs.append((tick, melody_msg.note, harmony_msg.note))
+        pairs.append((tick, melody_note, harmony_note))
     return pairs
 
 
 def analyze_counterpoint(
-    melody_events: list[tuple[int, Message]],
-    harmony_events: list[tuple[int, Message]],
+    melody_events: EventBuffer | list,
+    harmony_events: EventBuffer | list,
 ) -> dict[str, Any]:
-    pairs = _pair_voices(melody_events, harmony_events)
+    pairs = _pair_voices(as_event_buffer(melody_events), as_event_buffer(harmony_events))
 
     parallel_fifths = []
     parallel_octaves = []
@@ -2,23 +2,19 @@ from __future__ import annotations
 
 from typing import Any
 
-from mido import Message
-
+from ..events import EventBuffer, as_event_buffer
 from ..utils import midi_note_name
 
 
-def _extract_note_ons(events: list[tuple[int, Message]]) -> list[tuple[int, Message]]:
-    note_ons = []
-    for abs_tick, msg in events:
-        if msg.type != "note_on":
-            continue
-        if msg.velocity is None or msg.velocity <= 0:
-            continue
-        note_ons.append((abs_tick, msg))
-    return note_ons
+def _note_on_pitches(events: EventBuffer) -> list[int]:
+    """Pitches of the sounding note-ons, in time order."""
+    ticks, notes = events.tick, events.note
+    idx = sorted(events.note_on_indices(), key=lambda i: ticks[i])
+    return [notes[i] for i in idx]
 
 
-def _contour_type(pitches: list[int]) -> str:
+def contour_type(pitches: list[int]) -> str:
+    """Contour class of a pitch sequence: static, ascending, descending, arch, valley or mixed."""
     if len(pitches) < 2:
         return "static"
 
@@ -43,13 +39,12 @@ def _contour_type(pitches: list[int]) -> str:
     return "mixed"
 
 
-def analyze_melody_events(events: list[tuple[int, Message]]) -> dict[str, Any]:
-    note_ons = sorted(_extract_note_ons(events), key=lambda item: item[0])
-    if not note_ons:
+def analyze_melody_events(events: EventBuffer | list) -> dict[str, Any]:
+    pitches = _note_on_pitches(as_event_buffer(events))
+    if not pitches:
         return {"contour": "silence", "leap_count": 0, "stepwise_ratio": 0.0, "climax_note": None}
 
-    pitches = [msg.note for _, msg in note_ons]
-    contour = _contour_type(pitches)
+    contour = contour_type(pitches)
     if len(pitches) < 2:
         return {
             "contour": contour,
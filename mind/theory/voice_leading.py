@@ -1,8 +1,15 @@
 from __future__ import annotations
 
 import random
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+from itertools import combinations
+from operator import add
+from typing import Iterable, Iterator, Sequence
 
-from ..utils import chord_tones_in_range, nearest_in_set
+from ..pcset import notes_in_range, pcs_mask
+from ..utils import nearest_in_sorted, tones_in_range
 
 
 def initial_voicing(
@@ -14,12 +21,11 @@ def initial_voicing(
     voice_count: int,
 ) -> list[int]:
     """Pick a starting voicing anchored around a center pitch."""
-    chord_notes = chord_tones_in_range(chord_pcs, low, high)
-    if not chord_notes:
+    chord_notes_sorted = tones_in_range(chord_pcs, low, high)
+    if not chord_notes_sorted:
         return []
 
-    chord_notes_sorted = sorted(set(chord_notes))
-    first = nearest_in_set(center, chord_notes_sorted)
+    first = nearest_in_sorted(center, chord_notes_sorted)
 
     voicing = [first]
     idx = chord_notes_sorted.index(first) if first in chord_notes_sorted else 0
@@ -46,11 +52,10 @@ def smooth_voice_leading(prev_voicing: list[int], chord_pcs: list[int], low: int
     if not prev_voicing:
         return []
 
-    target_notes = chord_tones_in_range(chord_pcs, low, high)
-    if not target_notes:
+    target_notes_sorted = tones_in_range(chord_pcs, low, high)
+    if not target_notes_sorted:
         return prev_voicing[:]
 
-    target_notes_sorted = sorted(set(target_notes))
     new_voicing: list[int] = []
     last_assigned = low - 1
 
@@ -58,12 +63,12 @@ def smooth_voice_leading(prev_voicing: list[int], chord_pcs: list[int], low: int
         if (v % 12) in chord_pcs and low <= v <= high:
             chosen = v
         else:
-            chosen = nearest_in_set(v, target_notes_sorted)
+            chosen = nearest_in_sorted(v, target_notes_sorted)
 
         if chosen <= last_assigned:
-            higher = [n for n in target_notes_sorted if n > last_assigned]
+            higher = target_notes_sorted[bisect_right(target_notes_sorted, last_assigned) :]
             if higher:
-                chosen = nearest_in_set(v, higher)
+                chosen = nearest_in_sorted(v, higher)
             else:
                 chosen = min(high, last_assigned + 1)
 
@@ -78,7 +83,7 @@ def smooth_voice_leading(prev_voicing: list[int], chord_pcs: list[int], low: int
         while cand in used and (cand + 12) <= high:
             cand += 12
         if cand in used:
-            higher = [x for x in target_notes_sorted if x > last]
+            higher = target_notes_sorted[bisect_right(target_notes_sorted, last) :]
             if higher:
                 cand = higher[0]
         cand = min(high, max(low, cand))
@@ -87,3 +92,169 @@ def smooth_voice_leading(prev_voicing: list[int], chord_pcs: list[int], low: int
         last = cand
 
     return fixed
+
+
+# -----------------------------
+# Globally optimal voice leading (Viterbi over the whole progression)
+# -----------------------------
+# Per chord a bounded set of candidate voicings is enumerated once per
+# (pitch classes, range, voice count, center) and scored on its own
+# (register + spacing); a DP pass then picks one candidate per chord so that
+# total voice motion plus those penalties is minimal. Transition matrices
+# between two candidate sets are memoized too, so a looping progression only
+# computes each k x k matrix once; the DP pass itself still does k x k work
+# per segment.
+
+VOICING_CANDIDATES = 24  # k: candidates kept per chord
+REGISTER_WEIGHT = 0.25  # per semitone the voicing's mean sits away from the center
+CLUSTER_PENALTY = 1.5  # per adjacent pair closer than a minor third
+WIDE_GAP_WEIGHT = 0.5  # per semitone an adjacent gap exceeds a perfect fifth
+LOW_CLUSTER_NOTE = 52  # below this, adjacent pairs closer than a fourth get muddy
+LOW_CLUSTER_PENALTY = 2.0
+MISSING_PC_PENALTY = 3.0  # per chord tone a voicing leaves out (beyond what the voice count forces)
+
+
+def _static_cost(voicing: tuple[int, ...], center: int) -> float:
+    cost = REGISTER_WEIGHT * abs(sum(voicing) / len(voicing) - center)
+    for lo_note, hi_note in zip(voicing, voicing[1:]):
+        gap = hi_note - lo_note
+        if gap < 3:
+            cost += CLUSTER_PENALTY
+        elif gap > 7:
+            cost += WIDE_GAP_WEIGHT * (gap - 7)
+        if gap < 5 and lo_note < LOW_CLUSTER_NOTE:
+            cost += LOW_CLUSTER_PENALTY
+    return cost
+
+
+@lru_cache(maxsize=2048)
+def _candidates(mask: int, low: int, high: int, voice_count: int, center: int) -> tuple[tuple[tuple[int, ...], ...], tuple[float, ...]]:
+    notes = notes_in_range(mask, low, high)
+    if not notes:
+        return (), ()
+    size = min(voice_count, len(notes))
+    coverage = min(size, mask.bit_count())
+    scored = []
+    for combo in combinations(notes, size):
+        missing = coverage - pcs_mask(n % 12 for n in combo).bit_count()
+        if missing <= 1:
+            scored.append((_static_cost(combo, center) + MISSING_PC_PENALTY * missing, combo))
+    scored.sort()
+    kept = scored[:VOICING_CANDIDATES]
+    return tuple(v for _, v in kept), tuple(c for c, _ in kept)
+
+
+def _motion(a: tuple[int, ...], b: tuple[int, ...]) -> int:
+    return sum(abs(x - y) for x, y in zip(a, b)) + 12 * abs(len(a) - len(b))
+
+
+@lru_cache(maxsize=4096)
+def _transitions(a_key: tuple, b_key: tuple) -> tuple[tuple[int, ...], ...]:
+    """``m[j][i]``: motion from candidate ``i`` of ``a_key`` to candidate ``j`` of ``b_key``."""
+    a, _ = _candidates(*a_key)
+    b, _ = _candidates(*b_key)
+    return tuple(tuple(_motion(x, y) for x in a) for y in b)
+
+
+def optimal_voice_leading(
+    chords: Iterable[Iterable[int]],
+    low: int,
+    high: int,
+    voice_count: int,
+    center: int | None = None,
+    start: Sequence[int] | None = None,
+) -> list[list[int]]:
+    """One voicing per chord minimizing total motion + register/spacing penalties.
+
+    ``chords`` are pitch-class lists; ``start`` is the voicing sounding before
+    the first chord (if any). A chord with no notes in range holds the
+    previous voicing (``[]`` if there is none yet). Cost is
+    O(len(chords) x k^2) for k = :data:`VOICING_CANDIDATES`.
+    """
+    if center is None:
+        center = (low + high) // 2
+    start_t = tuple(sorted(start)) if start else None
+
+    # Each layer: (candidate key, back pointers) or None for a held chord.
+    layers: list[tuple[tuple, list[int]] | None] = []
+    costs: list[float] = []
+    state_key: tuple | None = None
+    for pcs in chords:
+        key = (pcs_mask(p % 12 for p in pcs), low, high, voice_count, center)
+        cands, static = _candidates(*key)
+        if not cands:
+            layers.append(None)
+            continue
+        if state_key is None:
+            if start_t is None:
+                costs = list(static)
+            else:
+                costs = [s + _motion(start_t, c) for s, c in zip(static, cands)]
+            back = [-1] * len(cands)
+        else:
+            matrix = _transitions(state_key, key)
+            new_costs = []
+            back = []
+            for s, row in zip(static, matrix):
+                totals = list(map(add, costs, row))
+                best = min(totals)
+                new_costs.append(best + s)
+                back.append(totals.index(best))
+            costs = new_costs
+        layers.append((key, back))
+        state_key = key
+
+    out: list[list[int]] = [[] for _ in layers]
+    if state_key is None:
+        held = list(start_t) if start_t else []
+        return [held[:] for _ in layers]
+    j = min(range(len(costs)), key=costs.__getitem__)
+    for idx in range(len(layers) - 1, -1, -1):
+        layer = layers[idx]
+        if layer is None:
+            continue
+        key, back = layer
+        out[idx] = list(_candidates(*key)[0][j])
+        j = back[j]
+    held = list(start_t) if start_t else []
+    for idx, voicing in enumerate(out):
+        if layers[idx] is None:
+            out[idx] = held[:]
+        else:
+            held = voicing
+    return out
+
+
+def iter_optimal_voicings(
+    chords: Iterable[Iterable[int]],
+    low: int,
+    high: int,
+    voice_count: int,
+    center: int | None = None,
+    window: int = 16,
+    lookahead: int = 16,
+) -> Iterator[list[int]]:
+    """Streaming :func:`optimal_voice_leading`: one voicing per chord, lazily.
+
+    Solves ``window + lookahead`` chords at a time, commits the first
+    ``window`` voicings and continues from the last committed one, so at
+    most that many chords are read ahead of the voicing being yielded.
+    """
+    pending: deque = deque()
+    prev: list[int] | None = None
+    it = iter(chords)
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < window + lookahead:
+            try:
+                pending.append(list(next(it)))
+            except StopIteration:
+                exhausted = True
+        if not pending:
+            return
+        solved = optimal_voice_leading(pending, low, high, voice_count, center, start=prev)
+        commit = len(pending) if exhausted else window
+        for voicing in solved[:commit]:
+            pending.popleft()
+            yield voicing
+        prev = solved[commit - 1] or prev
@@ -5,18 +5,20 @@ import tkinter as tk
 from dataclasses import replace
 from tkinter import filedialog, messagebox, ttk
 
-import mido
-from mido import Message, MidiFile
+from mido import Message
 
 from .constants import DEFAULT_SEED, NOTE_NAMES, level2_knob_label, level2_knob_range
 from .control_mapping import map_controls
 from .models import Controls, Level2Knobs, StyleMoodControls
-from .midi_build import build_midifile, build_song_bundle
-from .planning import build_song_plan
+from .artifacts import ArtifactCache, SongArtifacts
+from .pipeline import STAGES as PIPELINE_STAGES, Pipeline
+from .planning import PHRASE_END, SECTION_END, SECTION_START, bar_columns, build_song_plan
 from .harmony import build_chord_segments
 from .player import MidiPlayer
+from .speculation import Speculator
 from .utils import clamp01, key_to_pc, lerp, scale_pcs, pc_to_name
 from .utils import midi_note_name
+from .worker import GenerationWorker
 
 
 def _fmt(x):
@@ -58,6 +60,8 @@ class App(tk.Tk):
 
         self.var_show_advanced = tk.BooleanVar(value=False)
         self.var_override_level2 = tk.BooleanVar(value=False)
+        self.var_timing = tk.BooleanVar(value=False)
+        self.var_optimal_voicing = tk.BooleanVar(value=False)
         self.var_level2_functional_clarity = tk.DoubleVar(value=0.70)
         self.var_level2_chromaticism = tk.DoubleVar(value=0.35)
         self.var_level2_extension_richness = tk.DoubleVar(value=0.40)
@@ -80,11 +84,12 @@ class App(tk.Tk):
         self.status_text = tk.StringVar(value="Ready.")
 
         self._cached_ctrl: Controls | None = None
-        self._cached_mid_full: MidiFile | None = None
-        self._cached_plan = None
-        self._cached_chords = None
-        self._cached_part_events = None
-        self._cached_report = None
+        self._artifacts: SongArtifacts | None = None
+        self._pipeline = Pipeline()
+        # Neighbouring seeds are pre-built while idle so stepping through takes is instant.
+        self._cache = ArtifactCache(max_bytes=128 * 1024 * 1024)
+        self._speculator = Speculator(self._cache)
+        self._worker = GenerationWorker(self._pipeline, cache=self._cache)
         self._level2_groove_combo: ttk.Combobox | None = None
         self._level2_lift_combo: ttk.Combobox | None = None
         self._level2_slider_labels: dict[str, ttk.Label] = {}
@@ -93,6 +98,7 @@ class App(tk.Tk):
         self._build_ui()
         self._refresh_outputs()
         self._regenerate()
+        self._poll_generation()
 
     def _build_ui(self):
         root = ttk.Frame(self, padding=12)
@@ -104,12 +110,15 @@ class App(tk.Tk):
         ttk.Label(top, text="MIDI Output:").pack(side="left")
         self.output_combo = ttk.Combobox(top, textvariable=self.var_output, state="readonly", width=52)
         self.output_combo.pack(side="left", padx=(6, 12))
+        self.output_combo.bind("<<ComboboxSelected>>", self._prepare_output)
 
         ttk.Button(top, text="Refresh Outputs", command=self._refresh_outputs).pack(side="left", padx=6)
 
         ttk.Label(top, text="Seed:").pack(side="left", padx=(18, 6))
         seed_entry = ttk.Entry(top, textvariable=self.var_seed, width=12)
         seed_entry.pack(side="left")
+        ttk.Button(top, text="<", width=2, command=lambda: self._step_seed(-1)).pack(side="left", padx=(4, 0))
+        ttk.Button(top, text=">", width=2, command=lambda: self._step_seed(1)).pack(side="left")
 
         ttk.Button(top, text="Regenerate", command=self._regenerate).pack(side="left", padx=8)
 
@@ -198,6 +207,12 @@ class App(tk.Tk):
             variable=self.var_show_advanced,
             command=self._toggle_advanced,
         ).pack(side="left")
+        ttk.Checkbutton(
+            adv_toggle_row,
+            text="Optimal voice leading",
+            variable=self.var_optimal_voicing,
+            command=self._regenerate,
+        ).pack(side="left", padx=(12, 0))
 
         self.grp_advanced = ttk.LabelFrame(left, text="Advanced: Level 2 Overrides")
         if self.var_show_advanced.get():
@@ -263,7 +278,13 @@ class App(tk.Tk):
         btn_row2 = ttk.Frame(grp_play)
         btn_row2.pack(fill="x", pady=6)
         ttk.Button(btn_row2, text="Stop", command=self.stop_playback).pack(side="left", padx=4)
+        ttk.Button(btn_row2, text="Pause/Resume", command=self.toggle_pause).pack(side="left", padx=4)
+        ttk.Button(btn_row2, text="Loop FULL", command=self.loop_full).pack(side="left", padx=4)
+        ttk.Checkbutton(
+            btn_row2, text="Record timing", variable=self.var_timing, command=self._on_timing_toggle
+        ).pack(side="left", padx=4)
         ttk.Button(btn_row2, text="Save MIDI...", command=self.save_midi).pack(side="left", padx=4)
+        ttk.Button(btn_row2, text="Save WAV...", command=self.save_wav).pack(side="left", padx=4)
         ttk.Button(btn_row2, text="Save Report (JSON)...", command=self.save_report).pack(side="left", padx=4)
 
         grp_info = ttk.LabelFrame(right, text="Info / Report Summary")
@@ -401,8 +422,15 @@ class App(tk.Tk):
         )
 
     def _refresh_outputs(self):
+        """Enumerate outputs on the port pool's worker; the result is applied via after()."""
+        self._poll_outputs(self.player.ports.refresh())
+
+    def _poll_outputs(self, future):
+        if not future.done():
+            self.after(50, self._poll_outputs, future)
+            return
         try:
-            names = mido.get_output_names()
+            names = future.result()
         except Exception as e:
             names = []
             print("Could not get MIDI outputs:", e)
@@ -415,8 +443,15 @@ class App(tk.Tk):
         current = self.var_output.get()
         if current not in names:
             self.var_output.set(names[0])
+        self._prepare_output()
 
-    def _get_controls(self) -> Controls:
+    def _prepare_output(self, _event=None):
+        """Open the selected output in the background so Play does not wait for it."""
+        name = self._selected_output_name()
+        if name:
+            self.player.ports.prepare(name)
+
+    def _get_controls(self, seed: int | None = None) -> Controls:
         style_label = str(self.var_style.get() or "Modern Pop")
         style = self.STYLE_LABELS.get(style_label, "pop")
         mood_brightness = clamp01(float(self.var_mood_brightness.get()))
@@ -425,7 +460,8 @@ class App(tk.Tk):
         intensity = clamp01(float(self.var_intensity.get()))
         complexity = clamp01(float(self.var_complexity.get()))
         tightness = clamp01(float(self.var_tightness.get()))
-        seed = int(self.var_seed.get() or DEFAULT_SEED)
+        if seed is None:
+            seed = int(self.var_seed.get() or DEFAULT_SEED)
 
         mood_valence = mood_brightness
         mood_arousal = mood_energy
@@ -455,37 +491,59 @@ class App(tk.Tk):
             seed=seed,
             style_mood=style_mood,
             derived=derived,
+            voice_leading="optimal" if self.var_optimal_voicing.get() else "greedy",
         )
 
     def _regenerate(self):
+        """Queue a rebuild for the current controls; results arrive in _poll_generation."""
         try:
             ctrl = self._get_controls()
             self._cached_ctrl = ctrl
             self._sync_level2_vars(ctrl.derived)
-
-            mid, plan, chord_segments, part_events, report = build_song_bundle(
-                ctrl, include_parts=("melody", "harmony", "bass", "drums")
-            )
-
-            self._cached_mid_full = mid
-            self._cached_plan = plan
-            self._cached_chords = chord_segments
-            self._cached_part_events = part_events
-            self._cached_report = report
-
-            self.status_text.set("Generated new pattern + report.")
-            self._render_info(ctrl)
+            self._worker.submit(ctrl)
+            self.status_text.set("Generating...")
         except Exception as e:
             self.status_text.set(f"Error generating: {e}")
             messagebox.showerror("Generation error", str(e))
 
+    def _poll_generation(self):
+        for result in self._worker.poll():
+            if result.error is not None:
+                self.status_text.set(f"Error generating: {result.error}")
+                messagebox.showerror("Generation error", str(result.error))
+                continue
+            self._artifacts = result.artifacts
+            if result.cached:
+                self.status_text.set("Loaded pre-generated take (cache hit).")
+            elif len(result.stages) == len(PIPELINE_STAGES):
+                self.status_text.set(f"Generated new pattern + report ({result.seconds:.2f}s).")
+            else:
+                self.status_text.set(f"Updated: {', '.join(result.stages) or 'nothing changed'}.")
+            self._render_info(result.ctrl)
+            if self.player.is_looping():
+                self.player.queue_song(self._artifacts)
+            self._speculate(result.ctrl)
+        self.after(40, self._poll_generation)
+
+    def _step_seed(self, step: int):
+        self.var_seed.set(int(self.var_seed.get() or DEFAULT_SEED) + step)
+        self._regenerate()
+
+    def _speculate(self, ctrl: Controls):
+        """Pre-build the neighbouring seeds with the current knob settings."""
+        try:
+            self._speculator.speculate([self._get_controls(seed=ctrl.seed + 1), self._get_controls(seed=ctrl.seed - 1)])
+        except (tk.TclError, ValueError):
+            pass  # a half-typed field; the next finished result retries
+
     def _render_info(self, ctrl: Controls):
         tonic_pc = key_to_pc(ctrl.key_name)
         scale = scale_pcs(tonic_pc, ctrl.mode)
 
-        plan = self._cached_plan or build_song_plan(ctrl)
-        chord_segments = self._cached_chords or build_chord_segments(ctrl, plan)
-        report = self._cached_report
+        artifacts = self._artifacts
+        plan = artifacts.plan if artifacts else build_song_plan(ctrl)
+        chord_segments = artifacts.chord_segments if artifacts else build_chord_segments(ctrl, plan)
+        report = artifacts.report if artifacts else None
 
         lines = []
         lines.append("POP KNOB PLAYER (Chords-first) — Seed-driven Pop Engine\n")
@@ -564,6 +622,7 @@ class App(tk.Tk):
         lines.append("")
 
         lines.append("Chord segments (by bar):")
+        columns = bar_columns(plan)
         by_bar = {}
         for seg in chord_segments:
             by_bar.setdefault(seg.bar_index, []).append(seg)
@@ -576,16 +635,17 @@ class App(tk.Tk):
                 pcs = ",".join([pc_to_name(pc) for pc in s.pcs])
                 borrow = " (borrowed)" if s.is_borrowed else ""
                 parts.append(f"{s.label}{borrow} {s.extension} [{s.start_step:02d}-{s.end_step:02d}] ({pcs})")
-            mod = plan.bar_mods[bar]
+            section = columns.section(bar)
+            bits = columns.flags[bar]
             flags = []
-            if mod.is_section_start and bar != 0:
+            if bits & SECTION_START and bar != 0:
                 flags.append("SECTION_START")
-            if mod.is_section_end and bar != ctrl.length_bars - 1:
+            if bits & SECTION_END and bar != ctrl.length_bars - 1:
                 flags.append("SECTION_END")
-            if mod.is_phrase_end and bar != ctrl.length_bars - 1:
+            if bits & PHRASE_END and bar != ctrl.length_bars - 1:
                 flags.append("PHRASE_END")
             flag_txt = (" | " + ",".join(flags)) if flags else ""
-            lines.append(f"  Bar {bar+1:02d} [{mod.section.upper()}]{flag_txt}: " + " | ".join(parts))
+            lines.append(f"  Bar {bar+1:02d} [{section.upper()}]{flag_txt}: " + " | ".join(parts))
 
         lines.append("")
 
@@ -601,7 +661,7 @@ class App(tk.Tk):
 
         lines.append("Notes:")
         lines.append("  - Save Report (JSON) exports the full per-layer analysis for later review.")
-        lines.append("  - If you have no MIDI outputs, use 'Save MIDI...' and open the file in a DAW.")
+        lines.append("  - If you have no MIDI outputs, use 'Save WAV...' for a quick preview or 'Save MIDI...' for a DAW.")
         lines.append("  - On Windows, a common output is 'Microsoft GS Wavetable Synth' (if present).")
         lines.append("")
 
@@ -620,12 +680,33 @@ class App(tk.Tk):
         self.player.stop()
         self.status_text.set("Stop requested.")
 
-    def _play_parts(self, parts):
-        if self._cached_ctrl is None:
-            self._regenerate()
-        ctrl = self._cached_ctrl
+    def _on_timing_toggle(self):
+        self.player.collect_telemetry = bool(self.var_timing.get())
+
+    def toggle_pause(self):
+        if not self.player.is_playing():
+            return
+        if self.player.is_paused():
+            self.player.resume()
+            self.status_text.set("Playback resumed.")
+        else:
+            self.player.pause()
+            self.status_text.set("Playback paused.")
+
+    def _current_artifacts(self) -> SongArtifacts:
+        """The latest finished artifacts; they stay playable while a rebuild runs.
 
-        mid = build_midifile(ctrl, include_parts=parts)
+        Only when nothing has been generated yet is the song built right here.
+        """
+        if self._artifacts is None:
+            ctrl = self._cached_ctrl or self._get_controls()
+            self._cached_ctrl = ctrl
+            self._artifacts = self._worker.run_sync(ctrl)
+        return self._artifacts
+
+    def _play_parts(self, parts):
+        artifacts = self._current_artifacts()
+        mid = artifacts.midifile(parts)
         out_name = self._selected_output_name()
 
         if out_name is None:
@@ -636,11 +717,23 @@ class App(tk.Tk):
         def on_done():
             self.status_text.set("Playback finished.")
 
-        self.player.play_midifile(mid, out_name, on_done=on_done)
+        self.player.play_midifile(mid, out_name, on_done=on_done, key=artifacts.key)
 
     def play_full(self):
         self._play_parts(("melody", "harmony", "bass", "drums"))
 
+    def loop_full(self):
+        out_name = self._selected_output_name()
+        if out_name is None:
+            self.status_text.set("No MIDI output selected; playback will be silent. Use Save MIDI to listen in a DAW.")
+        else:
+            self.status_text.set(f"Looping to: {out_name} (changes swap in at the next phrase)")
+
+        def on_done():
+            self.status_text.set("Loop stopped.")
+
+        self.player.play_loop(self._current_artifacts(), out_name, on_done=on_done)
+
     def play_melody(self):
         self._play_parts(("melody",))
 
@@ -654,10 +747,7 @@ class App(tk.Tk):
         self._play_parts(("drums",))
 
     def save_midi(self):
-        if self._cached_ctrl is None:
-            self._regenerate()
-        ctrl = self._cached_ctrl
-        mid = self._cached_mid_full or build_midifile(ctrl, include_parts=("melody", "harmony", "bass", "drums"))
+        artifacts = self._current_artifacts()
 
         filename = filedialog.asksaveasfilename(
             defaultextension=".mid",
@@ -667,19 +757,37 @@ class App(tk.Tk):
         if not filename:
             return
         try:
-            mid.save(filename)
+            artifacts.save_smf(filename)
             self.status_text.set(f"Saved MIDI: {filename}")
         except Exception as e:
             messagebox.showerror("Save error", str(e))
 
-    def save_report(self):
-        if self._cached_ctrl is None:
-            self._regenerate()
+    def save_wav(self):
+        artifacts = self._current_artifacts()
 
-        report = self._cached_report
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".wav",
+            filetypes=[("WAV files", "*.wav"), ("All files", "*.*")],
+            title="Save WAV preview"
+        )
+        if not filename:
+            return
+        try:
+            artifacts.save_wav(filename)
+            self.status_text.set(f"Saved WAV preview: {filename}")
+        except Exception as e:
+            messagebox.showerror("Save error", str(e))
+
+    def save_report(self):
+        artifacts = self._current_artifacts()
+        report = artifacts.report
         if not report:
             messagebox.showerror("Report error", "No report cached. Click Regenerate first.")
             return
+        # Only timing recorded while this very song played belongs in its report.
+        telemetry = self.player.telemetry
+        if telemetry is not None and telemetry.events and self.player.telemetry_key == artifacts.key:
+            report = dict(report, playback=telemetry.summary())
 
         filename = filedialog.asksaveasfilename(
             defaultextension=".json",
@@ -698,4 +806,9 @@ class App(tk.Tk):
 
 def main():
     app = App()
-    app.mainloop()
+    try:
+        app.mainloop()
+    finally:
+        app._speculator.close()
+        app.player.stop()
+        app.player.ports.close()
@@ -4,6 +4,7 @@ import random
 from typing import TYPE_CHECKING, Iterable
 
 from .constants import NOTE_NAMES, NAME_TO_PC, PPQ
+from .pcset import nearest_note, notes_in_range, pcs_mask
 from .theory.scales import get_scale
 
 if TYPE_CHECKING:
@@ -131,11 +132,11 @@ def build_seventh(root_pc: int, quality: str, dominant7: bool = False):
 
 def unique_pcs(pcs: list[int]) -> list[int]:
     out = []
-    seen = set()
+    seen = 0
     for p in pcs:
         p2 = p % 12
-        if p2 not in seen:
-            seen.add(p2)
+        if not (seen >> p2) & 1:
+            seen |= 1 << p2
             out.append(p2)
     return out
 
@@ -198,20 +199,26 @@ def choose_register_base():
     return 72, 60, 36
 
 
+def tones_in_range(pcs: Iterable[int], low_note: int, high_note: int) -> tuple[int, ...]:
+    """Shared, ascending tuple of the notes in range whose pitch class is in ``pcs``."""
+    return notes_in_range(pcs_mask(pcs), low_note, high_note)
+
+
 def chord_tones_in_range(chord_pcs: list[int], low_note: int, high_note: int):
-    out = []
-    for n in range(low_note, high_note + 1):
-        if (n % 12) in chord_pcs:
-            out.append(n)
-    return out
+    return list(tones_in_range(chord_pcs, low_note, high_note))
 
 
 def scale_tones_in_range(scale_pcs_list: list[int], low_note: int, high_note: int):
-    out = []
-    for n in range(low_note, high_note + 1):
-        if (n % 12) in scale_pcs_list:
-            out.append(n)
-    return out
+    return list(tones_in_range(scale_pcs_list, low_note, high_note))
+
+
+def nearest_in_sorted(target: int, *pools) -> int:
+    """:func:`nearest_in_set` over ``pools[0] + pools[1] + ...`` for ascending, duplicate-free pools.
+
+    Same result, tie-breaking included, but each pool is bisected instead of scanned.
+    """
+    best = nearest_note(target, *pools)
+    return target if best is None else best
 
 
 def nearest_in_set(target: int, choices: list[int]) -> int:
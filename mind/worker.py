@@ -0,0 +1,150 @@
+"""Background song generation for interactive front ends.
+
+:class:`GenerationWorker` runs :class:`mind.pipeline.Pipeline` on its own
+thread. Requests submitted in quick succession (slider drags) are coalesced:
+a run only starts once no new request has arrived for ``debounce`` seconds,
+and submitting a request cancels the run in flight at its next stage
+boundary. Finished results are collected with :meth:`poll`, which a Tk app
+calls from ``after()`` so all widget updates stay on the main thread.
+
+With an :class:`mind.artifacts.ArtifactCache` (usually filled ahead of time
+by :class:`mind.speculation.Speculator`) a request whose controls are
+already cached is answered without running the pipeline.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .artifacts import PART_ORDER, ArtifactCache, SongArtifacts, controls_key
+from .models import Controls
+from .pipeline import GenerationCancelled, Pipeline
+
+
+@dataclass
+class GenerationResult:
+    ticket: int
+    ctrl: Controls
+    artifacts: SongArtifacts | None = None
+    stages: list[str] = field(default_factory=list)
+    error: Exception | None = None
+    seconds: float = 0.0
+    cached: bool = False
+
+
+class GenerationWorker:
+    def __init__(
+        self,
+        pipeline: Pipeline | None = None,
+        debounce: float = 0.15,
+        include_parts=PART_ORDER,
+        cache: ArtifactCache | None = None,
+    ):
+        self.pipeline = pipeline or Pipeline()
+        self.cache = cache
+        self.debounce = debounce
+        self.include_parts = include_parts
+        self.latest = 0
+        self._cond = threading.Condition()
+        self._run_lock = threading.Lock()  # one pipeline run at a time (worker or run_sync)
+        self._request: tuple[int, Controls] | None = None
+        self._requested_at = 0.0
+        self._results: queue.SimpleQueue[GenerationResult] = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="generation-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, ctrl: Controls) -> int:
+        """Queue ``ctrl`` for generation; returns its ticket. Older requests become obsolete."""
+        with self._cond:
+            self.latest += 1
+            self._request = (self.latest, ctrl)
+            self._requested_at = time.monotonic()
+            self._cond.notify_all()
+            return self.latest
+
+    def poll(self) -> list[GenerationResult]:
+        """Finished results for the most recent ticket (obsolete ones are dropped)."""
+        out = []
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return out
+            if result.ticket == self.latest:
+                out.append(result)
+
+    def run_sync(self, ctrl: Controls) -> SongArtifacts:
+        """Generate ``ctrl`` on the calling thread (cancels anything queued)."""
+        with self._cond:
+            self.latest += 1
+            self._request = None
+        artifacts = self._cached(ctrl)
+        if artifacts is not None:
+            return artifacts
+        with self._run_lock:
+            artifacts = self.pipeline.run(ctrl, include_parts=self.include_parts)
+        self._store(artifacts)
+        return artifacts
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _cached(self, ctrl: Controls) -> SongArtifacts | None:
+        if self.cache is None:
+            return None
+        artifacts = self.cache.get(controls_key(ctrl))
+        if artifacts is not None and artifacts.has_parts(self.include_parts):
+            return artifacts
+        return None
+
+    def _store(self, artifacts: SongArtifacts) -> None:
+        if self.cache is not None:
+            self.cache.put(artifacts)
+
+    def _next_request(self) -> tuple[int, Controls] | None:
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._request is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._requested_at + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                request, self._request = self._request, None
+                return request
+
+    def _loop(self) -> None:
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            ticket, ctrl = request
+            result = GenerationResult(ticket=ticket, ctrl=ctrl)
+            t0 = time.perf_counter()
+            result.artifacts = self._cached(ctrl)
+            if result.artifacts is not None:
+                result.cached = True
+                result.seconds = time.perf_counter() - t0
+                self._results.put(result)
+                continue
+            try:
+                with self._run_lock:
+                    result.artifacts = self.pipeline.run(
+                        ctrl, include_parts=self.include_parts, cancel=lambda: ticket != self.latest or self._closed
+                    )
+                    result.stages = list(self.pipeline.last_run)
+                self._store(result.artifacts)
+            except GenerationCancelled:
+                continue
+            except Exception as e:
+                result.error = e
+            result.seconds = time.perf_counter() - t0
+            self._results.put(result)
@@ -0,0 +1,39 @@
+"""Shared fixtures for the test modules."""
+from mind.control_mapping import StyleMoodControls, map_controls
+from mind.models import Controls
+
+
+def make_controls(
+    style="pop",
+    seed=11,
+    length_bars=8,
+    *,
+    bpm=120,
+    key_name="C",
+    mode="major",
+    mood_valence=0.6,
+    mood_arousal=0.5,
+    intensity=0.7,
+    complexity=0.5,
+    tightness=0.4,
+    **options,
+):
+    """Controls for one song; ``options`` sets the remaining Controls fields (``voice_leading``, ``sampling``, ...)."""
+    style_mood = StyleMoodControls(
+        style=style,
+        mood_valence=mood_valence,
+        mood_arousal=mood_arousal,
+        intensity=intensity,
+        complexity=complexity,
+        tightness=tightness,
+    )
+    return Controls(
+        length_bars=length_bars,
+        bpm=bpm,
+        key_name=key_name,
+        mode=mode,
+        seed=seed,
+        style_mood=style_mood,
+        derived=map_controls(style_mood, seed=seed),
+        **options,
+    )
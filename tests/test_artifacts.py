@@ -0,0 +1,34 @@
+import unittest
+from functools import partial
+
+from mind.artifacts import controls_key
+from mind.midi_build import build_midifile, build_song_artifacts
+
+from helpers import make_controls
+
+
+_make_controls = partial(make_controls, intensity=0.55, complexity=0.35, tightness=0.7)
+
+
+def _track_names(mid):
+    return [tr.name for tr in mid.tracks]
+
+
+class TestSongArtifacts(unittest.TestCase):
+    def test_controls_key_is_stable(self):
+        self.assertEqual(controls_key(_make_controls()), controls_key(_make_controls()))
+        self.assertNotEqual(controls_key(_make_controls(seed=11)), controls_key(_make_controls(seed=12)))
+
+    def test_subset_matches_direct_build(self):
+        ctrl = _make_controls()
+        artifacts = build_song_artifacts(ctrl)
+        for parts in (("melody",), ("bass", "drums"), ("melody", "harmony", "bass", "drums")):
+            cached = artifacts.midifile(parts)
+            direct = build_midifile(ctrl, include_parts=parts)
+            self.assertEqual(_track_names(cached), _track_names(direct))
+            for a, b in zip(cached.tracks, direct.tracks):
+                self.assertEqual([m.bytes() for m in a if not m.is_meta], [m.bytes() for m in b if not m.is_meta])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+
+from mind.batch import MANIFEST_NAME, iter_jobs, load_manifest, parse_int_list, render_job, run_batch
+
+
+def _jobs(seeds, **kwargs):
+    return iter_jobs(
+        seeds=seeds,
+        styles=["pop"],
+        keys=["C"],
+        modes=["major", "minor"],
+        valences=[0.6],
+        arousals=[0.5],
+        intensities=[0.5],
+        complexities=[0.3],
+        tightnesses=[0.7],
+        length_bars=4,
+        bpm=120,
+        **kwargs,
+    )
+
+
+class TestBatch(unittest.TestCase):
+    def test_parse_int_list(self):
+        self.assertEqual(parse_int_list("1,4,10-12"), [1, 4, 10, 11, 12])
+
+    def test_voice_leading_option(self):
+        greedy, optimal = next(_jobs([3])), next(_jobs([3], voice_leading="optimal"))
+        self.assertEqual(optimal.job_id, greedy.job_id + "_vloptimal")
+        self.assertEqual(optimal.controls().voice_leading, "optimal")
+
+    def test_melody_search_option(self):
+        plain, searched = next(_jobs([3])), next(_jobs([3], melody_candidates=4))
+        self.assertEqual(searched.job_id, plain.job_id + "_mc4")
+        budgeted = next(_jobs([3], melody_candidates=4, melody_seconds=2.5))
+        self.assertEqual(budgeted.job_id, plain.job_id + "_mc4_ms2.5")
+        self.assertIsNone(plain.melody_search())
+        self.assertEqual(searched.melody_search().candidates, 4)
+        with tempfile.TemporaryDirectory() as out_dir:
+            entry = render_job(searched, out_dir)
+            self.assertEqual(entry["status"], "ok", entry["error"])
+            with open(os.path.join(out_dir, searched.job_id + ".json"), encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["melody_search"]["candidates"], 4)
+
+    def test_resume_skips_finished_jobs(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            counts = run_batch(_jobs([1, 2]), out_dir, workers=1, log=None)
+            self.assertEqual(counts["ok"], 4)
+            self.assertEqual(len(load_manifest(out_dir)), 4)
+
+            with open(os.path.join(out_dir, MANIFEST_NAME), "a", encoding="utf-8") as f:
+                f.write('{"job_id": "trunc')
+
+            counts = run_batch(_jobs([1, 2, 3]), out_dir, workers=1, log=None)
+            self.assertEqual((counts["ok"], counts["skipped"]), (2, 4))
+            counts = run_batch(_jobs([3]), out_dir, workers=1, log=None)
+            self.assertEqual((counts["ok"], counts["skipped"]), (0, 2))
+
+            mids = [n for n in os.listdir(out_dir) if n.endswith(".mid")]
+            self.assertEqual(len(mids), 6)
+            any_report = next(n for n in os.listdir(out_dir) if n.endswith(".json"))
+            with open(os.path.join(out_dir, any_report), encoding="utf-8") as f:
+                self.assertIn("layers", json.load(f))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,20 @@
+import random
 import unittest
 
+from mind.harmony import (
+    SegmentIndex,
+    _extension_variant,
+    _resolve_token_to_chord,
+    build_chord_segments,
+    chord_vocabulary,
+    group_segments_by_bar,
+    segment_for_step,
+)
+from mind.planning import build_song_plan
 from mind.theory.chords import ChordSpec, chord_pcs, harmonic_function
 
+from helpers import make_controls
+
 
 class TestChords(unittest.TestCase):
     def test_triad_qualities(self):
@@ -27,5 +40,71 @@ class TestChords(unittest.TestCase):
         self.assertEqual(harmonic_function("ii", "min"), "subdominant")
 
 
+class TestChordVocabulary(unittest.TestCase):
+    def test_resolutions_match_and_are_interned(self):
+        vocab = chord_vocabulary(2, "minor")
+        self.assertIs(chord_vocabulary(2, "minor"), vocab)
+        for token in (0, 4, 11, "", "bVII", "iv", "V/V", "subV/ii", "V/5", "#iv", "vii°", "weird"):
+            self.assertEqual(vocab.resolve(token), _resolve_token_to_chord(2, "minor", token, None))
+            self.assertIs(vocab.resolve(token), vocab.resolve(token))
+
+    def test_voicings_and_specs(self):
+        vocab = chord_vocabulary(0, "major")
+        self.assertEqual(vocab.pcs(7, "maj", "7", dominant7=True), (7, 11, 2, 5))
+        self.assertEqual(vocab.pcs(0, "maj", "maj9", color13=True), (0, 4, 11, 2, 9))
+        spec = vocab.spec(vocab.pcs(7, "maj", "7", True), 7, "maj", "7", "V")
+        self.assertEqual((spec.inversion, spec.function), (0, "dominant"))
+        self.assertIs(vocab.spec((7, 11, 2, 5), 7, "maj", "7", "V"), spec)
+
+    def test_rng_draws_stay_outside_the_cache(self):
+        rng = random.Random(5)
+        state = rng.getstate()
+        self.assertEqual(_extension_variant("7", rng, "minor", "V"), (False, False))
+        self.assertEqual(_extension_variant("add9", rng, "major", "V"), (False, False))
+        self.assertEqual(rng.getstate(), state)  # no coin tossed
+        expected = random.Random(5).random() < 0.25
+        self.assertEqual(_extension_variant("dom9", rng, "major", "V"), (False, expected))
+
+
+class TestSegmentIndex(unittest.TestCase):
+    def _segments(self):
+        ctrl = make_controls(
+            "jazz",
+            11,
+            16,
+            key_name="F",
+            mode="minor",
+            mood_valence=0.4,
+            mood_arousal=0.7,
+            intensity=0.6,
+            complexity=0.9,
+            tightness=0.5,
+        )
+        return ctrl, build_chord_segments(ctrl, build_song_plan(ctrl))
+
+    def test_lookups_match_linear_scans(self):
+        ctrl, segments = self._segments()
+        index = SegmentIndex(segments, ctrl.length_bars)
+        bars = group_segments_by_bar(segments, ctrl.length_bars)
+        self.assertEqual(index.bars(), bars)
+        self.assertEqual(len(index), len(segments))
+        for b, bar in enumerate(bars):
+            for step in range(-1, 18):
+                self.assertIs(index.at(b, step), segment_for_step(bar, step))
+        for first in range(-1, ctrl.length_bars + 1):
+            for last in range(first, ctrl.length_bars + 2):
+                expected = [seg for seg in segments if first <= seg.bar_index <= last]
+                self.assertEqual(index.between(first, last), expected)
+        self.assertIs(SegmentIndex.of(index, ctrl.length_bars), index)
+        self.assertIsNot(SegmentIndex.of(index, ctrl.length_bars - 1), index)
+
+    def test_bars_without_chords(self):
+        ctrl, segments = self._segments()
+        index = SegmentIndex([seg for seg in segments if seg.bar_index != 3], ctrl.length_bars)
+        self.assertEqual(index.bar(3), [])
+        self.assertIsNone(index.at(3, 0))
+        self.assertIsNone(index.at(ctrl.length_bars, 0))
+
+
 if __name__ == "__main__":
     unittest.main()
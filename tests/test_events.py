@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from mido import Message
+
+from mind.events import KIND_NOTE_OFF, KIND_NOTE_ON, EventBuffer, iter_delta_stream, merge_runs, sorted_indices
+from mind.harmony import finalize_events
+
+
+class TestEventBuffer(unittest.TestCase):
+    def test_round_trip_messages(self):
+        legacy = [
+            (0, Message("program_change", channel=1, program=4, time=0)),
+            (0, Message("note_on", channel=1, note=60, velocity=90, time=0)),
+            (240, Message("note_off", channel=1, note=60, velocity=0, time=0)),
+        ]
+        buf = EventBuffer.from_messages(legacy)
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(list(buf.kind), [0, KIND_NOTE_ON, KIND_NOTE_OFF])
+        self.assertEqual([(t, m.bytes()) for t, m in buf.to_messages()], [(t, m.bytes()) for t, m in legacy])
+
+    def test_note_on_indices_skip_zero_velocity(self):
+        buf = EventBuffer()
+        buf.note_on(0, 0, 60, 80)
+        buf.note_on(10, 0, 62, 0)
+        buf.note_on(20, 9, 36, 100)
+        self.assertEqual(buf.note_on_indices(), [0, 2])
+        self.assertEqual(buf.note_on_indices(channel=9), [2])
+
+    def test_finalize_events_orders_offs_before_ons(self):
+        buf = EventBuffer()
+        buf.note_on(480, 0, 64, 90)
+        buf.note_on(0, 0, 60, 90)
+        buf.note_off(480, 0, 60)
+        msgs = finalize_events(buf)
+        self.assertEqual([m.type for m in msgs], ["note_on", "note_off", "note_on"])
+        self.assertEqual([m.time for m in msgs], [0, 480, 0])
+
+
+class TestMergeRuns(unittest.TestCase):
+    def _random_buffer(self, rng, channel, bars=16):
+        buf = EventBuffer()
+        for bar in range(bars):
+            buf.mark_run()
+            for _ in range(rng.randint(0, 6)):
+                on = bar * 1920 + rng.randint(-12, 1900)
+                note = rng.randint(40, 80)
+                buf.note_on(max(0, on), channel, note, 90)
+                buf.note_off(on + rng.choice((120, 240, 480, 1920)), channel, note)
+        return buf
+
+    def test_matches_global_sort(self):
+        rng = random.Random(7)
+        parts = [self._random_buffer(rng, ch) for ch in range(4)]
+        expected = sorted(
+            (b.tick[i], b.kind[i], p, i) for p, b in enumerate(parts) for i in range(len(b))
+        )
+        self.assertEqual(list(merge_runs(parts)), [(t, p, i) for t, _, p, i in expected])
+        self.assertEqual(sorted_indices(parts[0]), [i for _, _, p, i in expected if p == 0])
+
+    def test_unmarked_buffer_is_one_run(self):
+        buf = EventBuffer()
+        buf.note_off(480, 0, 60)
+        buf.note_on(480, 0, 60, 90)
+        buf.note_on(0, 0, 60, 90)
+        self.assertEqual(buf.run_bounds(), [(0, 3)])
+        self.assertEqual(sorted_indices(buf), [2, 0, 1])
+
+    def test_mark_run_and_extend(self):
+        a = EventBuffer()
+        a.mark_run()
+        a.mark_run()
+        a.note_on(0, 0, 60, 90)
+        a.mark_run()
+        a.note_off(480, 0, 60)
+        b = EventBuffer()
+        b.extend(a)
+        b.extend(a)
+        self.assertEqual(list(a.runs), [0, 1])
+        self.assertEqual(b.run_bounds(), [(0, 1), (1, 2), (2, 3), (3, 4)])
+
+    def test_delta_stream_interleaves_parts(self):
+        a = EventBuffer()
+        a.note_on(0, 0, 60, 90)
+        a.note_off(480, 0, 60)
+        b = EventBuffer()
+        b.note_on(240, 1, 50, 90)
+        b.note_off(480, 1, 50)
+        self.assertEqual(list(iter_delta_stream([a, b])), [(0, 0, 0), (240, 1, 0), (240, 0, 1), (0, 1, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
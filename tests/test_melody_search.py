@@ -0,0 +1,117 @@
+import math
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from mind.artifacts import controls_key
+from mind.events import EventBuffer
+from mind.harmony import SegmentIndex, build_chord_segments, generate_harmony_track
+from mind.melody import generate_melody_track
+from mind.melody_search import (
+    MAX_LEAP,
+    SEED_STRIDE,
+    MelodySearch,
+    _harmony_by_phrase,
+    counterpoint_cost,
+    melodic_cost,
+    phrase_spans,
+    search_melody,
+)
+from mind.midi_build import build_song_artifacts
+from mind.planning import build_song_plan
+
+from helpers import make_controls
+
+
+_make_controls = partial(
+    make_controls,
+    seed=5,
+    length_bars=16,
+    bpm=116,
+    key_name="G",
+    mood_arousal=0.6,
+    complexity=0.6,
+    tightness=0.5,
+)
+
+
+def _song(ctrl):
+    plan = build_song_plan(ctrl)
+    index = SegmentIndex(build_chord_segments(ctrl, plan), ctrl.length_bars)
+    return plan, index, generate_harmony_track(ctrl, index, plan)
+
+
+def _phrase_costs(ctrl, plan, melody, harmony):
+    spans = phrase_spans(plan, ctrl.length_bars)
+    ticks_per_bar = 480 * 4
+    costs = []
+    for (start, end), harmony_phrase in zip(spans, _harmony_by_phrase(harmony, spans)):
+        on = [i for i in melody.note_on_indices() if start * ticks_per_bar <= melody.tick[i] < end * ticks_per_bar]
+        phrase = melody.take(on)
+        costs.append(melodic_cost(phrase) + counterpoint_cost(phrase, harmony_phrase))
+    return costs
+
+
+class TestMelodySearch(unittest.TestCase):
+    def test_single_candidate_is_the_plain_melody(self):
+        ctrl = _make_controls()
+        plan, index, harmony = _song(ctrl)
+        result = search_melody(ctrl, plan, index, harmony, MelodySearch(candidates=1))
+        self.assertEqual(list(result.events.rows()), list(generate_melody_track(ctrl, index, plan).rows()))
+        self.assertEqual(set(result.phrase_seeds), {ctrl.seed})
+
+    def test_search_never_scores_worse_per_phrase(self):
+        for style in ("pop", "jazz", "classical"):
+            ctrl = _make_controls(style)
+            plan, index, harmony = _song(ctrl)
+            result = search_melody(ctrl, plan, index, harmony, MelodySearch(candidates=6))
+            baseline = _phrase_costs(ctrl, plan, generate_melody_track(ctrl, index, plan), harmony)
+            self.assertEqual(result.candidates, 6)
+            self.assertEqual(len(result.phrase_costs), len(baseline))
+            for got, base in zip(result.phrase_costs, baseline):
+                self.assertLessEqual(got, base + 1e-9)
+            self.assertGreater(result.pruned, 0)
+            for seed in result.phrase_seeds:
+                self.assertEqual((seed - ctrl.seed) % SEED_STRIDE, 0)
+
+    def test_parallel_matches_serial(self):
+        ctrl = _make_controls("jazz", seed=9)
+        plan, index, harmony = _song(ctrl)
+        serial = search_melody(ctrl, plan, index, harmony, MelodySearch(candidates=4))
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            parallel = search_melody(ctrl, plan, index, harmony, MelodySearch(candidates=4), parallel=True, executor=pool)
+        self.assertEqual(list(parallel.events.rows()), list(serial.events.rows()))
+        self.assertEqual(parallel.phrase_seeds, serial.phrase_seeds)
+
+    def test_time_budget_keeps_the_song_melody(self):
+        ctrl = _make_controls()
+        plan, index, harmony = _song(ctrl)
+        result = search_melody(ctrl, plan, index, harmony, MelodySearch(candidates=50, time_budget=0.0))
+        self.assertEqual(result.candidates, 1)
+
+    def test_cheap_checks(self):
+        wide = EventBuffer()
+        for i, note in enumerate((60, 62, 60 + MAX_LEAP + 3)):
+            wide.note_on(i * 120, 0, note, 90)
+        self.assertEqual(melodic_cost(wide), math.inf)
+        self.assertGreater(melodic_cost(EventBuffer()), 0.0)
+
+    def test_artifacts_report_the_search(self):
+        artifacts = build_song_artifacts(_make_controls(), include_parts=("melody",), melody_search=MelodySearch(candidates=3))
+        self.assertEqual(list(artifacts.part_events), ["melody"])
+        summary = artifacts.report["melody_search"]
+        self.assertEqual(summary["candidates"], 3)
+        self.assertEqual(len(summary["phrases"]), len(phrase_spans(artifacts.plan, 16)))
+
+    def test_search_is_part_of_the_artifacts_key(self):
+        ctrl = _make_controls()
+        plain = controls_key(ctrl)
+        searched = controls_key(ctrl, MelodySearch(candidates=3))
+        self.assertNotEqual(searched, plain)
+        self.assertNotEqual(controls_key(ctrl, MelodySearch(candidates=3, time_budget=1.0)), searched)
+        artifacts = build_song_artifacts(ctrl, include_parts=("melody",), melody_search=MelodySearch(candidates=2))
+        self.assertEqual(artifacts.key, controls_key(ctrl, MelodySearch(candidates=2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
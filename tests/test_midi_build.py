@@ -0,0 +1,73 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import partial
+
+from mind.events import EventBuffer, iter_delta_stream
+from mind.midi_build import build_song_bundle, iter_song_bars, iter_song_messages
+
+from helpers import make_controls
+
+
+_make_controls = partial(
+    make_controls,
+    length_bars=12,
+    bpm=110,
+    key_name="D",
+    mode="minor",
+    mood_valence=0.4,
+    mood_arousal=0.7,
+    intensity=0.8,
+    complexity=0.6,
+    tightness=0.3,
+)
+
+
+class TestParallelGeneration(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            for style, seed in (("pop", 3), ("jazz", 91)):
+                ctrl = _make_controls(style, seed)
+                serial_mid, _, _, serial_events, serial_report = build_song_bundle(ctrl)
+                parallel_mid, _, _, parallel_events, parallel_report = build_song_bundle(
+                    ctrl, parallel=True, executor=pool
+                )
+                self.assertEqual(serial_events, parallel_events)
+                self.assertEqual(
+                    [[m.bytes() for m in tr if not m.is_meta] for tr in serial_mid.tracks],
+                    [[m.bytes() for m in tr if not m.is_meta] for tr in parallel_mid.tracks],
+                )
+                self.assertEqual(serial_report["layers"], parallel_report["layers"])
+
+
+class TestBarStreaming(unittest.TestCase):
+    def test_bar_chunks_match_full_parts(self):
+        for style, seed in (("pop", 5), ("jazz", 17)):
+            ctrl = _make_controls(style, seed)
+            _, _, _, part_events, _ = build_song_bundle(ctrl)
+            joined = {name: EventBuffer() for name in part_events}
+            bars = 0
+            for chunk in iter_song_bars(ctrl):
+                bars += 1
+                for name, events in chunk.items():
+                    joined[name].extend(events)
+            self.assertEqual(bars, ctrl.length_bars)
+            self.assertEqual(joined, part_events)
+
+    def test_message_stream_matches_type0_order(self):
+        ctrl = _make_controls("pop", 8)
+        _, _, _, part_events, _ = build_song_bundle(ctrl)
+        parts = [part_events[name] for name in ("melody", "harmony", "bass", "drums")]
+        expected = [parts[p].message(i, time=d).bytes() + [d] for d, p, i in iter_delta_stream(parts)]
+        streamed = [m.bytes() + [m.time] for m in iter_song_messages(ctrl)]
+        self.assertEqual(streamed, expected)
+
+    def test_first_bar_does_not_wait_for_the_song(self):
+        ctrl = replace(_make_controls("pop", 2), length_bars=200_000)
+        first = next(iter_song_bars(ctrl, include_parts=("melody", "drums")))
+        self.assertEqual(sorted(first), ["drums", "melody"])
+        self.assertTrue(all(t < 1920 for t in first["drums"].tick))
+
+
+if __name__ == "__main__":
+    unittest.main()
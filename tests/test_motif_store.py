@@ -0,0 +1,130 @@
+import os
+import random
+import tempfile
+import unittest
+from functools import partial
+
+from mind.harmony import SegmentIndex, build_chord_segments
+from mind.melody import generate_melody_track
+from mind.motif_store import (
+    CONTOUR_CLASSES,
+    Motif,
+    MotifStore,
+    MotifWriter,
+    chord_shape,
+    motif_from_bar,
+    rhythm_mask,
+    write_motif_store,
+)
+from mind.planning import build_song_plan
+from mind.utils import scale_pcs
+
+from helpers import make_controls
+
+
+_make_controls = partial(
+    make_controls,
+    style="classical",
+    seed=6,
+    length_bars=16,
+    bpm=100,
+    key_name="D",
+    mood_valence=0.5,
+    intensity=0.6,
+    tightness=0.6,
+)
+
+
+def _song(ctrl):
+    plan = build_song_plan(ctrl)
+    return plan, SegmentIndex(build_chord_segments(ctrl, plan), ctrl.length_bars)
+
+
+class _CountingStore:
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+
+    def pick(self, *args):
+        motif = self.store.pick(*args)
+        self.hits += motif is not None
+        return motif
+
+
+class TestMotifRecords(unittest.TestCase):
+    def test_motif_from_bar(self):
+        bar = [(0, 8, 69, 2, 80), (0, 0, 62, 4, 96), (0, 4, 66, 2, 70)]
+        motif = motif_from_bar(bar, root_pc=2, chord_pcs=[2, 6, 9])
+        self.assertEqual(motif.rhythm, rhythm_mask([0, 4, 8]))
+        self.assertEqual(motif.shape, chord_shape([0, 4, 7], 0))
+        self.assertEqual(CONTOUR_CLASSES[motif.contour], "ascending")
+        self.assertEqual(motif.notes, ((0, 0, 4, 96), (4, 4, 2, 70), (8, 7, 2, 80)))
+        self.assertEqual(Motif.unpack(motif.key, motif.pack()), motif)
+        self.assertIsNone(motif_from_bar([], 0, [0, 4, 7]))
+
+    def test_store_lookup_and_merge(self):
+        rng = random.Random(2)
+        motifs = [
+            Motif(rng.getrandbits(16), rng.choice([0x91, 0x89, 0x491]), rng.randrange(6), ((0, 0, 2, 90), (6, -3, 1, 70)))
+            for _ in range(3000)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "motifs.bin")
+            count = write_motif_store(path, motifs + motifs[:10])
+            self.assertEqual(count, len(set(motifs)))
+            with MotifStore(path) as store:
+                self.assertEqual(len(store), count)
+                for m in motifs[:200]:
+                    found = store.lookup(m.rhythm, m.shape, limit=10_000)
+                    self.assertIn(m, found)
+                    self.assertEqual(found, [x for x in sorted(set(motifs), key=lambda x: x.key) if (x.rhythm, x.shape) == (m.rhythm, m.shape)])
+                    self.assertIn(m, store.lookup(m.rhythm, m.shape, m.contour))
+                self.assertEqual(list(store.find(0, 0x91, 3)), [])
+
+            extra = Motif(1, 0x91, 0, ((0, 0, 2, 90),))
+            with MotifWriter(path) as writer:
+                writer.add(extra)
+                writer.add(motifs[0])  # already stored
+                writer.add(None)
+            with MotifStore(path) as store:
+                self.assertEqual(len(store), count + 1)
+            fresh = os.path.join(tmp, "fresh.bin")
+            write_motif_store(fresh, motifs + [extra])
+            with open(path, "rb") as merged, open(fresh, "rb") as rewritten:
+                self.assertEqual(merged.read(), rewritten.read())
+            with MotifStore(path) as store:
+                self.assertEqual(store.lookup(1, 0x91), [extra])
+                self.assertEqual(store.pick(random.Random(0), 1, 0x91, 4), extra)  # falls back to any contour
+
+            with open(path, "r+b") as f:
+                f.write(b"NOTMOTIF")
+            with self.assertRaises(ValueError):
+                MotifStore(path)
+
+
+class TestMelodyWithMotifStore(unittest.TestCase):
+    def test_record_then_reuse(self):
+        ctrl = _make_controls()
+        plan, index = _song(ctrl)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "motifs.bin")
+            write_motif_store(path, [])
+            with MotifStore(path) as empty:
+                plain = generate_melody_track(ctrl, index, plan)
+                self.assertEqual(list(generate_melody_track(ctrl, index, plan, motif_store=empty).rows()), list(plain.rows()))
+
+            with MotifWriter(path) as writer:
+                generate_melody_track(ctrl, index, plan, motif_sink=writer.add)
+            with MotifStore(path) as store:
+                self.assertGreater(len(store), 0)
+                counting = _CountingStore(store)
+                reused = generate_melody_track(ctrl, index, plan, motif_store=counting)
+                self.assertGreater(counting.hits, 0)
+                scale = set(scale_pcs(2, "major"))
+                chord_pcs = {p for seg in index for p in seg.pcs}
+                for i in reused.note_on_indices():
+                    self.assertIn(reused.note[i] % 12, scale | chord_pcs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from mind.melody import melody_pools
+from mind.pcset import PitchClassSet, notes_in_range, pcs_mask
+from mind.utils import chord_tones_in_range, nearest_in_set, nearest_in_sorted, unique_pcs
+
+
+class TestPitchClassSet(unittest.TestCase):
+    def test_set_operations(self):
+        c_major = PitchClassSet.from_pcs([0, 4, 7])
+        a_minor = PitchClassSet.from_pcs([9, 0, 4])
+        self.assertEqual(list(c_major | a_minor), [0, 4, 7, 9])
+        self.assertEqual(list(c_major & a_minor), [0, 4])
+        self.assertEqual(list(c_major - a_minor), [7])
+        self.assertEqual(list(c_major.transpose(7)), [2, 7, 11])
+        self.assertEqual(c_major.transpose(-12), c_major)
+        self.assertIn(16, c_major)
+        self.assertNotIn(1, c_major)
+        self.assertEqual(len(c_major), 3)
+        self.assertEqual(PitchClassSet.from_pcs([12, 16, 19]), c_major)
+        with self.assertRaises(AttributeError):
+            c_major.mask = 0
+
+    def test_register_tables_match_scan(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            pcs = rng.sample(range(12), rng.randint(0, 7))
+            low = rng.randint(20, 70)
+            high = low + rng.randint(-2, 30)
+            expected = [n for n in range(low, high + 1) if (n % 12) in pcs]
+            self.assertEqual(chord_tones_in_range(pcs, low, high), expected)
+        self.assertIs(notes_in_range(pcs_mask([0, 4, 7]), 48, 72), notes_in_range(pcs_mask([7, 4, 0]), 48, 72))
+
+    def test_nearest_matches_linear_scan(self):
+        rng = random.Random(4)
+        for _ in range(500):
+            pools = [
+                sorted(rng.sample(range(40, 80), rng.randint(0, 8))),
+                sorted(rng.sample(range(40, 80), rng.randint(0, 8))),
+            ]
+            target = rng.randint(30, 90)
+            concatenated = pools[0] + pools[1]
+            self.assertEqual(nearest_in_sorted(target, *pools), nearest_in_set(target, concatenated))
+        self.assertEqual(nearest_in_sorted(62, [60, 64]), 60)  # tie -> lower (first in list)
+        self.assertEqual(nearest_in_sorted(62, [64], [60]), 64)  # tie -> earlier pool
+        self.assertEqual(nearest_in_sorted(62), 62)
+        self.assertEqual(PitchClassSet.from_pcs([0]).nearest(66, 48, 84), 60)
+
+    def test_unique_pcs_keeps_order(self):
+        self.assertEqual(unique_pcs([7, 19, 4, 0, 12, 16]), [7, 4, 0])
+
+
+class TestMelodyPools(unittest.TestCase):
+    def test_pools_match_register_scans(self):
+        scale = [0, 2, 4, 5, 7, 9, 11]
+        for chord in ([2, 5, 9, 0], [1, 5, 8], []):
+            pools = melody_pools(pcs_mask(chord), pcs_mask(scale), 57, 79)
+            self.assertEqual(list(pools.chord), chord_tones_in_range(chord, 57, 79))
+            self.assertEqual(list(pools.scale), chord_tones_in_range(scale, 57, 79))
+            self.assertEqual(len(pools.approach), len(pools.chord))
+            for n, (below, above) in zip(pools.chord, pools.approach):
+                self.assertEqual((below, above), (max(57, n - 1), min(79, n + 1)))
+        self.assertIs(melody_pools(pcs_mask([0, 4, 7]), 0xAB5, 60, 72), melody_pools(pcs_mask([7, 0, 4]), 0xAB5, 60, 72))
+
+    def test_approach_pick_keeps_the_draws(self):
+        pools = melody_pools(pcs_mask([7, 11, 2, 5]), pcs_mask(range(12)), 55, 80)
+        for seed in range(100):
+            a, b = random.Random(seed), random.Random(seed)
+            expected = min(80, max(55, b.choice(pools.chord) + b.choice([-1, 1])))
+            self.assertEqual(a.choice(a.choice(pools.approach)), expected)
+            self.assertEqual(a.getstate(), b.getstate())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+from dataclasses import is_dataclass, replace
+from functools import partial
+
+from mind.bass import generate_bass_track
+from mind.drums import generate_drums_track
+from mind.harmony import build_chord_segments, generate_harmony_track
+from mind.melody import generate_melody_track
+from mind.midi_build import build_song_artifacts
+from mind.pipeline import STAGE_FIELDS, Pipeline, affected_stages
+from mind.planning import build_song_plan
+
+from helpers import make_controls
+
+
+_make_controls = partial(make_controls, seed=4, length_bars=12, bpm=118, key_name="A", mode="minor")
+
+
+def _with_derived(ctrl, **changes):
+    return replace(ctrl, derived=replace(ctrl.derived, **changes))
+
+
+def _with_level2(ctrl, **changes):
+    return _with_derived(ctrl, level2=replace(ctrl.derived.level2, **changes))
+
+
+class _Recorder:
+    """Wraps Controls and records the dotted path of every leaf attribute read."""
+
+    def __init__(self, obj, seen, path=""):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_seen", seen)
+        object.__setattr__(self, "_path", path)
+
+    def __getattr__(self, name):
+        value = getattr(self._obj, name)
+        path = f"{self._path}.{name}" if self._path else name
+        if is_dataclass(value) and not isinstance(value, type):
+            return _Recorder(value, self._seen, path)
+        self._seen.add(path)
+        return value
+
+
+def _covered(path, declared):
+    return any(d == "" or path == d or path.startswith(d + ".") for d in declared)
+
+
+class TestPipeline(unittest.TestCase):
+    def test_incremental_matches_full_rebuild(self):
+        ctrl = _make_controls()
+        pipeline = Pipeline()
+        pipeline.run(ctrl)
+        for changed in (
+            _with_derived(ctrl, humanize_velocity=0.45),
+            replace(ctrl, bpm=96),
+            replace(ctrl, key_name="C"),
+            _with_level2(ctrl, turnaround_intensity=0.9),
+            _with_derived(ctrl, density=0.2),
+        ):
+            incremental = pipeline.run(changed)
+            fresh = build_song_artifacts(changed)
+            self.assertEqual(incremental.part_events, fresh.part_events)
+            self.assertEqual(incremental.report, fresh.report)
+            self.assertEqual(
+                [[m.bytes() for m in tr] for tr in incremental.midifile().tracks],
+                [[m.bytes() for m in tr] for tr in fresh.midifile().tracks],
+            )
+
+    def test_humanize_velocity_skips_plan_and_chords(self):
+        ctrl = _make_controls()
+        pipeline = Pipeline()
+        pipeline.run(ctrl)
+        self.assertEqual(len(pipeline.last_run), 7)
+        pipeline.run(_with_derived(ctrl, humanize_velocity=0.3))
+        self.assertEqual(pipeline.last_run, ["harmony", "bass", "melody", "drums", "report"])
+        pipeline.run(_with_derived(ctrl, humanize_velocity=0.3))
+        self.assertEqual(pipeline.last_run, [])
+
+    def test_key_change_keeps_plan_and_drums(self):
+        ctrl = _make_controls()
+        self.assertEqual(
+            affected_stages(ctrl, replace(ctrl, key_name="E")),
+            ["chords", "harmony", "bass", "melody", "report"],
+        )
+
+    def test_declared_fields_cover_every_read(self):
+        for style, seed in (("pop", 1), ("jazz", 7), ("classical", 12)):
+            ctrl = _make_controls(style=style, seed=seed)
+            for ctrl in (ctrl, _with_level2(ctrl, extension_richness=0.95)):
+                seen = {stage: set() for stage in STAGE_FIELDS}
+
+                def rec(stage):
+                    return _Recorder(ctrl, seen[stage])
+
+                plan = build_song_plan(rec("plan"))
+                list(plan.bar_mods)
+                segments = build_chord_segments(rec("chords"), plan)
+                generate_harmony_track(rec("harmony"), segments, plan)
+                generate_bass_track(rec("bass"), segments, plan)
+                generate_melody_track(rec("melody"), segments, plan)
+                generate_drums_track(rec("drums"), plan)
+
+                for stage, paths in seen.items():
+                    missing = sorted(p for p in paths if not _covered(p, STAGE_FIELDS[stage]))
+                    self.assertEqual(missing, [], f"{stage} reads undeclared fields")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+from dataclasses import replace
+from functools import partial
+from unittest import mock
+
+from mind import planning
+from mind.planning import (
+    COLUMN_BLOCK,
+    MULTIPLIERS,
+    PHRASE_END,
+    SCALED_CACHE_SIZE,
+    BarColumns,
+    bar_columns,
+    build_song_plan,
+    contour_offset,
+)
+from mind.utils import clamp01
+
+from helpers import make_controls
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+_make_controls = partial(
+    make_controls,
+    style="funk",
+    seed=8,
+    length_bars=32,
+    bpm=104,
+    key_name="E",
+    mode="minor",
+    mood_valence=0.4,
+    mood_arousal=0.7,
+    intensity=0.6,
+    complexity=0.6,
+    tightness=0.5,
+)
+
+
+class TestBarColumns(unittest.TestCase):
+    def test_columns_match_bar_modifiers(self):
+        plan = build_song_plan(_make_controls())
+        columns = bar_columns(plan)
+        mods = list(plan.bar_mods)
+        for name in MULTIPLIERS:
+            self.assertEqual(list(columns.column(name)), [getattr(m, name) for m in mods])
+        self.assertEqual(list(columns.column("melody_shift")), [m.melody_shift_semitones for m in mods])
+        self.assertEqual([columns.section(b) for b in range(len(mods))], [m.section for m in mods])
+        self.assertEqual([columns.flag(b, PHRASE_END) for b in range(len(mods))], [m.is_phrase_end for m in mods])
+
+        copied = BarColumns.from_mods(mods, plan.contour)
+        self.assertEqual([copied.modifiers(b) for b in range(len(mods))], mods)
+        hand_built = replace(plan, bar_mods=mods)
+        self.assertIsNot(bar_columns(hand_built), columns)
+        self.assertIs(bar_columns(hand_built), bar_columns(hand_built))
+        self.assertEqual(bar_columns(hand_built).modifiers(5), mods[5])
+
+    def test_scaled_and_contour_columns(self):
+        ctrl = _make_controls()
+        plan = build_song_plan(ctrl)
+        columns = bar_columns(plan)
+        base = ctrl.derived.energy * 1.7
+        scaled = columns.scaled("energy_mul", base)
+        self.assertIs(columns.scaled("energy_mul", base), scaled)
+        self.assertEqual(list(scaled), [clamp01(base * m.energy_mul) for m in plan.bar_mods])
+        self.assertEqual(
+            list(columns.column("contour_offset")),
+            [contour_offset(plan.contour, b, ctrl.length_bars) for b in range(ctrl.length_bars)],
+        )
+
+    def test_scaled_negative_and_out_of_range_indexes(self):
+        plan = build_song_plan(_make_controls())
+        scaled = bar_columns(plan).scaled("sync_mul", 0.8)
+        self.assertEqual(scaled[-1], scaled[len(scaled) - 1])
+        self.assertEqual(scaled[-len(scaled)], scaled[0])
+        for index in (len(scaled), -len(scaled) - 1):
+            with self.assertRaises(IndexError):
+                scaled[index]
+
+    def test_scaled_cache_keeps_the_most_recently_used(self):
+        columns = bar_columns(build_song_plan(_make_controls()))
+        first = columns.scaled("energy_mul", 0.0)
+        second = columns.scaled("energy_mul", 1.0)
+        for i in range(SCALED_CACHE_SIZE - 2):
+            columns.scaled("density_mul", i / 100)
+        self.assertIs(columns.scaled("energy_mul", 0.0), first)
+        columns.scaled("density_mul", 0.5)
+        self.assertIs(columns.scaled("energy_mul", 0.0), first)
+        self.assertIsNot(columns.scaled("energy_mul", 1.0), second)
+        self.assertEqual(list(second), list(columns.scaled("energy_mul", 1.0)))
+
+    def test_blocks_fill_lazily(self):
+        length = COLUMN_BLOCK * 3 + 10
+        plan = build_song_plan(_make_controls(length_bars=length))
+        columns = bar_columns(plan)
+        self.assertEqual(columns.filled, 0)
+        columns.scaled("density_mul", 0.5)[3]
+        self.assertEqual(columns.filled, COLUMN_BLOCK)
+        plan.bar_mods[COLUMN_BLOCK * 3]
+        self.assertEqual(columns.filled, length)
+        with self.assertRaises(IndexError):
+            columns.modifiers(length)
+
+    @unittest.skipIf(np is None, "NumPy not installed")
+    def test_numpy_and_python_fills_agree(self):
+        ctrl = _make_controls(length_bars=COLUMN_BLOCK + 37)
+        columns = bar_columns(build_song_plan(ctrl))
+        with mock.patch.object(planning, "np", None):
+            fallback = bar_columns(build_song_plan(ctrl))
+            fallback.column("density_mul")
+            fallback_scaled = list(fallback.scaled("energy_mul", 0.9))
+        for name in MULTIPLIERS + ("melody_shift", "section_id"):
+            self.assertEqual(list(columns.column(name)), list(fallback.column(name)), name)
+        self.assertEqual(columns.flags, fallback.flags)
+        self.assertEqual(columns.section_names, fallback.section_names)
+        self.assertEqual(list(columns.scaled("energy_mul", 0.9)), fallback_scaled)
+
+    @unittest.skipIf(np is None, "NumPy not installed")
+    def test_columns_are_numpy_buffers(self):
+        plan = build_song_plan(_make_controls())
+        column = bar_columns(plan).column("density_mul")
+        view = np.frombuffer(column, dtype=np.float64)
+        self.assertEqual(view.tolist(), [m.density_mul for m in plan.bar_mods])
+
+
+if __name__ == "__main__":
+    unittest.main()
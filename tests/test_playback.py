@@ -0,0 +1,181 @@
+import threading
+import time
+import unittest
+from itertools import islice
+
+import mido
+from mido import Message, MetaMessage, MidiFile, MidiTrack
+
+from mind.midi_build import build_song_artifacts
+from mind.playback import (
+    EncodedSong,
+    LoopSchedule,
+    PlaybackEngine,
+    bursts,
+    encode_song,
+    midifile_schedule,
+    stream_schedule,
+)
+
+from helpers import make_controls
+
+
+class _FakeClock:
+    """Advances a fixed step on every read, so waits resolve by spinning."""
+
+    def __init__(self, step=0.0001):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def _note(note, time=0):
+    return Message("note_on", note=note, velocity=90, time=time)
+
+
+def _off(note):
+    return Message("note_off", note=note, velocity=0)
+
+
+def _song(events, program):
+    """Four 1-second bars in 2-bar phrases."""
+    song_bursts = list(bursts(events))
+    return EncodedSong(
+        bursts=song_bursts,
+        times=[t for t, _ in song_bursts],
+        programs=[Message("program_change", program=program)],
+        bar_seconds=1.0,
+        length_bars=4,
+        phrase_len_bars=2,
+    )
+
+
+def _artifacts(length_bars=8):
+    ctrl = make_controls(seed=5, length_bars=length_bars)
+    return build_song_artifacts(ctrl, with_report=False)
+
+
+class TestSchedule(unittest.TestCase):
+    def test_midifile_schedule_follows_tempo_map(self):
+        mid = MidiFile(ticks_per_beat=480)
+        meta, part = MidiTrack(), MidiTrack()
+        meta.append(MetaMessage("set_tempo", tempo=500000, time=0))
+        meta.append(MetaMessage("set_tempo", tempo=1000000, time=960))
+        part.append(_note(60, time=480))
+        part.append(_note(64, time=0))
+        part.append(_note(67, time=960))
+        mid.tracks.extend([meta, part])
+
+        schedule = midifile_schedule(mid)
+        self.assertEqual([t for t, _ in schedule], [0.5, 2.0])
+        self.assertEqual([[m.note for m in msgs] for _, msgs in schedule], [[60, 64], [67]])
+        self.assertAlmostEqual(mid.length, 2.0)
+
+    def test_stream_schedule_is_lazy_and_grouped(self):
+        def messages():
+            yield _note(60)
+            yield _note(62, time=240)
+            yield MetaMessage("end_of_track", time=0)
+            yield _note(64, time=0)
+            raise AssertionError("read past the requested burst")
+
+        it = bursts(stream_schedule(messages(), mido.bpm2tempo(120), 480))
+        self.assertEqual(next(it), (0.0, [_note(60)]))
+
+
+class TestPlaybackEngine(unittest.TestCase):
+    def test_events_are_sent_at_absolute_deadlines(self):
+        clock = _FakeClock()
+        engine = PlaybackEngine(clock=clock, spin_seconds=float("inf"))
+        schedule = [(i * 0.01, [_note(60 + i % 12), _note(72)]) for i in range(200)]
+        sent = []
+        self.assertTrue(engine.run(schedule, lambda msg: sent.append((clock.now, msg))))
+
+        self.assertEqual(len(sent), 400)
+        start = sent[0][0]
+        for (at, _), burst in zip(sent[::2], schedule):
+            self.assertGreaterEqual(at - start, burst[0] - 0.0002)
+            self.assertLess(at - start, burst[0] + 0.0005)
+
+    def test_late_event_does_not_shift_later_ones(self):
+        clock = _FakeClock()
+        engine = PlaybackEngine(clock=clock, spin_seconds=float("inf"))
+        sent = []
+
+        def send(msg):
+            sent.append(clock.now)
+            if msg.note == 61:
+                clock.now += 0.05  # a slow send
+
+        engine.run([(0.0, [_note(60)]), (0.01, [_note(61)]), (0.02, [_note(62)]), (0.1, [_note(63)])], send)
+        self.assertLess(sent[2] - (sent[1] + 0.05), 0.001)  # overdue: sent at once
+        self.assertAlmostEqual(sent[3] - sent[0], 0.1, delta=0.001)
+
+    def test_stop_interrupts_long_wait(self):
+        engine = PlaybackEngine()
+        threading.Timer(0.05, engine.stop).start()
+        t0 = time.perf_counter()
+        self.assertFalse(engine.run([(0.0, [_note(60)]), (30.0, [_note(61)])], lambda msg: None))
+        self.assertLess(time.perf_counter() - t0, 1.0)
+
+    def test_pause_shifts_the_remaining_schedule(self):
+        engine = PlaybackEngine()
+        sent, pauses = [], []
+        threading.Timer(0.05, engine.pause).start()
+        threading.Timer(0.25, engine.resume).start()
+        t0 = time.perf_counter()
+        engine.run(
+            [(0.0, [_note(60)]), (0.1, [_note(61)])],
+            lambda msg: sent.append(time.perf_counter() - t0),
+            on_pause=lambda: pauses.append(True),
+        )
+        self.assertEqual(pauses, [True])
+        self.assertGreater(sent[1], 0.29)
+
+
+class TestLoopSchedule(unittest.TestCase):
+    def setUp(self):
+        self.a = _song([(0.0, _note(60)), (0.5, _off(60)), (1.0, _note(62)), (3.5, _off(62))], program=1)
+        self.b = _song([(0.0, _note(70)), (2.0, _note(72)), (3.0, _off(72))], program=2)
+
+    def test_loops_without_gaps(self):
+        times = [t for t, _ in islice(LoopSchedule(self.a), 9)]
+        self.assertEqual(times, [0.0, 0.5, 1.0, 3.5, 4.0, 4.5, 5.0, 7.5, 8.0])
+
+    def test_swap_at_phrase_boundary_releases_held_notes(self):
+        loop = LoopSchedule(self.a)
+        it = iter(loop)
+        self.assertEqual(next(it), (0.0, [_note(60)]))
+        loop.queue(self.b)
+        self.assertEqual(next(it), (0.5, [_off(60)]))
+        self.assertEqual(next(it), (1.0, [_note(62)]))
+        self.assertEqual(next(it), (2.0, [_off(62), Message("program_change", program=2)]))
+        # The new song continues from bar 3, then loops from its start.
+        self.assertEqual([t for t, _ in islice(it, 4)], [2.0, 3.0, 4.0, 6.0])
+        self.assertIs(loop.song, self.b)
+        self.assertEqual(loop.swaps, 1)
+
+    def test_bar_boundary(self):
+        loop = LoopSchedule(self.a, boundary="bar")
+        it = iter(loop)
+        next(it)
+        loop.queue(self.b)
+        self.assertEqual(next(it), (0.5, [_off(60)]))
+        self.assertEqual(next(it), (1.0, [Message("program_change", program=2)]))
+        self.assertEqual(next(it), (2.0, [_note(72)]))
+
+    def test_encode_song_keeps_every_event_inside_the_loop(self):
+        artifacts = _artifacts()
+        song = encode_song(artifacts)
+        self.assertEqual(sum(len(m) for _, m in song.bursts), sum(len(e) for e in artifacts.part_events.values()))
+        self.assertEqual(song.times, sorted(song.times))
+        self.assertLessEqual(song.times[-1], song.period)
+        self.assertAlmostEqual(song.period, 16.0)
+        self.assertEqual(len(song.programs), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import threading
+import time
+import unittest
+
+from mido import Message, MidiFile, MidiTrack
+
+from mind.player import MidiPlayer
+from mind.ports import PortPool
+
+
+class _FakePort:
+    def __init__(self, name, fail_after=None):
+        self.name = name
+        self.closed = False
+        self.sent = []
+        self.fail_after = fail_after
+
+    def send(self, msg):
+        if self.closed or (self.fail_after is not None and len(self.sent) >= self.fail_after):
+            raise OSError("device gone")
+        self.sent.append(msg)
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeBackend:
+    def __init__(self, names=("Synth A", "Synth B"), open_delay=0.0):
+        self.names = list(names)
+        self.open_delay = open_delay
+        self.opened = []
+        self.listed = 0
+        self.fail_first_port_after = None
+
+    def open_output(self, name):
+        time.sleep(self.open_delay)
+        fail_after = self.fail_first_port_after if not self.opened else None
+        port = _FakePort(name, fail_after)
+        self.opened.append(port)
+        return port
+
+    def get_output_names(self):
+        self.listed += 1
+        return list(self.names)
+
+    def pool(self):
+        return PortPool(open_output=self.open_output, get_output_names=self.get_output_names)
+
+
+def _midifile(notes=4):
+    mid = MidiFile(ticks_per_beat=480)
+    track = MidiTrack()
+    for i in range(notes):
+        track.append(Message("note_on", note=60 + i, velocity=80, time=0 if i == 0 else 24))
+        track.append(Message("note_off", note=60 + i, velocity=0, time=24))
+    mid.tracks.append(track)
+    return mid
+
+
+class TestPortPool(unittest.TestCase):
+    def test_ports_are_opened_once_and_reused(self):
+        backend = _FakeBackend()
+        pool = backend.pool()
+        first = pool.acquire("Synth A")
+        self.assertIs(pool.acquire("Synth A"), first)
+        self.assertEqual(len(backend.opened), 1)
+        pool.acquire("Synth B")
+        self.assertEqual(len(backend.opened), 2)
+
+    def test_prepare_opens_in_background(self):
+        backend = _FakeBackend(open_delay=0.2)
+        pool = backend.pool()
+        t0 = time.perf_counter()
+        future = pool.prepare("Synth A")
+        self.assertLess(time.perf_counter() - t0, 0.1)
+        self.assertIs(pool.acquire("Synth A"), future.result())
+        self.assertEqual(len(backend.opened), 1)
+
+    def test_resolve_and_refresh(self):
+        backend = _FakeBackend()
+        pool = backend.pool()
+        self.assertEqual(pool.resolve(None), "Synth A")
+        self.assertEqual(pool.resolve("Synth B"), "Synth B")
+        backend.names = []
+        self.assertEqual(pool.refresh().result(), [])
+        self.assertIsNone(pool.resolve(""))
+
+    def test_closed_or_failed_ports_are_reopened(self):
+        backend = _FakeBackend()
+        pool = backend.pool()
+        port = pool.acquire("Synth A")
+        port.close()
+        self.assertIsNot(pool.acquire("Synth A"), port)
+
+        calls = []
+
+        def flaky_open(name):
+            calls.append(name)
+            if len(calls) == 1:
+                raise OSError("busy")
+            return _FakePort(name)
+
+        pool = PortPool(open_output=flaky_open, get_output_names=backend.get_output_names)
+        with self.assertRaises(OSError):
+            pool.acquire("Synth A")
+        self.assertEqual(pool.acquire("Synth A").name, "Synth A")
+
+    def test_ports_still_opening_are_closed_once_open(self):
+        backend = _FakeBackend(open_delay=0.2)
+        pool = backend.pool()
+        opening = pool.prepare("Synth A")
+        pool.invalidate("Synth A")
+        opening.result()
+        pool.prepare("Synth B")
+        time.sleep(0.05)  # let the open start
+        pool.close_all()
+        pool.close()
+        self.assertEqual([port.closed for port in backend.opened], [True, True])
+
+
+class TestPlayerPorts(unittest.TestCase):
+    def _play(self, player, name):
+        done = threading.Event()
+        player.play_midifile(_midifile(), name, on_done=done.set)
+        self.assertTrue(done.wait(5.0))
+
+    def test_port_stays_open_across_plays(self):
+        backend = _FakeBackend()
+        player = MidiPlayer(ports=backend.pool())
+        self._play(player, None)
+        self._play(player, "Synth A")
+        self.assertEqual(len(backend.opened), 1)
+        port = backend.opened[0]
+        self.assertFalse(port.closed)
+        self.assertEqual(len(port.sent), 16)
+
+    def test_restart_waits_for_the_previous_run(self):
+        backend = _FakeBackend(open_delay=1.2)
+        player = MidiPlayer(ports=backend.pool())
+        first_done, second_done = threading.Event(), threading.Event()
+        player.play_midifile(_midifile(), "Synth A", on_done=first_done.set)
+        time.sleep(0.05)
+        player.play_midifile(_midifile(60), "Synth A", on_done=second_done.set)
+        self.assertTrue(first_done.is_set())
+        self.assertTrue(player.is_playing())
+        player.stop()
+        self.assertTrue(second_done.wait(5.0))
+        self.assertFalse(player.is_playing())
+
+    def test_reconnects_when_the_device_goes_away(self):
+        backend = _FakeBackend()
+        backend.fail_first_port_after = 3
+        player = MidiPlayer(ports=backend.pool())
+        self._play(player, "Synth A")
+        self.assertEqual(len(backend.opened), 2)
+        self.assertTrue(backend.opened[0].closed)
+        self.assertEqual(len(backend.opened[0].sent) + len(backend.opened[1].sent), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import io
+import sys
+import unittest
+import wave
+from functools import partial
+from unittest import mock
+
+from mind.constants import BASS_CH, DRUM_CHANNEL, DRUM_KICK, GM_BASS, PPQ
+from mind.events import EventBuffer
+from mind.midi_build import build_song_artifacts
+
+from helpers import make_controls
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+if np is not None:
+    from mind.preview import collect_notes, render_audio
+
+
+_make_controls = partial(make_controls, length_bars=4)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestPreview(unittest.TestCase):
+    def test_single_note_pitch_and_timing(self):
+        bass = EventBuffer()
+        bass.program_change(0, BASS_CH, GM_BASS)
+        bass.note_on(PPQ, BASS_CH, 57, 100)  # A3 = 220 Hz, starts at 0.5 s
+        bass.note_off(3 * PPQ, BASS_CH, 57)
+        audio = render_audio({"bass": bass}, bpm=120, sample_rate=8000)
+
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertAlmostEqual(float(np.abs(audio).max()), 0.9, places=5)
+        self.assertTrue(np.all(audio[:3990] == 0.0))
+        held = audio[4000:12000]
+        peak_hz = np.fft.rfftfreq(len(held), 1 / 8000)[np.argmax(np.abs(np.fft.rfft(held)))]
+        self.assertAlmostEqual(float(peak_hz), 220.0, delta=2.0)
+
+    def test_notes_are_paired_per_pitch(self):
+        drums = EventBuffer()
+        drums.note_on(0, DRUM_CHANNEL, DRUM_KICK, 90)
+        drums.note_off(10, DRUM_CHANNEL, DRUM_KICK)
+        drums.note_on(10, DRUM_CHANNEL, DRUM_KICK, 70)
+        self.assertEqual(
+            collect_notes({"drums": drums}),
+            [(0, 10, DRUM_CHANNEL, DRUM_KICK, 90, 0), (10, 11, DRUM_CHANNEL, DRUM_KICK, 70, 0)],
+        )
+
+    def test_song_renders_to_wav(self):
+        artifacts = build_song_artifacts(_make_controls(), with_report=False)
+        buf = io.BytesIO()
+        artifacts.save_wav(buf, sample_rate=11025)
+        buf.seek(0)
+        with wave.open(buf, "rb") as w:
+            self.assertEqual((w.getnchannels(), w.getsampwidth(), w.getframerate()), (1, 2, 11025))
+            seconds = w.getnframes() / 11025
+        self.assertGreater(seconds, 8.0)  # 4 bars at 120 bpm, plus release tails
+        self.assertLess(seconds, 11.0)
+
+        again = io.BytesIO()
+        artifacts.save_wav(again, sample_rate=11025)
+        self.assertEqual(buf.getvalue(), again.getvalue())
+
+    def test_missing_numpy_error(self):
+        from mind import preview
+
+        with mock.patch.dict(sys.modules, {"numpy": None}):
+            with self.assertRaisesRegex(ImportError, "needs NumPy"):
+                preview.render_audio({}, bpm=120)
+
+
+if __name__ == "__main__":
+    unittest.main()
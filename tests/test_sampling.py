@@ -0,0 +1,121 @@
+import random
+import unittest
+from collections import Counter
+from functools import partial
+
+from mind.midi_build import build_song_artifacts
+from mind.sampling import WeightedSampler, cached_sampler
+from mind.utils import pick_weighted
+
+from helpers import make_controls
+
+TABLES = [
+    [("triad", 0.70), ("sus2", 0.15), ("sus4", 0.15)],
+    [(s, 2.9 if s % 4 == 0 else 1.3 if s % 2 == 0 else 0.8) for s in range(16)],
+    [("a", 0.0), ("b", 1.0), ("c", 0.0), ("d", 2.0)],
+    [("x", 0.0), ("y", 0.0)],
+]
+
+
+_make_controls = partial(
+    make_controls,
+    style="jazz",
+    seed=21,
+    length_bars=16,
+    bpm=112,
+    mood_valence=0.5,
+    mood_arousal=0.6,
+    complexity=0.9,
+)
+
+
+class TestCompatSampling(unittest.TestCase):
+    def test_draws_match_pick_weighted(self):
+        for table in TABLES:
+            sampler = WeightedSampler(table)
+            a, b = random.Random(9), random.Random(9)
+            for _ in range(2000):
+                self.assertEqual(sampler.draw(a), pick_weighted(b, table))
+
+    def test_all_zero_weights_match_pick_weighted(self):
+        class _FixedRandom:
+            def __init__(self, value):
+                self.value = value
+
+            def random(self):
+                return self.value
+
+        table = TABLES[3] + [("z", 0.0)]
+        sampler = WeightedSampler(table)
+        for value in (0.0, 0.25, 0.999):
+            self.assertEqual(sampler.draw(_FixedRandom(value)), pick_weighted(_FixedRandom(value), table))
+        self.assertEqual(sampler.draw(_FixedRandom(0.0)), "x")
+        self.assertEqual(sampler.draw(_FixedRandom(0.5)), "z")
+
+    def test_sample_matches_rejection_loop(self):
+        table = TABLES[1]
+        sampler = WeightedSampler(table)
+        for seed in range(50):
+            a, b = random.Random(seed), random.Random(seed)
+            expected = []
+            while len(expected) < 9:
+                s = pick_weighted(b, table)
+                if s not in expected:
+                    expected.append(s)
+            self.assertEqual(sampler.sample(a, 9), expected)
+            self.assertEqual(a.getstate(), b.getstate())
+
+    def test_sample_stops_at_positive_weights(self):
+        rng = random.Random(1)
+        self.assertCountEqual(WeightedSampler(TABLES[2]).sample(rng, 4), ["b", "d"])
+        self.assertEqual(WeightedSampler(TABLES[3]).sample(rng, 1), [])
+
+
+class TestAliasSampling(unittest.TestCase):
+    def test_distribution(self):
+        table = TABLES[1]
+        sampler = WeightedSampler(table, "alias")
+        rng = random.Random(3)
+        n = 100_000
+        counts = Counter(sampler.draw(rng) for _ in range(n))
+        total = sum(w for _, w in table)
+        for item, w in table:
+            self.assertAlmostEqual(counts[item] / n, w / total, delta=0.01)
+        zero = WeightedSampler(TABLES[2], "alias")
+        self.assertEqual({zero.draw(rng) for _ in range(1000)}, {"b", "d"})
+
+    def test_sampling_without_replacement(self):
+        sampler = WeightedSampler([("heavy", 50.0), ("light", 1.0)] + [(i, 1.0) for i in range(8)], "alias")
+        rng = random.Random(4)
+        firsts = Counter()
+        for _ in range(2000):
+            picked = sampler.sample(rng, 5)
+            self.assertEqual(len(set(picked)), 5)
+            firsts[picked[0]] += 1
+        self.assertGreater(firsts["heavy"], 1500)
+
+    def test_songs_use_the_selected_method(self):
+        compat = build_song_artifacts(_make_controls(sampling="compat"))
+        alias = build_song_artifacts(_make_controls(sampling="alias"))
+        self.assertEqual(compat.to_smf(), build_song_artifacts(_make_controls(sampling="compat")).to_smf())
+        self.assertNotEqual(list(compat.part_events["melody"].rows()), list(alias.part_events["melody"].rows()))
+        self.assertNotEqual(
+            [seg.extension for seg in compat.chord_segments], [seg.extension for seg in alias.chord_segments]
+        )
+
+
+class TestSamplerCache(unittest.TestCase):
+    def test_cached_and_validated(self):
+        table = tuple(TABLES[0])
+        self.assertIs(cached_sampler(table), cached_sampler(table))
+        self.assertIsNot(cached_sampler(table), cached_sampler(table, "alias"))
+        with self.assertRaises(ValueError):
+            WeightedSampler(table, "fast")
+        with self.assertRaises(ValueError):
+            WeightedSampler([])
+        with self.assertRaises(ValueError):
+            WeightedSampler([("a", -1.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
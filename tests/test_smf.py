@@ -0,0 +1,55 @@
+import io
+import os
+import tempfile
+import unittest
+
+import mido
+
+from mind.midi_build import build_song_artifacts
+
+from helpers import make_controls
+
+
+def _artifacts(seed=21):
+    ctrl = make_controls(
+        "jazz", seed, 200, bpm=93, key_name="A", mode="minor", mood_valence=0.5, mood_arousal=0.6, complexity=0.6
+    )
+    return build_song_artifacts(ctrl, with_report=False)
+
+
+class TestSmfWriter(unittest.TestCase):
+    def test_type1_matches_mido(self):
+        artifacts = _artifacts()
+        for parts in (("drums",), ("melody", "harmony", "bass", "drums")):
+            buf = io.BytesIO()
+            artifacts.midifile(parts).save(file=buf)
+            self.assertEqual(bytes(artifacts.to_smf(parts)), buf.getvalue())
+
+    def test_type0_single_track(self):
+        artifacts = _artifacts()
+        mid = mido.MidiFile(file=io.BytesIO(bytes(artifacts.to_smf(smf_type=0))))
+        self.assertEqual(mid.type, 0)
+        self.assertEqual(len(mid.tracks), 1)
+        expected = sum(len(evs) for evs in artifacts.part_events.values())
+        self.assertEqual(len([m for m in mid.tracks[0] if not m.is_meta]), expected)
+        self.assertAlmostEqual(mid.length, artifacts.midifile().length, places=6)
+
+    def test_write_to_fd_and_buffer(self):
+        artifacts = _artifacts()
+        data = bytes(artifacts.to_smf())
+        buf = io.BytesIO()
+        artifacts.save_smf(buf)
+        self.assertEqual(buf.getvalue(), data)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "song.mid")
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+            try:
+                artifacts.save_smf(fd)
+            finally:
+                os.close(fd)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
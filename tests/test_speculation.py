@@ -0,0 +1,112 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from functools import partial
+
+from mind.artifacts import ArtifactCache, controls_key
+from mind.control_mapping import map_controls
+from mind.midi_build import build_song_artifacts
+from mind.speculation import Speculator, neighbour_controls
+
+from helpers import make_controls
+
+
+_make_controls = partial(make_controls, length_bars=4, intensity=0.55, complexity=0.35, tightness=0.7)
+
+
+class TestArtifactCache(unittest.TestCase):
+    def test_hits_misses_and_lru_eviction(self):
+        songs = [build_song_artifacts(_make_controls(seed=seed)) for seed in (1, 2, 3)]
+        cache = ArtifactCache(max_entries=2)
+        for artifacts in songs[:2]:
+            self.assertTrue(cache.put(artifacts))
+        self.assertIs(cache.get(songs[0].key), songs[0])  # seed 1 is now most recent
+        cache.put(songs[2])
+
+        self.assertIsNone(cache.get(songs[1].key))
+        self.assertEqual(set(cache._entries), {songs[0].key, songs[2].key})
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 1, 1))
+        self.assertEqual(stats["bytes"], songs[0].approx_bytes() + songs[2].approx_bytes())
+
+    def test_byte_budget_and_incomplete_artifacts(self):
+        artifacts = build_song_artifacts(_make_controls())
+        size = artifacts.approx_bytes()
+        cache = ArtifactCache(max_bytes=size * 2 - 1)
+        cache.put(artifacts)
+        cache.put(build_song_artifacts(_make_controls(seed=12)))
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.bytes, cache.max_bytes)
+
+        self.assertFalse(cache.put(build_song_artifacts(_make_controls(seed=13), with_report=False)))
+        self.assertFalse(ArtifactCache(max_bytes=size - 1).put(artifacts))
+
+    def test_get_or_build(self):
+        built = []
+
+        def build(ctrl):
+            built.append(ctrl.seed)
+            return build_song_artifacts(ctrl)
+
+        cache = ArtifactCache()
+        first = cache.get_or_build(_make_controls(), build)
+        self.assertIs(cache.get_or_build(_make_controls(), build), first)
+        self.assertEqual(built, [11])
+
+
+class TestSpeculation(unittest.TestCase):
+    def test_neighbours_match_fresh_controls(self):
+        ctrl = _make_controls(seed=20)
+        up, down, jazz, d_key = neighbour_controls(ctrl, styles=("pop", "jazz"), keys=("D",))
+        self.assertEqual(controls_key(up), controls_key(_make_controls(seed=21)))
+        self.assertEqual(controls_key(down), controls_key(_make_controls(seed=19)))
+        self.assertEqual(controls_key(jazz), controls_key(_make_controls(seed=20, style="jazz")))
+        self.assertEqual((d_key.key_name, d_key.seed), ("D", 20))
+
+    def test_neighbours_keep_manual_overrides(self):
+        ctrl = _make_controls(seed=20)
+        ctrl = replace(
+            ctrl,
+            derived=replace(
+                ctrl.derived,
+                humanize_velocity=0.0,
+                level2=replace(ctrl.derived.level2, chromaticism=0.99),
+            ),
+        )
+        [up] = neighbour_controls(ctrl, seed_steps=(1,))
+        fresh = map_controls(ctrl.style_mood, seed=21)
+        self.assertEqual(up.derived.humanize_velocity, 0.0)
+        self.assertEqual(up.derived.level2.chromaticism, 0.99)
+        self.assertEqual(up.derived.level2.groove_archetype, fresh.level2.groove_archetype)
+
+    def test_speculated_songs_are_cache_hits(self):
+        cache = ArtifactCache()
+        speculator = Speculator(cache)  # default low-priority process pool
+        ctrl = _make_controls(seed=30)
+        queued = speculator.speculate(neighbour_controls(ctrl))
+        self.assertEqual(len(queued), 2)
+        self.assertEqual(speculator.speculate(neighbour_controls(ctrl)), [])  # already in flight
+        self.assertTrue(speculator.wait(30.0))
+        speculator.close()
+
+        nxt = _make_controls(seed=31)
+        hit = cache.get(controls_key(nxt))
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit.part_events, build_song_artifacts(nxt).part_events)
+        self.assertEqual(speculator.stats()["completed"], 2)
+
+    def test_stale_queued_builds_are_cancelled(self):
+        cache = ArtifactCache()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            speculator = Speculator(cache, executor=pool)
+            speculator.speculate(neighbour_controls(_make_controls(seed=40)))
+            speculator.speculate(neighbour_controls(_make_controls(seed=50)))
+            self.assertTrue(speculator.wait(30.0))
+        stats = speculator.stats()
+        self.assertEqual(stats["submitted"], 4)
+        self.assertGreaterEqual(stats["cancelled"], 1)  # seed 39 was still queued behind 41
+        self.assertIn(controls_key(_make_controls(seed=51)), cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
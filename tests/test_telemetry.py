@@ -0,0 +1,93 @@
+import json
+import threading
+import unittest
+
+from mido import Message
+
+from mind.midi_build import build_song_artifacts
+from mind.player import MidiPlayer
+from mind.playback import PlaybackEngine
+from mind.ports import PortPool
+from mind.reporting import build_song_report
+from mind.telemetry import EDGES_US, PlaybackTelemetry
+
+from helpers import make_controls
+
+
+class _FakeClock:
+    def __init__(self, step=0.0001):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class TestPlaybackTelemetry(unittest.TestCase):
+    def test_percentiles_within_bucket_resolution(self):
+        telemetry = PlaybackTelemetry(late_threshold=0.001)
+        # 1000 events: lateness 0.05 ms .. 99.95 ms, uniformly in rank.
+        for i in range(1000):
+            telemetry.record(i * 0.01, i * 0.01 + (i + 0.5) * 1e-4)
+        self.assertEqual(telemetry.events, 1000)
+        self.assertEqual(telemetry.late, 990)
+        for q, expected in ((0.5, 0.05), (0.99, 0.099)):
+            self.assertAlmostEqual(telemetry.percentile(q), expected, delta=expected * 0.13)
+        self.assertAlmostEqual(telemetry.max_s, 0.09995)
+        self.assertEqual(len(telemetry.counts), len(EDGES_US) + 1)
+
+    def test_drift_per_minute(self):
+        telemetry = PlaybackTelemetry()
+        # Lateness grows by 2 ms every 10 s of schedule time.
+        for i in range(600):
+            t = i * 0.1
+            telemetry.record(t, t + t * 2e-4)
+        self.assertAlmostEqual(telemetry.drift_per_minute(), 0.012, places=6)
+
+    def test_early_events_count_as_zero_lateness(self):
+        telemetry = PlaybackTelemetry()
+        telemetry.record(1.0, 0.9995)
+        self.assertEqual((telemetry.early, telemetry.late), (1, 0))
+        self.assertEqual(telemetry.percentile(1.0), 0.0)
+
+    def test_engine_records_every_message_and_summary_is_json(self):
+        clock = _FakeClock()
+        engine = PlaybackEngine(clock=clock, spin_seconds=float("inf"))
+        telemetry = PlaybackTelemetry()
+        schedule = [(i * 0.01, [Message("note_on", note=60), Message("note_off", note=60)]) for i in range(50)]
+        engine.run(schedule, lambda msg: None, telemetry=telemetry)
+
+        summary = telemetry.summary()
+        self.assertEqual(summary["events"], 100)
+        self.assertLess(summary["jitter_ms"]["max"], 1.0)
+        self.assertEqual(sum(row[2] for row in summary["histogram_us"]), 100)
+        json.dumps(summary)
+
+        ctrl = make_controls(seed=5, length_bars=4)
+        a = build_song_artifacts(ctrl, with_report=False)
+        report = build_song_report(ctrl, a.plan, a.chord_segments, a.part_events, playback=summary)
+        self.assertEqual(report["playback"], summary)
+        self.assertNotIn("playback", build_song_report(ctrl, a.plan, a.chord_segments, a.part_events))
+
+    def test_player_records_which_song_the_telemetry_is_for(self):
+        player = MidiPlayer(collect_telemetry=True, ports=PortPool(get_output_names=lambda: []))
+        a = build_song_artifacts(make_controls(seed=5, length_bars=4))
+        b = build_song_artifacts(make_controls(seed=6, length_bars=4))
+        done = threading.Event()
+        player.play_loop(a, None, on_done=done.set)
+        self.assertEqual(player.telemetry_key, a.key)
+        player.queue_song(b)
+        self.assertIsNone(player.telemetry_key)
+        player.stop()
+        self.assertTrue(done.wait(5.0))
+
+        done.clear()
+        player.play_midifile(b.midifile(), None, on_done=done.set, key=b.key)
+        self.assertEqual(player.telemetry_key, b.key)
+        player.stop()
+        self.assertTrue(done.wait(5.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,44 @@
+import random
 import unittest
+from dataclasses import replace
+from functools import partial
 
-from mind.theory.voice_leading import smooth_voice_leading
+from mind.events import EventBuffer
+from mind.harmony import build_chord_segments, generate_harmony_track
+from mind.midi_build import iter_song_bars
+from mind.planning import build_song_plan
+from mind.theory.voice_leading import (
+    _motion,
+    _static_cost,
+    initial_voicing,
+    iter_optimal_voicings,
+    optimal_voice_leading,
+    smooth_voice_leading,
+)
 from mind.utils import chord_tones_in_range
 
+from helpers import make_controls
+
+PROGRESSION = [[0, 4, 7], [9, 0, 4], [5, 9, 0], [7, 11, 2], [0, 4, 7, 11], [2, 5, 9, 0], [7, 11, 2, 5], [0, 4, 7]] * 3
+
+
+def _total_cost(voicings, center):
+    static = sum(_static_cost(tuple(v), center) for v in voicings)
+    return static + sum(_motion(tuple(a), tuple(b)) for a, b in zip(voicings, voicings[1:]))
+
+
+_make_controls = partial(
+    make_controls,
+    style="jazz",
+    seed=8,
+    length_bars=24,
+    bpm=110,
+    key_name="Eb",
+    mood_valence=0.5,
+    mood_arousal=0.6,
+    complexity=0.8,
+)
+
 
 class TestVoiceLeading(unittest.TestCase):
     def test_smooth_voice_leading_minimizes_motion(self):
@@ -26,5 +62,45 @@ class TestVoiceLeading(unittest.TestCase):
         self.assertEqual(voicing, prev_voicing)
 
 
+class TestOptimalVoiceLeading(unittest.TestCase):
+    def test_beats_greedy_on_its_own_objective(self):
+        low, high, center = 50, 74, 62
+        greedy = [initial_voicing(random.Random(1), PROGRESSION[0], low, high, center, 3)]
+        for pcs in PROGRESSION[1:]:
+            greedy.append(smooth_voice_leading(greedy[-1], pcs, low, high))
+        optimal = optimal_voice_leading(PROGRESSION, low, high, 3, center)
+
+        self.assertEqual(len(optimal), len(PROGRESSION))
+        self.assertLessEqual(_total_cost(optimal, center), _total_cost(greedy, center))
+        for pcs, voicing in zip(PROGRESSION, optimal):
+            self.assertEqual(len(voicing), 3)
+            self.assertTrue(all(low <= n <= high and n % 12 in pcs for n in voicing))
+
+    def test_windowed_solver(self):
+        args = (PROGRESSION, 50, 74, 4, 62)
+        self.assertEqual(list(iter_optimal_voicings(*args, window=64)), optimal_voice_leading(*args))
+        windowed = list(iter_optimal_voicings(*args, window=4, lookahead=4))
+        self.assertEqual(len(windowed), len(PROGRESSION))
+        self.assertLess(_total_cost(windowed, 62), _total_cost(optimal_voice_leading(*args), 62) * 1.25)
+
+    def test_unvoiceable_chord_holds_previous(self):
+        voicings = optimal_voice_leading([[0, 4, 7], [], [5, 9, 0]], 55, 76, 3, start=[60, 64, 67])
+        self.assertEqual(voicings[1], voicings[0])
+        self.assertEqual(optimal_voice_leading([[]], 55, 76, 3), [[]])
+
+    def test_harmony_track_streams_identically(self):
+        ctrl = _make_controls(voice_leading="optimal")
+        plan = build_song_plan(ctrl)
+        segments = build_chord_segments(ctrl, plan)
+        whole = generate_harmony_track(ctrl, segments, plan)
+        streamed = EventBuffer()
+        for chunk in iter_song_bars(ctrl, include_parts=("harmony",)):
+            streamed.extend(chunk["harmony"])
+        self.assertEqual(list(whole.rows()), list(streamed.rows()))
+
+        greedy = generate_harmony_track(replace(ctrl, voice_leading="greedy"), segments, plan)
+        self.assertNotEqual(list(whole.rows()), list(greedy.rows()))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,107 @@
+import threading
+import time
+import unittest
+from functools import partial
+
+from mind.artifacts import ArtifactCache, controls_key
+from mind.midi_build import build_song_artifacts
+from mind.pipeline import GenerationCancelled, Pipeline
+from mind.worker import GenerationWorker
+
+from helpers import make_controls
+
+
+_make_controls = partial(make_controls, seed=3, key_name="D", mode="minor")
+
+
+class _CountingPipeline(Pipeline):
+    def __init__(self, gate=None):
+        super().__init__()
+        self.calls = []
+        self.gate = gate
+
+    def run(self, ctrl, **kwargs):
+        self.calls.append(ctrl.seed)
+        if self.gate is not None:
+            self.gate.wait(5.0)
+        return super().run(ctrl, **kwargs)
+
+
+def _wait_for_results(worker, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        results = worker.poll()
+        if results:
+            return results
+        time.sleep(0.01)
+    raise AssertionError("no result")
+
+
+class TestGenerationWorker(unittest.TestCase):
+    def test_rapid_submits_are_coalesced(self):
+        pipeline = _CountingPipeline()
+        worker = GenerationWorker(pipeline, debounce=0.1)
+        for seed in range(1, 6):
+            worker.submit(_make_controls(seed=seed))
+        [result] = _wait_for_results(worker)
+        worker.close()
+
+        self.assertEqual(pipeline.calls, [5])
+        self.assertEqual(result.ticket, worker.latest)
+        self.assertEqual(result.artifacts.part_events, build_song_artifacts(_make_controls(seed=5)).part_events)
+
+    def test_obsolete_run_is_cancelled_and_dropped(self):
+        gate = threading.Event()
+        pipeline = _CountingPipeline(gate)
+        worker = GenerationWorker(pipeline, debounce=0.0)
+        worker.submit(_make_controls(seed=1))
+        while not pipeline.calls:
+            time.sleep(0.005)
+        worker.submit(_make_controls(seed=2))  # seed 1 is now obsolete
+        gate.set()
+        [result] = _wait_for_results(worker)
+        worker.close()
+
+        self.assertEqual(result.ctrl.seed, 2)
+        self.assertEqual(pipeline.calls, [1, 2])
+
+    def test_pipeline_cancel_check(self):
+        pipeline = Pipeline()
+        with self.assertRaises(GenerationCancelled):
+            pipeline.run(_make_controls(), cancel=lambda: True)
+        artifacts = pipeline.run(_make_controls(), cancel=lambda: False)
+        self.assertEqual(artifacts.part_events, build_song_artifacts(_make_controls()).part_events)
+
+    def test_cache_hits_skip_the_pipeline(self):
+        cache = ArtifactCache()
+        cache.put(build_song_artifacts(_make_controls(seed=6)))
+        pipeline = _CountingPipeline()
+        worker = GenerationWorker(pipeline, debounce=0.0, cache=cache)
+        worker.submit(_make_controls(seed=6))
+        [result] = _wait_for_results(worker)
+        self.assertTrue(result.cached)
+        self.assertEqual(pipeline.calls, [])
+
+        worker.run_sync(_make_controls(seed=7))
+        worker.close()
+        self.assertIn(controls_key(_make_controls(seed=7)), cache)
+
+    def test_run_sync_and_errors(self):
+        worker = GenerationWorker(debounce=0.0)
+        artifacts = worker.run_sync(_make_controls(seed=4))
+        self.assertEqual(artifacts.ctrl.seed, 4)
+
+        class _Failing(Pipeline):
+            def run(self, ctrl, **kwargs):
+                raise ValueError("bad controls")
+
+        worker.pipeline = _Failing()
+        worker.submit(_make_controls())
+        [result] = _wait_for_results(worker)
+        worker.close()
+        self.assertIsNone(result.artifacts)
+        self.assertIsInstance(result.error, ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()